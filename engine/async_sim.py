@@ -0,0 +1,239 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Asynchronous Simulation API
+
+Coroutine versions of chron_sim.run_sim and simulator.run_sim_stream for asyncio applications.
+The simulations are run in an executor (preferably a process pool, since the engine is CPU bound),
+so the event loop is never blocked, and many requests can be awaited at once:
+
+    executor = async_sim.make_executor('process', max_workers=4)
+    limit = asyncio.Semaphore(8)
+    sim_out = await async_sim.simulate(inputs, seed=1, executor=executor, semaphore=limit)
+    async for chunk in async_sim.simulate_stream(inputs, executor=executor):
+        ...
+
+Cancelling the awaiting task returns control immediately. A streamed run is stopped at the end
+of the month being simulated; a run_sim call that has already started in a worker runs to
+completion in the background (its result is discarded), while one still waiting in the executor
+queue is never started.
+
+The chunks of a streamed run are handed to the event loop with loop.call_soon_threadsafe, so
+reading a stream never occupies a thread of an executor (for process pools, one dedicated thread
+per stream forwards the chunks from the worker process). A producer that gets more than a few
+chunks ahead of its consumer waits for it.
+
+Seeded runs use the global numpy random state of the worker. Worker processes each have their own
+random state; in a thread pool, seeded runs are serialised so that their results are reproducible.
+A seeded stream keeps its own random state and only holds the lock while it generates the load and
+solar data of each year, so any number of seeded streams can be read at the same pace.
+
+Main Functions
+--------------
+- make_executor: process or thread pool executor for the simulations
+- simulate: runs chron_sim.run_sim in an executor
+- simulate_stream: yields the monthly chunks of simulator.run_sim_stream from an executor
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+
+from engine.chron_sim import generate_profiles, run_sim
+from engine.simulator import run_sim_stream
+
+STREAM_BUFFER = 2       # Chunks a streamed run may get ahead of its consumer
+POLL_INTERVAL = 0.1     # Interval at which a blocked stream producer checks for cancellation (s)
+
+_END = ('end', None)    # Marks the end of a stream
+_LAST = ['end', 'error']
+_seed_lock = threading.Lock()
+_manager = None
+
+def make_executor(kind='process', max_workers=None):
+    """
+    Creates an executor for the simulations
+
+    Inputs:
+        kind        'process' (runs in parallel on several CPUs) or 'thread' (no worker startup
+                    or pickling of inputs and outputs, but runs share the interpreter lock)
+        max_workers Number of workers (default as for concurrent.futures)
+    """
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers)
+    if kind == 'thread':
+        return ThreadPoolExecutor(max_workers)
+    raise ValueError("Executor kind must be 'process' or 'thread', not " + repr(kind))
+
+def _seeded(seed):
+    """Lock held while a seeded run uses the global random state (threads of this process only)"""
+    return _seed_lock if seed is not None else nullcontext()
+
+def _run(run_fn, inputs, seed):
+    """Runs a simulation in a worker, with the random seed set"""
+    with _seeded(seed):
+        if seed is not None:
+            np.random.seed(seed)
+        return run_fn(*inputs)
+
+def _private_profiles(seed):
+    """
+    Returns a profile function (as chron_sim.generate_profiles) with its own seeded random state,
+    swapped into the global random state under the lock only while the profiles are generated
+    """
+    state = [np.random.RandomState(seed).get_state()]
+
+    def profile_fn(sys_dict, pv_dict, load_dict):
+        with _seed_lock:
+            saved = np.random.get_state()
+            np.random.set_state(state[0])
+            try:
+                return generate_profiles(sys_dict, pv_dict, load_dict)
+            finally:
+                state[0] = np.random.get_state()
+                np.random.set_state(saved)
+
+    return profile_fn
+
+def _put(chunks, stop, item):
+    """Puts an item in the stream queue, giving up if the stream is cancelled"""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+class _Relay(object):
+    """
+    Hands the items of a stream from worker threads to an asyncio.Queue of the event loop, with a
+    bounded number of items in flight (put has the blocking interface of queue.Queue.put)
+    """
+
+    def __init__(self, loop, buffer=STREAM_BUFFER):
+        self.loop = loop
+        self.items = asyncio.Queue()
+        self.credits = threading.Semaphore(buffer)
+
+    def put(self, item, timeout=None):
+        if not self.credits.acquire(timeout=timeout):
+            raise queue.Full
+        try:
+            self.loop.call_soon_threadsafe(self.items.put_nowait, item)
+        except RuntimeError:
+            # Event loop closed: nobody is reading the stream any more
+            pass
+
+    async def get(self):
+        item = await self.items.get()
+        self.credits.release()
+        return item
+
+def _forward(chunks, relay, stop):
+    """Forwards the items of a process stream queue to the event loop (runs in its own thread)"""
+    while not stop.is_set():
+        try:
+            item = chunks.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        if not _put(relay, stop, item) or item[0] in _LAST:
+            return
+
+def _produce(inputs, seed, n_years, chunks, stop):
+    """Runs a streamed simulation in a worker, putting each chunk in the stream queue"""
+    try:
+        # The lock must not be held while the producer waits for its consumer (other seeded
+        # streams read in step with this one could never start), so the seeded random state is
+        # private to the stream
+        profile_fn = generate_profiles if seed is None else _private_profiles(seed)
+        for chunk in run_sim_stream(*inputs, n_years=n_years, profile_fn=profile_fn):
+            if not _put(chunks, stop, ('chunk', chunk)):
+                return
+        _put(chunks, stop, _END)
+    except BaseException as error:
+        _put(chunks, stop, ('error', error))
+
+def _process_queue():
+    """Queue and cancellation flag shared with the workers of a process pool"""
+    global _manager
+    if _manager is None:
+        _manager = multiprocessing.Manager()
+    return _manager.Queue(STREAM_BUFFER), _manager.Event()
+
+async def simulate(inputs, seed=None, executor=None, semaphore=None, run_fn=run_sim):
+    """
+    Runs a simulation in an executor without blocking the event loop
+
+    Inputs:
+        inputs      Tuple of input dictionaries (sys_dict, pv_dict, batt_dict, gen_dict, load_dict),
+                    e.g. from project.build_inputs
+        seed        Random seed set before the run (None for a random run)
+        executor    Executor to run in (default the event loop's default thread pool)
+        semaphore   Optional asyncio.Semaphore bounding the number of concurrent runs
+        run_fn      Simulation function (default chron_sim.run_sim)
+
+    Outputs:
+        sim_out     Dictionary of simulation outputs
+    """
+    loop = asyncio.get_running_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(executor, _run, run_fn, tuple(inputs), seed)
+    async with semaphore:
+        return await loop.run_in_executor(executor, _run, run_fn, tuple(inputs), seed)
+
+async def simulate_stream(inputs, seed=None, n_years=1, executor=None, semaphore=None):
+    """
+    Runs a streamed simulation in an executor and yields its chunks as they are produced
+
+    Inputs:
+        inputs      Tuple of input dictionaries (as for simulate)
+        seed        Random seed set before the run (None for a random run)
+        n_years     Number of years to simulate
+        executor    Executor to run in (default the event loop's default thread pool). The run
+                    occupies a worker of the executor until it finishes or is cancelled.
+        semaphore   Optional asyncio.Semaphore bounding the number of concurrent runs
+
+    Outputs:
+        chunk       Dictionary of results for one month (as from simulator.run_sim_stream)
+    """
+    if semaphore is not None:
+        await semaphore.acquire()
+    loop = asyncio.get_running_loop()
+    relay = _Relay(loop)
+    forwarder = None
+    if isinstance(executor, ProcessPoolExecutor):
+        # The worker process puts the chunks in a manager queue, and a thread of this process
+        # forwards them to the event loop
+        chunks, stop = _process_queue()
+        forwarder = threading.Thread(target=_forward, args=(chunks, relay, stop), daemon=True)
+        forwarder.start()
+    else:
+        chunks, stop = relay, threading.Event()
+    try:
+        producer = loop.run_in_executor(executor, _produce, tuple(inputs), seed, n_years, chunks, stop)
+        while True:
+            kind, value = await relay.get()
+            if kind == 'end':
+                break
+            if kind == 'error':
+                raise value
+            yield value
+        await producer
+    finally:
+        # Stops the producer (and forwarder) if the stream was cancelled or abandoned
+        stop.set()
+        if semaphore is not None:
+            semaphore.release()
@@ -0,0 +1,201 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Hourly Energy Balance Auditor
+
+Checks that every hour of a simulation balances. The battery power is reconstructed from the
+change in state of charge, and the load, PV, generator, battery, excess and unsupplied powers are
+combined using the same converter efficiency conventions as chron_sim.run_sim. The residual of the
+balance should be zero in every hour; hours with a residual above the tolerance are reported.
+
+All calculations are whole-array operations, so whole runs (or ensembles of runs, with the hourly
+outputs stacked along leading axes) are audited at once.
+
+Main Functions
+--------------
+- battery_power: battery power (W) from the hourly state of charge
+- run_battery_power: battery power (W) of a run, for the battery model of the run
+- balance_residual: hourly energy balance residual (W)
+- audit: residuals, violating hours and battery energy totals of a run or ensemble
+- stack_runs: stacks the outputs of several runs into an ensemble
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+
+def battery_power(q, qmax, v_n, eff_chg=1.0, eff_dis=1.0):
+    """
+    Returns the average battery power in each hour from the change in state of charge
+
+    Inputs:
+        q           State of charge (%) at the start of the first hour and the end of every hour,
+                    array of shape (..., n_hours + 1)
+        qmax        Battery bank capacity (Ah), scalar or array of shape (..., 1)
+        v_n         Nominal battery voltage (V)
+        eff_chg     Charging efficiency of the battery model (per unit)
+        eff_dis     Discharging efficiency of the battery model (per unit)
+
+    Outputs:
+        P_b         Battery power at the battery terminals (W, positive for discharge), shape (..., n_hours)
+    """
+    q = np.asarray(q, dtype=float)
+    P_q = -np.diff(q, axis=-1) / 100 * np.asarray(qmax, dtype=float) * v_n
+    return np.where(P_q > 0, P_q * eff_dis, P_q / eff_chg)
+
+def run_battery_power(sim_out, batt_dict):
+    """Returns the hourly battery power (W, positive for discharge) of a run, for the battery model of the run"""
+    if batt_dict.get('model', 'kibam') == 'bucket':
+        return battery_power(sim_out['q'], sim_out['qmax'], batt_dict['v_dc'], batt_dict.get('eff_chg', 1.0), batt_dict.get('eff_dis', 1.0))
+    return battery_power(sim_out['q'], sim_out['qmax'], batt_dict['v_dc'])
+
+def _converter(x, eff):
+    """AC side power of the battery converter for DC side power x (positive for discharge)"""
+    return np.where(x > 0, x * eff, x / eff)
+
+def _battery_demand(P_ld, P_pv, pv_cpl, eff):
+    """DC side power the battery must supply to meet the net load (as in chron_sim.run_sim)"""
+    if pv_cpl == 'DC':
+        return P_ld / eff - P_pv
+    net = P_ld - P_pv
+    return np.where(net < 0, net * eff, net / eff)
+
+def balance_residual(sim_out, sys_dict, pv_dict, batt_dict, gen_dict):
+    """
+    Calculates the hourly energy balance residual of a simulation run (or ensemble)
+
+    The balance is formed for each topology and control mode with the conventions of
+    chron_sim.run_sim, e.g. for battery systems the unsupplied power is on the DC side of the
+    battery converter, and charge that the battery cannot absorb is reported as excess power.
+
+    Inputs:
+        sim_out     Dictionary of simulation outputs (as from chron_sim.run_sim), with hourly
+                    channels of shape (..., 8760), 'q' of shape (..., 8761) and 'qmax'
+        sys_dict, pv_dict, batt_dict, gen_dict   Input dictionaries of the run
+
+    Outputs:
+        residual    Hourly balance residual (W, supply less demand), shape (..., 8760)
+        P_b         Battery power from the state of charge (W, positive for discharge), or None
+    """
+    topo = sim_out['topo'][0]
+    P_ld = np.asarray(sim_out['P_ld'], dtype=float)
+    zeros = np.zeros(P_ld.shape)
+
+    def channel(name):
+        value = sim_out.get(name)
+        if value is None or len(value) == 0:
+            return zeros
+        return np.asarray(value, dtype=float)
+
+    P_pv = channel('P_pv')
+    P_gen = channel('P_gen')
+    P_gen_exc = channel('P_gen_exc')
+    P_uns = channel('P_uns')
+    P_pv_exc = channel('P_pv_exc')
+
+    if topo == 0:
+        return P_gen + P_uns - P_ld, None
+    if topo == 1:
+        return P_gen + P_pv - P_pv_exc + P_uns - P_ld, None
+
+    pv_cpl = pv_dict['pv_cpl']
+    eff = batt_dict['eff_conv']
+    P_b = run_battery_power(sim_out, batt_dict)
+
+    # Charge the battery could not absorb is reported as excess PV (or generator) power
+    x = P_b - P_pv_exc - P_gen_exc
+
+    if topo == 2:
+        i_b0 = _battery_demand(P_ld, P_pv, pv_cpl, eff)
+        if pv_cpl == 'DC':
+            # Net battery current passes through the converter efficiency again (as in run_sim)
+            i_b0 = i_b0 / eff
+        return x + P_uns - i_b0, P_b
+
+    ctrl_mode = sys_dict['ctrl_mode'] + 1
+    if ctrl_mode in [1, 2, 3]:
+        # Generator output is referred to the DC side through the charger (mode 1) or the
+        # bidirectional converter (modes 2 and 3), and through the charger when PV exceeds the load
+        i_b0 = _battery_demand(P_ld, P_pv, pv_cpl, eff)
+        g = np.where(i_b0 > 0, gen_dict['chg_eff'] if ctrl_mode == 1 else eff, gen_dict['chg_eff'])
+        return x + (P_gen + P_uns) * g - i_b0, P_b
+
+    # Control mode 4: AC side output of the PV and battery
+    x = P_b - P_pv_exc
+    if pv_cpl == 'DC':
+        P_s = (P_pv + x) * eff
+    else:
+        P_s = P_pv + _converter(x, eff)
+
+    # Inside the ramp control window, the generator output includes its excess output
+    t_set = batt_dict['t_set']
+    h = np.mod(np.arange(1, P_ld.shape[-1] + 1), 24)
+    ramp = (h >= t_set[0]) & (h < t_set[1]) & (P_ld > batt_dict['p_set'])
+    P_gen_ld = np.where(ramp, P_gen - P_gen_exc, P_gen)
+
+    return P_gen_ld + P_s + P_uns - P_ld, P_b
+
+def audit(sim_out, sys_dict, pv_dict, batt_dict, gen_dict, rtol=1e-6, atol=1e-3):
+    """
+    Audits the hourly energy balance of a simulation run (or ensemble)
+
+    Inputs:
+        sim_out     Dictionary of simulation outputs (see balance_residual)
+        sys_dict, pv_dict, batt_dict, gen_dict   Input dictionaries of the run
+        rtol        Relative tolerance (per unit of the hourly load)
+        atol        Absolute tolerance (W)
+
+    Outputs:
+        result      Dictionary of audit results:
+                        'ok'            True if every hour balances
+                        'residual'      Hourly balance residual (W), shape (..., 8760)
+                        'violations'    Tuple of index arrays of the violating hours (as from np.nonzero)
+                        'n_violations'  Number of violating hours
+                        'max_residual'  Largest absolute residual (W)
+                        'E_dis'         Battery energy discharged (kWh), shape (...)
+                        'E_chg'         Battery energy charged (kWh), shape (...)
+    """
+    residual, P_b = balance_residual(sim_out, sys_dict, pv_dict, batt_dict, gen_dict)
+    P_ld = np.asarray(sim_out['P_ld'], dtype=float)
+    bad = np.abs(residual) > atol + rtol * np.abs(P_ld)
+
+    if P_b is None:
+        P_b = np.zeros(residual.shape)
+
+    result = {
+        'ok'            : not bad.any(),
+        'residual'      : residual,
+        'violations'    : np.nonzero(bad),
+        'n_violations'  : int(np.count_nonzero(bad)),
+        'max_residual'  : float(np.max(np.abs(residual))),
+        'E_dis'         : np.sum(np.clip(P_b, 0, None), axis=-1) / 1000,
+        'E_chg'         : -np.sum(np.clip(P_b, None, 0), axis=-1) / 1000
+    }
+
+    return result
+
+def stack_runs(sim_outs):
+    """
+    Stacks the outputs of several runs of the same system into an ensemble for audit()
+
+    Inputs:
+        sim_outs    List of simulation output dictionaries
+
+    Outputs:
+        ensemble    Dictionary of outputs with hourly channels of shape (n_runs, 8760) and
+                    'qmax' of shape (n_runs, 1)
+    """
+    ensemble = {'topo' : sim_outs[0]['topo']}
+    for key in ['P_ld', 'G0', 'GT', 'P_pv', 'q', 'P_gen', 'P_gen_exc', 'P_uns', 'P_pv_exc']:
+        if len(sim_outs[0].get(key, [])) > 0:
+            ensemble[key] = np.array([sim_out[key] for sim_out in sim_outs], dtype=float)
+    if 'qmax' in sim_outs[0]:
+        ensemble['qmax'] = np.array([[sim_out['qmax']] for sim_out in sim_outs])
+
+    return ensemble
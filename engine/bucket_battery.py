@@ -0,0 +1,203 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Energy Bucket Battery Model
+
+A low-fidelity alternative to the kinetic battery model (KiBaM) for fast design screening.
+The battery is treated as a single charge reservoir with charge / discharge efficiencies
+and C-rate limits on the charge and discharge currents. No battery constants need to be
+fitted, so the model can be evaluated for many candidate designs at once.
+
+Main Functions
+--------------
+- capacity_step: calculates the battery charge at the next time step (same calling convention as
+                 kinetic_battery.capacity_step so it can be used as a drop-in replacement)
+- current_limits: calculates the maximum charge / discharge currents from the battery C-rates
+- simulate: runs the battery dominant dispatch (PV-battery and control modes 1-3) for a set of
+            candidate designs simultaneously
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+
+def current_limits(C_nom, n_batt, C_rate_chg, C_rate_dis):
+    """
+    Returns the maximum charging and discharging currents of the battery bank
+
+    Inputs:
+        C_nom       Nominal capacity of a single battery (Ah)
+        n_batt      Number of batteries
+        C_rate_chg  Maximum charge rate (as a fraction of nominal capacity per hour)
+        C_rate_dis  Maximum discharge rate (as a fraction of nominal capacity per hour)
+
+    Outputs:
+        ic_max      Maximum charging current (A)
+        id_max      Maximum discharging current (A)
+    """
+    ic_max = C_rate_chg * C_nom * n_batt
+    id_max = C_rate_dis * C_nom * n_batt
+
+    return ic_max, id_max
+
+def capacity_step(q1_0, q2_0, qmax, i, dt, eff_chg, eff_dis, ic_max, id_max):
+    """
+    Returns the battery charge for the next time step
+    Based on a simple energy reservoir ("bucket") model
+
+    Inputs:
+        q1_0    Charge at beginning of time step (Ah)
+        q2_0    Bound charge at beginning of time step (Ah) - always zero for the bucket model
+        qmax    Maximum amount of charge in battery (Ah)
+        i       Charge (-) or discharge (+) current of battery (A)
+        dt      Length of time step (hours)
+        eff_chg Charging efficiency (per unit)
+        eff_dis Discharging efficiency (per unit)
+        ic_max  Maximum charging current (A)
+        id_max  Maximum discharging current (A)
+
+    Outputs:
+        q1      Charge at next time step (Ah)
+        q2      Bound charge at next time step (Ah) - always zero for the bucket model
+        i_w     Wasted current if max charging limit reached (A)
+    """
+    i_w = 0
+
+    if i > 0:
+        # Discharge limited by C-rate and the charge left in the battery
+        i = min(i, id_max, q1_0 * eff_dis / dt)
+        q1 = q1_0 - i * dt / eff_dis
+    else:
+        # Charge limited by C-rate and the headroom left in the battery
+        i_c = max(i, -ic_max, -(qmax - q1_0) / (eff_chg * dt))
+        i_w = i_c - i
+        q1 = q1_0 - i_c * eff_chg * dt
+
+    return q1, q2_0, i_w
+
+def simulate(P_ld, P_pv, design, ctrl_mode):
+    """
+    Runs the battery dominant dispatch strategy with the bucket battery model for a set of candidate
+    designs at once. The logic follows the PV-battery topology and control modes 1-3 of the
+    PV-battery-generator topology in chron_sim.run_sim. Because the battery charge is path dependent
+    the hourly recursion cannot be collapsed into a cumulative sum, so instead every hour is evaluated
+    for all candidates in a single array operation.
+
+    Inputs:
+        P_ld        Hourly load demand (W), array of length 8760
+        P_pv        Hourly PV output (W), array of shape (n_cand, 8760)
+        design      Dictionary of candidate design parameters, each an array of length n_cand:
+                        'qmax', 'ic_max', 'id_max'  Battery capacity (Ah) and current limits (A)
+                        'Pg_tot', 'Pg_min'          Generator capacity and minimum loading (W), zero if no generator
+                    and scalar parameters shared by all candidates:
+                        'v_n', 'eff_conv', 'chg_eff', 'eff_chg', 'eff_dis', 'SOC_0', 'SOC_min', 'SOC_cyc', 'pv_cpl'
+        ctrl_mode   Control mode (1, 2 or 3) for the PV-battery-generator topology, or 0 for PV-battery
+
+    Outputs:
+        sim_out     Dictionary of simulation outputs, each an array of shape (n_cand, 8760) except
+                    'q', which has shape (n_cand, 8761)
+    """
+    P_ld = np.asarray(P_ld, dtype=float)
+    P_pv = np.atleast_2d(np.asarray(P_pv, dtype=float))
+    n_cand, n_hours = P_pv.shape
+
+    qmax = np.asarray(design['qmax'], dtype=float)
+    ic_max = np.asarray(design['ic_max'], dtype=float)
+    id_max = np.asarray(design['id_max'], dtype=float)
+    Pg_tot = np.asarray(design['Pg_tot'], dtype=float) * np.ones(n_cand)
+    Pg_min = np.asarray(design['Pg_min'], dtype=float) * np.ones(n_cand)
+    v_n = design['v_n']
+    eff_conv = design['eff_conv']
+    chg_eff = design['chg_eff']
+    eff_chg = design['eff_chg']
+    eff_dis = design['eff_dis']
+    SOC_min = design['SOC_min']
+    SOC_cyc = design['SOC_cyc']
+
+    # Net battery current for every candidate and hour (positive current denotes battery discharge)
+    if design['pv_cpl'] == 'DC':
+        i_net = P_ld / (v_n * eff_conv) - P_pv / v_n
+        if ctrl_mode == 0:
+            # PV-battery topology also applies the converter loss to the net DC current
+            i_net = i_net / eff_conv
+    else:
+        i_l = (P_ld - P_pv) / v_n
+        i_net = np.where(i_l < 0, i_l * eff_conv, i_l / eff_conv)
+
+    # Generator to battery conversion efficiency (DC coupled genset in control mode 1)
+    if ctrl_mode == 1:
+        gen_eff = chg_eff
+    else:
+        gen_eff = eff_conv
+
+    q_out = np.zeros((n_cand, n_hours + 1))
+    P_gen = np.zeros((n_cand, n_hours))
+    P_gen_exc = np.zeros((n_cand, n_hours))
+    P_uns = np.zeros((n_cand, n_hours))
+    P_pv_exc = np.zeros((n_cand, n_hours))
+
+    # Initial charge is assumed to be qmax (as for chron_sim.run_sim)
+    q = qmax.copy()
+    soc = np.ones(n_cand) * design['SOC_0']
+    cyc_charge = np.zeros(n_cand, dtype=bool)
+    q_out[:, 0] = soc
+
+    for t in range(n_hours):
+        i_b = i_net[:, t]
+
+        if ctrl_mode == 0:
+            # PV-battery: no further discharge below minimum SOC
+            low = (soc < SOC_min) & (i_b > 0)
+            P_uns[low, t] = i_b[low] * v_n
+            i_b = np.where(low, 0, i_b)
+            gen_on = np.zeros(n_cand, dtype=bool)
+        else:
+            gen_on = (soc < SOC_min) | cyc_charge
+
+            # Energy to be supplied by the generator when PV is inadequate
+            e_g = np.where(i_b > 0, i_b * v_n / gen_eff, 0)
+            over = gen_on & (i_b > 0) & (e_g > Pg_tot)
+            lf_low = gen_on & (i_b > 0) & ~over & (ctrl_mode == 3) & (e_g < Pg_min)
+            lf_norm = gen_on & (i_b > 0) & ~over & (ctrl_mode == 3) & ~lf_low
+            cyc = gen_on & ~over & ~lf_low & ~lf_norm
+
+            P_uns[over, t] = e_g[over] - Pg_tot[over]
+            P_gen[:, t] = np.where(over | cyc, Pg_tot, 0)
+            P_gen[lf_low, t] = Pg_min[lf_low]
+            P_gen[lf_norm, t] = e_g[lf_norm]
+
+            i_gen = np.where(i_b > 0, -(Pg_tot - e_g) * gen_eff / v_n, i_b - Pg_tot * chg_eff / v_n)
+            i_b = np.where(over | lf_norm, 0, i_b)
+            i_b = np.where(lf_low, -(Pg_min - e_g) * eff_conv / v_n, i_b)
+            i_b = np.where(cyc, i_gen, i_b)
+
+        # Energy bucket step for all candidates
+        i_d = np.minimum(np.minimum(np.clip(i_b, 0, None), id_max), q * eff_dis)
+        i_c = np.maximum(np.maximum(np.clip(i_b, None, 0), -ic_max), -(qmax - q) / eff_chg)
+        i_w = np.where(i_b < 0, i_c - i_b, 0)
+        q = q - i_d / eff_dis - i_c * eff_chg
+        soc = q / qmax * 100
+
+        # Wasted current is surplus generator output when the generator is online, otherwise surplus PV
+        P_gen_exc[gen_on, t] = i_w[gen_on] * v_n
+        P_pv_exc[~gen_on, t] = i_w[~gen_on] * v_n
+        q_out[:, t + 1] = soc
+
+        if ctrl_mode in [1, 2]:
+            cyc_charge = gen_on & (soc < SOC_cyc)
+
+    sim_out = {
+        'q'         : q_out,
+        'P_gen'     : P_gen,
+        'P_gen_exc' : P_gen_exc,
+        'P_uns'     : P_uns,
+        'P_pv_exc'  : P_pv_exc
+    }
+
+    return sim_out
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Checkpoint and Resume for Long Runs
+
+Simulation progress is written to an append-only binary journal on disk. Each record is a
+length-prefixed pickle frame, and records are buffered in memory and written in batches so that
+checkpointing does not slow the run down. A frame that was only partly written when a run crashed
+is ignored on reading, so a run can always resume from the last complete record.
+
+Main Functions
+--------------
+- Journal: batched, append-only journal writer
+- read_journal: reads all complete records from a journal
+- run_cases: runs a sweep of cases, skipping cases already completed in the journal
+- run_years: runs a multi-year simulation with periodic state checkpoints
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import os
+import pickle
+import struct
+import time
+import numpy as np
+
+from engine.chron_sim import generate_profiles, run_sim
+from engine.simulator import Simulator
+
+FRAME_HEADER = struct.Struct('<I')
+
+class Journal(object):
+    """Append-only journal of pickled records, written in batches"""
+
+    def __init__(self, path, batch=100, interval=30.0, sync=False):
+        """
+        Opens a journal for appending
+
+        Inputs:
+            path        Journal file name
+            batch       Number of buffered records that triggers a write
+            interval    Maximum time between writes (seconds)
+            sync        Force the data to disk (fsync) after every write
+        """
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.sync = sync
+        self.buffer = []
+        self.last_write = time.time()
+        self.fp = open(path, 'ab')
+
+    def append(self, record):
+        """Buffers a record, writing the buffer out if the batch size or interval is reached"""
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        self.buffer.append(FRAME_HEADER.pack(len(payload)) + payload)
+        if len(self.buffer) >= self.batch or time.time() - self.last_write > self.interval:
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered records to disk"""
+        if self.buffer:
+            self.fp.write(b''.join(self.buffer))
+            self.fp.flush()
+            if self.sync:
+                os.fsync(self.fp.fileno())
+            self.buffer = []
+        self.last_write = time.time()
+
+    def close(self):
+        """Flushes and closes the journal"""
+        self.flush()
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def read_journal(path):
+    """
+    Returns the list of complete records in a journal (an empty list if the journal does not exist)
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+
+    with open(path, 'rb') as fp:
+        data = fp.read()
+
+    pos = 0
+    while pos + FRAME_HEADER.size <= len(data):
+        (size,) = FRAME_HEADER.unpack_from(data, pos)
+        start = pos + FRAME_HEADER.size
+        if start + size > len(data):
+            # Incomplete frame at the end of the journal (interrupted write)
+            break
+        records.append(pickle.loads(data[start:start + size]))
+        pos = start + size
+
+    # Drop any incomplete frame so that new records are appended after the last complete one
+    if pos < len(data):
+        with open(path, 'r+b') as fp:
+            fp.truncate(pos)
+
+    return records
+
+def run_cases(cases, path, run_fn=run_sim, summarise=None, resume=True, batch=100, cache=None):
+    """
+    Runs a sweep of simulation cases with a journal of completed cases
+
+    Inputs:
+        cases       List of case dictionaries with keys 'id' (unique, picklable), 'inputs' (tuple of
+                    arguments for run_fn) and optionally 'seed' (random seed set before the run)
+        path        Journal file name
+        run_fn      Simulation function (default chron_sim.run_sim)
+        summarise   Optional function applied to each result before it is journalled and returned
+                    (e.g. to keep only annual totals for large sweeps)
+        resume      Skip cases already completed in an existing journal (otherwise the journal is restarted)
+        batch       Number of completed cases buffered before each journal write
+        cache       Optional result_cache.ResultCache for memoising seeded runs
+
+    Outputs:
+        results     Dictionary of results keyed by case id
+    """
+    results = {}
+    if resume:
+        for record in read_journal(path):
+            if record[0] == 'case':
+                results[record[1]] = record[2]
+    elif os.path.exists(path):
+        os.remove(path)
+
+    with Journal(path, batch=batch) as journal:
+        for case in cases:
+            if case['id'] in results:
+                continue
+            if cache is not None:
+                result, hit = cache.call(run_fn, case['inputs'], case.get('seed'))
+            else:
+                if case.get('seed') is not None:
+                    np.random.seed(case['seed'])
+                result = run_fn(*case['inputs'])
+            if summarise is not None:
+                result = summarise(result)
+            results[case['id']] = result
+            journal.append(('case', case['id'], result))
+
+    return results
+
+def run_years(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, n_years, path, seed=0, every=720, resume=True, batch=12):
+    """
+    Runs a multi-year simulation (with new load and solar data generated for each year) and
+    checkpoints the simulator state every few hours
+
+    Inputs:
+        sys_dict, pv_dict, batt_dict, gen_dict, load_dict   Input dictionaries (as for chron_sim.run_sim)
+        n_years     Number of years to simulate
+        path        Journal file name
+        seed        Random seed for the first year
+        every       Checkpoint interval (hours)
+        resume      Resume from the last checkpoint in an existing journal (otherwise the journal is restarted)
+        batch       Number of checkpoints buffered before each journal write
+
+    Outputs:
+        sim_out     Dictionary of hourly outputs over all years ('P_ld', 'P_pv', 'P_gen', 'P_gen_exc',
+                    'P_uns', 'P_pv_exc' and 'q', the state of charge at the end of each hour)
+    """
+    channels = ['P_ld', 'P_pv', 'P_gen', 'P_gen_exc', 'P_uns', 'P_pv_exc', 'q']
+    sim = Simulator(sys_dict, pv_dict, batt_dict, gen_dict)
+
+    # Each checkpoint holds the hourly outputs since the previous checkpoint, the simulator state
+    # and the random number generator state at the start of the year
+    chunks = []
+    year, hour = 0, 0
+    np.random.seed(seed)
+    rng_state = np.random.get_state()
+    if resume:
+        for record in read_journal(path):
+            if record[0] == 'state':
+                year, hour, state, rng_state, chunk = record[1:]
+                sim.restore(state)
+                chunks.append(chunk)
+    elif os.path.exists(path):
+        os.remove(path)
+
+    with Journal(path, batch=batch) as journal:
+        while year < n_years:
+            # Regenerate this year's data from the random state at the start of the year
+            np.random.set_state(rng_state)
+            profiles = generate_profiles(sys_dict, pv_dict, load_dict)
+            P_ld = profiles['P_ld']
+            P_pv = profiles.get('P_pv', np.zeros(len(P_ld)))
+            n_hours = len(P_ld)
+
+            while hour < n_hours:
+                h_end = min(hour + every, n_hours)
+                out = np.array([sim.step(P_ld[i], P_pv[i]) for i in range(hour, h_end)])
+                chunk = np.column_stack([P_ld[hour:h_end], P_pv[hour:h_end], out])
+                chunks.append(chunk)
+                hour = h_end
+
+                if hour == n_hours:
+                    year, hour = year + 1, 0
+                    rng_state = np.random.get_state()
+                journal.append(('state', year, hour, sim.snapshot(), rng_state, chunk))
+                if hour == 0:
+                    break
+
+    data = np.concatenate(chunks) if chunks else np.zeros((0, len(channels)))
+    sim_out = {channels[j] : data[:,j] for j in range(len(channels))}
+
+    return sim_out
@@ -12,14 +12,220 @@ Author: Julius Susanto
 Last edited: January 2018
 """
 
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 import numpy as np
 import matplotlib.pyplot as plt
 
 import engine.kinetic_battery as kb
+import engine.bucket_battery as bb
 import engine.synth_solar as synth_solar
 import engine.load_model as load_model
+import engine.weather as weather_file
+import engine.pv_power as pv_power
 
-def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
+# Engine version (change whenever simulation results change, so that cached results are invalidated)
+ENGINE_VERSION = '1.2'
+
+@contextmanager
+def _phase(perf, name):
+    """Adds the time spent in a block to perf['time'][name] (does nothing if perf is None)"""
+    if perf is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        perf['time'][name] = perf['time'].get(name, 0) + time.perf_counter() - t0
+
+def _counted(batt_step, counts):
+    """Wraps a battery time step function to count the number of steps in counts['batt_steps']"""
+    counts['batt_steps'] = 0
+    def step(q1_0, q2_0, k, c, qmax, i, dt):
+        counts['batt_steps'] += 1
+        return batt_step(q1_0, q2_0, k, c, qmax, i, dt)
+    return step
+
+def generate_profiles(sys_dict, pv_dict, load_dict, perf=None):
+    """
+    Generates the hourly load and solar PV profiles for one year
+    
+    Inputs: 
+        sys_dict    Dictionary of system design parameters
+        pv_dict     Dictionary of solar PV input parameters. If pv_dict['weather'] is a weather
+                    file name (or a dictionary from weather.read_weather), the irradiance and
+                    hourly temperature are taken from the weather file instead of being synthesised
+                    from the monthly 'Ktm' and 'T_amb' (which may also be an hourly series).
+                    pv_dict['arrays'] optionally lists PV sub-arrays, each a dictionary of the
+                    parameters that differ from pv_dict (e.g. 'P_stc', 'tilt', 'azimuth',
+                    'albedo', 'P_inv', 'inv_curve'; see pv_power.sub_arrays). The irradiance
+                    synthesis and the diffuse components are shared, and all orientations are
+                    transposed at once.
+        load_dict   Dictionary of load input parameters
+        perf        Optional dictionary of phase timers and counters (see run_sim)
+    
+    Outputs:
+        profiles    Dictionary of hourly load demand 'P_ld' (W) and, for systems with solar PV,
+                    GHI 'G0', incident irradiance 'GT', ambient temperature 'T_amb' (deg C) and
+                    PV array output 'P_pv' (W). With sub-arrays, 'P_pv' is the total output, 'GT'
+                    is the capacity weighted mean incident irradiance and 'GT_arrays' and
+                    'P_pv_arrays' hold the series of each sub-array (shape (n_arrays, 8760)).
+    """
+    is_pv = sys_dict['is_pv']
+    lat = sys_dict['lat']
+    
+    # Unpack load data dictionary
+    l_sum = load_dict['l_sum']
+    l_win = load_dict['l_win']
+    sigma_s = load_dict['sigma_s']
+    sigma_w = load_dict['sigma_w']
+    
+    # Generate hourly load data (in W) for one year
+    if lat < 0:
+        hemi = 'South'
+    else:
+        hemi = 'North'
+    with _phase(perf, 'load_model'):
+        P_ld = load_model.create_loads(l_sum, l_win, sigma_s, sigma_w, hemi) * 1000
+    profiles = {'P_ld' : P_ld}
+    
+    if is_pv:
+        # Unpack PV system data dictionary
+        Ktm = pv_dict['Ktm']
+        T_amb = pv_dict['T_amb']
+        tilt = pv_dict['tilt']
+        azimuth = pv_dict['azimuth']
+        albedo = pv_dict['albedo']
+        
+        # Parameters of each PV sub-array (the sub-array entries override pv_dict)
+        arrays = pv_power.sub_arrays(pv_dict)
+        if arrays:
+            tilt = np.array([array['tilt'] for array in arrays], dtype=float)
+            azimuth = np.array([array['azimuth'] for array in arrays], dtype=float)
+            albedo = np.array([array['albedo'] for array in arrays], dtype=float)
+        
+        weather = pv_dict.get('weather')
+        if weather is not None:
+            # Measured irradiance and hourly temperature from a weather file
+            with _phase(perf, 'weather_file'):
+                if isinstance(weather, str):
+                    weather = weather_file.read_weather(weather)
+            with _phase(perf, 'transposition'):
+                G0 = weather['GHI']
+                GT = weather_file.transpose_HDKR(G0, weather['DHI'], lat, tilt, azimuth, albedo)
+            T_amb = weather['T_amb']
+        else:
+            # Generate hourly data for solar radiation and clearness indices for one year
+            with _phase(perf, 'solar_synthesis'):
+                G0, Kt = synth_solar.Aguiar_hourly_G0(Ktm, lat, None if perf is None else perf['counts'])
+            with _phase(perf, 'transposition'):
+                GT = synth_solar.incident_HDKR(G0, Kt, lat, tilt, azimuth, albedo)
+        
+        # PV array output for every hour of the year
+        with _phase(perf, 'pv_power'):
+            if arrays:
+                P_pv_arrays = np.array([pv_power.pv_power(GT[j], T_amb, array) for j, array in enumerate(arrays)])
+                P_stc = np.array([array['P_stc'] for array in arrays], dtype=float)
+                profiles['GT_arrays'] = GT
+                profiles['P_pv_arrays'] = P_pv_arrays
+                GT = np.dot(P_stc, GT) / P_stc.sum() if P_stc.sum() > 0 else GT.mean(axis=0)
+                P_pv = P_pv_arrays.sum(axis=0)
+            else:
+                P_pv = pv_power.pv_power(GT, T_amb, pv_dict)
+        
+        profiles['G0'] = G0
+        profiles['GT'] = GT
+        profiles['P_pv'] = P_pv
+        profiles['T_amb'] = pv_power.hourly_temperature(T_amb, len(G0))
+    
+    return profiles
+
+def battery_constants(I, T, n_batt):
+    """
+    Returns the kinetic battery model constants for a battery bank (see fit_battery_constants).
+    The fit is deterministic, so it is memoised for each set of inputs (per process).
+    """
+    return _cached_constants(tuple(np.ravel(I).tolist()), tuple(np.ravel(T).tolist()), n_batt)
+
+def fit_battery_constants(I, T, n_batt):
+    """
+    Estimates the kinetic battery model constants for a battery bank
+    
+    Inputs: 
+        I           Vector of discharge currents for a single battery (A)
+        T           Vector of discharge times associated with I (hours)
+        n_batt      Number of batteries
+    
+    Outputs:
+        k           Battery rate constant
+        c           Battery capacity ratio
+        qmax        Maximum Ah capacity of the battery bank
+        batt_iter   Number of least squares iterations
+    """
+    x0 = [0.6, 0.4, 650]        
+    [x, conv, batt_iter, err] = kb.estimate_constants(x0, np.array(I)*n_batt, T, 1, 20)
+    if not err < 999:
+        # Fit failed for the whole bank, so fit a single battery and scale its capacity
+        # (the rate constant and capacity ratio do not depend on the number of batteries)
+        [x, conv, batt_iter, err] = kb.estimate_constants(x0, np.array(I), T, 1, 20)
+        x = [x[0], x[1], x[2] * n_batt]
+    if err < 999:
+        k = x[0]        # Rate constant 
+        c = x[1]        # Capacity ratio 
+        qmax = x[2]     # Maximimum Ah capacity
+    else:
+        raise SystemExit  
+    
+    return k, c, qmax, batt_iter
+
+_cached_constants = lru_cache(maxsize=32)(fit_battery_constants)
+
+def battery_model(batt_dict, perf=None):
+    """
+    Sets up the battery model selected by batt_dict['model'] ('kibam' by default, or 'bucket')
+    
+    Inputs: 
+        batt_dict   Dictionary of battery input parameters
+        perf        Optional dictionary of phase timers and counters (see run_sim)
+    
+    Outputs:
+        k           Battery rate constant
+        c           Battery capacity ratio
+        qmax        Maximum Ah capacity of the battery bank
+        batt_step   Time step function with the calling convention of kinetic_battery.capacity_step
+    """
+    n_batt = batt_dict['n_batt']
+    
+    if batt_dict.get('model', 'kibam') == 'bucket':
+        # Energy bucket model: all charge is available and no battery constants need to be fitted
+        C_nom = batt_dict['C_nom']
+        eff_chg = batt_dict.get('eff_chg', 1.0)
+        eff_dis = batt_dict.get('eff_dis', 1.0)
+        ic_max, id_max = bb.current_limits(C_nom, n_batt, batt_dict.get('C_rate_chg', 0.2), batt_dict.get('C_rate_dis', 1.0))
+        k = 0
+        c = 1.0
+        qmax = C_nom * n_batt
+        
+        def batt_step(q1_0, q2_0, k, c, qmax, i, dt):
+            return bb.capacity_step(q1_0, q2_0, qmax, i, dt, eff_chg, eff_dis, ic_max, id_max)
+    else:
+        # Estimate battery constants
+        hits = _cached_constants.cache_info().hits
+        with _phase(perf, 'battery_fit'):
+            k, c, qmax, batt_iter = battery_constants(batt_dict['I'], batt_dict['T'], n_batt)
+        if perf is not None:
+            # No fit is run when the constants come from the memoised fit of an earlier run
+            cached = _cached_constants.cache_info().hits > hits
+            perf['counts']['batt_iter'] = 0 if cached else batt_iter
+            perf['counts']['batt_fit_cached'] = int(cached)
+        
+        batt_step = kb.capacity_step
+    
+    return k, c, qmax, batt_step
+
+def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, profiles=None):
     """
     Runs a chronological hybrid power system simulation 
     
@@ -29,11 +235,26 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
         batt_dict   Dictionary of battery input parameters
         gen_dict    Dictionary of generator input parameters
         load_dict   Dictionary of load input parameters
+        profiles    Optional hourly profiles (as from generate_profiles) to simulate instead of
+                    generating new load and solar data, e.g. arrays shared between processes
+                    (see shared_data). The arrays are only read.
     
     Outputs:
         sim_out     Dictionary of simulation result outputs
+    
+    If sys_dict['perf'] is True, sim_out['perf'] holds the time spent in each phase of the run
+    (perf['time'], in seconds) and hot path counters (perf['counts']): battery model steps
+    'batt_steps', generator cycle charging hours 'cyc_charge_hours', battery constant fitting
+    iterations 'batt_iter' (0 when 'batt_fit_cached' is 1, i.e. the constants were memoised by an
+    earlier run in the same process) and rejected clearness index samples 'kt_retries'.
     """
     
+    # Performance instrumentation (disabled by default)
+    perf = None
+    if sys_dict.get('perf', False):
+        perf = {'time' : {}, 'counts' : {'kt_retries' : 0}}
+        t_start = time.perf_counter()
+    
     # Initialise simulation output dictionary
     sim_out = {
         'topo'          : '',           # Hybrid system topology
@@ -56,59 +277,19 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
     is_batt = sys_dict['is_batt']
     is_gen = sys_dict['is_gen']
     ctrl_mode = sys_dict['ctrl_mode'] + 1
-    lat = sys_dict['lat']
     
-    # Unpack load data dictionary
-    l_sum = load_dict['l_sum']
-    l_win = load_dict['l_win']
-    sigma_s = load_dict['sigma_s']
-    sigma_w = load_dict['sigma_w']
-    
-    # Generate hourly load data (in W) for one year
-    if lat < 0:
-        hemi = 'South'
-    else:
-        hemi = 'North'
-    P_ld = load_model.create_loads(l_sum, l_win, sigma_s, sigma_w, hemi) * 1000
+    # Generate hourly load and solar PV data for one year
+    if profiles is None:
+        profiles = generate_profiles(sys_dict, pv_dict, load_dict, perf)
+    P_ld = profiles['P_ld']
     sim_out['P_ld'] = P_ld
     
     if is_pv:
-        # Unpack PV system data dictionary
-        Ktm = pv_dict['Ktm']
-        T_amb = pv_dict['T_amb']
-        k_e = pv_dict['k_e']
-        k_m = pv_dict['k_m']
-        P_stc = pv_dict['P_stc']
-        P_inv = pv_dict['P_inv']
-        gamma = pv_dict['gamma']
-        eff_pv = pv_dict['eff_pv']
         pv_cpl = pv_dict['pv_cpl']
-        tilt = pv_dict['tilt']
-        azimuth = pv_dict['azimuth']
-        albedo = pv_dict['albedo']
-        
-        # Generate hourly data for solar radiation and clearness indices for one year
-        G0, Kt = synth_solar.Aguiar_hourly_G0(Ktm, lat)
-        GT = synth_solar.incident_HDKR(G0, Kt, lat, tilt, azimuth, albedo)
-        
-        # PV module temperature derating for whole year
-        # Effective cell temperature: temp_eff = temp_ambient + temp_STC (25 deg)
-        # Temperature derating = 1 - gamma * (temp_eff - temp_STC) = 1 - gamma * temp_ambient
-        k_t = []
-        days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-        for i in range(12):
-            k_ti = np.ones(days[i] * 24) - np.multiply(np.ones(days[i] * 24), gamma * T_amb[i])
-            k_t.extend(k_ti)
-
-        # PV array output for every hour of the year
-        P_d = np.multiply(np.array(k_t), P_stc * k_e * k_m / 1000)
-        P_pv = np.multiply(np.array(GT), P_d) * eff_pv          # PV output (including inverter/SCC efficiency)
-        # Limit PV output to inverter rating for AC coupled systems
-        if pv_cpl == 'AC':
-            P_pv = np.clip(P_pv, None, P_inv)
+        P_pv = profiles['P_pv']
         
-        sim_out['G0'] = G0
-        sim_out['GT'] = GT
+        sim_out['G0'] = profiles['G0']
+        sim_out['GT'] = profiles['GT']
         sim_out['P_pv'] = P_pv
         
     if is_gen:
@@ -126,8 +307,6 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
         # Unpack battery system data dictionary
         n_batt = batt_dict['n_batt']
         v_n = batt_dict['v_dc']
-        I = batt_dict['I']
-        T = batt_dict['T']
         SOC_min = batt_dict['SOC_min']
         SOC_cyc = batt_dict['SOC_cyc']
         SOC_0 = batt_dict['SOC_0']
@@ -135,25 +314,23 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
         p_set = batt_dict['p_set']
         t_set = batt_dict['t_set']
 
-        # Estimate battery constants
-        x0 = [0.6, 0.4, 650]        
-        [x, conv, batt_iter, err] = kb.estimate_constants(x0, np.array(I)*n_batt, T, 1, 20)
-        if err < 999:
-            k = x[0]        # Rate constant 
-            c = x[1]        # Capacity ratio 
-            qmax = x[2]     # Maximimum Ah capacity
-        else:
-            raise SystemExit  
+        # Battery model constants and time step function
+        k, c, qmax, batt_step = battery_model(batt_dict, perf)
+        if perf is not None:
+            batt_step = _counted(batt_step, perf['counts'])
         
         # Set battery initial conditions
         q0 = qmax               # Total initial charge (assumed to be qmax)
         q1_0 = qmax * c         # Available initial charge
         q2_0 = qmax * (1-c)     # Bound initial charge
         sim_out['q'] = [SOC_0]  # Initial state of charge (%)
+        sim_out['qmax'] = qmax  # Battery bank capacity (Ah), to convert SoC to energy
         
     ################################
     # Run chronological simulation #
     ################################
+    if perf is not None:
+        t_dispatch = time.perf_counter()
     
     ###########################
     # Generator only topology #
@@ -245,7 +422,7 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
             else:
                 # Battery can be charged or discharged       
                 # Calculate battery state of charge
-                q1, q2, i_w = kb.capacity_step(q1_0, q2_0, k, c, qmax, i, 1)
+                q1, q2, i_w = batt_step(q1_0, q2_0, k, c, qmax, i, 1)
                 q0 = q1 + q2
                 q1_0 = q1
                 q2_0 = q2
@@ -318,6 +495,7 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
                             i_b = 0
                         elif ctrl_mode == 3:
                             # Generator load-following mode (Control mode 3)
+                            sim_out['P_uns'].append(0)
                             if e_g < Pg_min:
                                 # Low load operation (battery charging with excess generator power)
                                 sim_out['P_gen'].append(Pg_min)
@@ -348,7 +526,7 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
                         i_b = i_b - Pg_tot * chg_eff / v_n
                     
                     # Calculate battery state of charge
-                    q1, q2, i_w = kb.capacity_step(q1_0, q2_0, k, c, qmax, i_b, 1)
+                    q1, q2, i_w = batt_step(q1_0, q2_0, k, c, qmax, i_b, 1)
                     q0 = q1 + q2
                     q1_0 = q1
                     q2_0 = q2
@@ -374,7 +552,7 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
                 else:
                     # Generator not in operation
                     # Calculate battery state of charge
-                    q1, q2, i_w = kb.capacity_step(q1_0, q2_0, k, c, qmax, i_b, 1)
+                    q1, q2, i_w = batt_step(q1_0, q2_0, k, c, qmax, i_b, 1)
                     q0 = q1 + q2
                     q1_0 = q1
                     q2_0 = q2
@@ -457,7 +635,7 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
                     sim_out['P_uns'].append(P_uns)
                     
                     # Calculate battery state of charge
-                    q1, q2, i_w = kb.capacity_step(q1_0, q2_0, k, c, qmax, i_b, 1)
+                    q1, q2, i_w = batt_step(q1_0, q2_0, k, c, qmax, i_b, 1)
                     q0 = q1 + q2
                     q1_0 = q1
                     q2_0 = q2
@@ -516,7 +694,7 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
                         i_b = -pv_exc / v_n * eff_conv
                     
                     # Calculate battery state of charge
-                    q1, q2, i_w = kb.capacity_step(q1_0, q2_0, k, c, qmax, i_b, 1)
+                    q1, q2, i_w = batt_step(q1_0, q2_0, k, c, qmax, i_b, 1)
                     q0 = q1 + q2
                     q1_0 = q1
                     q2_0 = q2
@@ -539,5 +717,17 @@ def run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
         # by the PV system. The genset does not charge the battery.
         ##############################################################################################################
             pass
+    
+    if perf is not None:
+        perf['time']['dispatch'] = time.perf_counter() - t_dispatch
+        perf['time']['total'] = time.perf_counter() - t_start
+        perf['counts'].setdefault('batt_steps', 0)
+        
+        # Generator runs in cycle charging only in control modes 1 and 2
+        if sim_out['topo'][0] == 3 and ctrl_mode in [1, 2]:
+            perf['counts']['cyc_charge_hours'] = int(np.count_nonzero(sim_out['P_gen']))
+        else:
+            perf['counts']['cyc_charge_hours'] = 0
+        sim_out['perf'] = perf
         
     return sim_out
\ No newline at end of file
@@ -0,0 +1,175 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Fuel-Optimal Dispatch by Dynamic Programming
+
+Solves the annual PV-battery-generator dispatch problem by backward dynamic programming over a
+discretised battery state of charge grid. The result is a benchmark for the rule-based control
+modes in chron_sim.run_sim, i.e. the lowest fuel use achievable with the same load, PV output,
+generator limits and battery capacity.
+
+Because the SOC grid is uniform, the cost of a transition only depends on the change in battery
+energy. The stage costs of every possible transition are therefore computed for all hours of the
+year in a single array operation, and each backward step is a vectorised minimum over all grid
+points and transitions.
+
+Main Functions
+--------------
+- optimal_dispatch: fuel-optimal schedule for given hourly load and PV output
+- run_dp: generates the load and solar data, then solves the fuel-optimal schedule
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+
+import engine.bucket_battery as bb
+from engine.chron_sim import generate_profiles, battery_constants
+
+def optimal_dispatch(P_ld, P_pv, sys_dict, pv_dict, batt_dict, gen_dict, n_soc=101, uns_penalty=10.0):
+    """
+    Solves the fuel-optimal dispatch schedule by backward dynamic programming
+
+    Inputs:
+        P_ld        Hourly load demand (W)
+        P_pv        Hourly PV output (W)
+        sys_dict    Dictionary of system design parameters
+        pv_dict     Dictionary of solar PV input parameters
+        batt_dict   Dictionary of battery input parameters
+        gen_dict    Dictionary of generator input parameters
+        n_soc       Number of battery state of charge grid points between SOC_min and 100%
+        uns_penalty Cost of unsupplied energy (litres of fuel per kWh)
+
+    Outputs:
+        sim_out     Dictionary of simulation result outputs (same channels as chron_sim.run_sim),
+                    plus the annual fuel use 'fuel' (litres)
+    """
+    P_ld = np.asarray(P_ld, dtype=float)
+    P_pv = np.asarray(P_pv, dtype=float)
+    n_hours = len(P_ld)
+
+    # Generator limits (as for chron_sim.run_sim)
+    if sys_dict['is_gen']:
+        Pg_tot = gen_dict['n_gen'] * gen_dict['P_gen'] * 1000
+        Pg_min = gen_dict['n_gen'] * gen_dict['l_min'] * gen_dict['P_gen'] * 1000
+        e_f = gen_dict['e_f']
+    else:
+        Pg_tot = 0
+        Pg_min = 0
+        e_f = 0
+
+    # Battery limits
+    v_n = batt_dict['v_dc']
+    eff_conv = batt_dict['eff_conv']
+    n_batt = batt_dict['n_batt']
+    if batt_dict.get('model', 'kibam') == 'bucket':
+        qmax = batt_dict['C_nom'] * n_batt
+    else:
+        k, c, qmax, batt_iter = battery_constants(batt_dict['I'], batt_dict['T'], n_batt)
+    ic_max, id_max = bb.current_limits(batt_dict['C_nom'], n_batt, batt_dict.get('C_rate_chg', 0.2), batt_dict.get('C_rate_dis', 1.0))
+
+    # Battery energy grid (Wh) and all possible energy changes between grid points
+    E_cap = qmax * v_n
+    E = np.linspace(batt_dict['SOC_min'] / 100 * E_cap, E_cap, n_soc)
+    dE_step = E[1] - E[0]
+    offsets = np.arange(-(n_soc - 1), n_soc)
+    dE = offsets * dE_step
+
+    # Net power delivered to the AC bus from the battery / DC side for every hour and energy change
+    if pv_dict['pv_cpl'] == 'DC':
+        d = P_pv[:, None] - dE[None, :]
+        P_rem = P_ld[:, None] * np.ones(len(dE))
+    else:
+        d = -dE[None, :] * np.ones((n_hours, 1))
+        P_rem = (P_ld - P_pv)[:, None]
+    ac = np.where(d >= 0, d * eff_conv, d / eff_conv)
+
+    # Residual load the generator must cover, and the resulting generator dispatch
+    r = P_rem - ac
+    gen_on = r > 0
+    P_gen_out = np.where(gen_on, np.clip(r, Pg_min, Pg_tot), 0)
+    P_uns = np.where(gen_on, np.clip(r - Pg_tot, 0, None), 0)
+
+    # Stage cost of every transition in every hour (fuel and penalised unsupplied energy)
+    cost = (e_f * P_gen_out + uns_penalty * P_uns) / 1000
+    cost[:, (dE > ic_max * v_n) | (dE < -id_max * v_n)] = np.inf
+
+    # Index of the next grid point for each (grid point, transition), pointing at an infinite
+    # value cost for transitions that leave the grid
+    idx = np.arange(n_soc)[:, None] + offsets[None, :]
+    idx = np.where((idx >= 0) & (idx < n_soc), idx, n_soc)
+
+    # Terminal value: fuel needed to restore the initial state of charge
+    E_0 = batt_dict['SOC_0'] / 100 * E_cap
+    V = np.append(e_f * np.clip(E_0 - E, 0, None) / (eff_conv * 1000), np.inf)
+
+    # Backward pass
+    policy = np.zeros((n_hours, n_soc), dtype=np.int16)
+    for t in range(n_hours - 1, -1, -1):
+        Q = cost[t][None, :] + V[idx]
+        policy[t] = np.argmin(Q, axis=1)
+        V[:n_soc] = Q[np.arange(n_soc), policy[t]]
+
+    # Forward pass from the grid point closest to the initial state of charge
+    i = int(np.argmin(np.abs(E - E_0)))
+    k_opt = np.zeros(n_hours, dtype=int)
+    states = np.zeros(n_hours + 1, dtype=int)
+    states[0] = i
+    for t in range(n_hours):
+        k_opt[t] = policy[t, i]
+        i = idx[i, k_opt[t]]
+        states[t + 1] = i
+
+    hours = np.arange(n_hours)
+    r_opt = r[hours, k_opt]
+    P_gen_tot = P_gen_out[hours, k_opt]
+
+    sim_out = {
+        'P_ld'      : P_ld,
+        'P_pv'      : P_pv,
+        'q'         : E[states] / E_cap * 100,
+        'P_gen'     : np.clip(P_gen_tot, None, np.clip(r_opt, 0, None)),
+        'P_gen_exc' : np.clip(P_gen_tot - r_opt, 0, None) * gen_on[hours, k_opt],
+        'P_uns'     : P_uns[hours, k_opt],
+        'P_pv_exc'  : np.clip(-r_opt, 0, None),
+        'fuel'      : e_f * np.sum(P_gen_tot) / 1000
+    }
+
+    return sim_out
+
+def run_dp(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, n_soc=101, uns_penalty=10.0):
+    """
+    Runs a fuel-optimal hybrid power system simulation (same inputs and outputs as chron_sim.run_sim)
+
+    Inputs:
+        sys_dict    Dictionary of system design parameters
+        pv_dict     Dictionary of solar PV input parameters
+        batt_dict   Dictionary of battery input parameters
+        gen_dict    Dictionary of generator input parameters
+        load_dict   Dictionary of load input parameters
+        n_soc       Number of battery state of charge grid points
+        uns_penalty Cost of unsupplied energy (litres of fuel per kWh)
+
+    Outputs:
+        sim_out     Dictionary of simulation result outputs
+    """
+    if not sys_dict['is_pv'] or not sys_dict['is_batt']:
+        raise ValueError('Optimal dispatch requires a PV-battery or PV-battery-generator topology')
+
+    profiles = generate_profiles(sys_dict, pv_dict, load_dict)
+    sim_out = optimal_dispatch(profiles['P_ld'], profiles['P_pv'], sys_dict, pv_dict, batt_dict, gen_dict, n_soc, uns_penalty)
+
+    if sys_dict['is_gen']:
+        sim_out['topo'] = (3, 'Solar PV-Battery-Generator (fuel-optimal dispatch)')
+    else:
+        sim_out['topo'] = (2, 'Solar PV-Battery (optimal dispatch)')
+    sim_out['G0'] = profiles['G0']
+    sim_out['GT'] = profiles['GT']
+
+    return sim_out
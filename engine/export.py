@@ -0,0 +1,293 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Streaming Results Export
+
+Writes hourly simulation results to CSV or to a compact columnar binary file as they are produced,
+so that multi-year runs and sweeps can be exported without holding all of the results in memory.
+Results are buffered and written in blocks of rows. Every row has the case id, the hour of the run
+and one column per output channel.
+
+The columnar file is a sequence of row groups. Each group is a length-prefixed JSON header
+(number of rows, columns, data type, case id and first hour) followed by the data of each column in
+turn, so single columns can be read without reading the rest of the file. As for checkpoint
+journals, a row group that was only partly written is ignored on reading.
+
+Main Functions
+--------------
+- hourly_channels: hourly channels of a run_sim result (or run_sim_stream chunk) for export
+- CSVExporter: buffered CSV writer
+- ColumnarExporter: buffered columnar binary writer
+- export_run: exports a run_sim result
+- export_stream: exports the chunks of run_sim_stream as they are produced
+- export_cases: runs a sweep of cases and exports each result as soon as it is calculated
+- read_columnar: reads (selected columns of) a columnar binary file
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import abc
+import json
+import os
+import struct
+import numpy as np
+
+from engine.chron_sim import run_sim
+
+CHANNELS = ['P_ld', 'G0', 'GT', 'P_pv', 'P_gen', 'P_gen_exc', 'P_uns', 'P_pv_exc', 'q']
+MAGIC = b'CTRCOL1\n'
+GROUP_HEADER = struct.Struct('<I')
+
+def hourly_channels(sim_out):
+    """
+    Returns the hourly channels of a simulation result for export
+
+    The state of charge of a run_sim result (which starts with the initial state of charge) is
+    exported as the state of charge at the end of each hour, as in the chunks of run_sim_stream.
+    Channels that are empty or not produced for the topology are left out.
+
+    Inputs:
+        sim_out     Dictionary of outputs (as from chron_sim.run_sim or a simulator.run_sim_stream chunk)
+
+    Outputs:
+        channels    Ordered list of (channel name, hourly array) tuples
+    """
+    n_hours = len(sim_out['P_ld'])
+    channels = []
+    for key in CHANNELS:
+        values = sim_out.get(key)
+        if values is None or len(values) == 0:
+            continue
+        values = np.asarray(values, dtype=float)
+        if key == 'q' and len(values) == n_hours + 1:
+            values = values[1:]
+        channels.append((key, values))
+
+    return channels
+
+class Exporter(abc.ABC):
+    """Buffers hourly results and writes them out in blocks of rows (base class of the exporters)"""
+
+    def __init__(self, path, columns=None, buffer_rows=8760):
+        """
+        Opens an exporter
+
+        Inputs:
+            path        Output file name
+            columns     Channels to export (by default the channels of the first result written)
+            buffer_rows Number of buffered rows that triggers a write
+        """
+        self.path = path
+        self.columns = None if columns is None else list(columns)
+        self.buffer_rows = buffer_rows
+        self.buffer = []
+        self.n_buffered = 0
+        self.n_rows = 0
+        self.fp = open(path, 'wb')
+
+    def write(self, sim_out, case=0, start=None):
+        """
+        Buffers the hourly results of a run or chunk
+
+        Inputs:
+            sim_out     Dictionary of outputs (see hourly_channels)
+            case        Case id (written to every row)
+            start       Hour of the run at the first row (default the 'start' of a run_sim_stream
+                        chunk, or 0)
+        """
+        channels = dict(hourly_channels(sim_out))
+        if self.columns is None:
+            self.columns = [key for key in CHANNELS if key in channels]
+            self.write_header()
+        if start is None:
+            start = sim_out.get('start', 0)
+
+        # Channels the result does not have are exported as NaN
+        n_hours = len(sim_out['P_ld'])
+        block = np.full((n_hours, len(self.columns)), np.nan)
+        for j, key in enumerate(self.columns):
+            if key in channels:
+                block[:,j] = channels[key]
+
+        self.buffer.append((case, start, block))
+        self.n_buffered = self.n_buffered + n_hours
+        if self.n_buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered rows to disk"""
+        for case, start, block in self.buffer:
+            self.write_block(case, start, block)
+            self.n_rows = self.n_rows + len(block)
+        self.fp.flush()
+        self.buffer = []
+        self.n_buffered = 0
+
+    def write_header(self):
+        """Writes the file header (once the columns are known)"""
+        pass
+
+    @abc.abstractmethod
+    def write_block(self, case, start, block):
+        """Writes a block of rows"""
+
+    def close(self):
+        """Flushes and closes the file"""
+        self.flush()
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class CSVExporter(Exporter):
+    """Buffered CSV writer for hourly results"""
+
+    def __init__(self, path, columns=None, buffer_rows=8760, fmt='%.10g'):
+        """
+        Opens a CSV exporter (as for Exporter, with fmt the number format of the channels)
+        """
+        Exporter.__init__(self, path, columns, buffer_rows)
+        self.fmt = fmt
+        if self.columns is not None:
+            self.write_header()
+
+    def write_header(self):
+        self.fp.write((','.join(['case', 'hour'] + self.columns) + '\n').encode())
+
+    def write_block(self, case, start, block):
+        # The case id is written as part of the row format, so each block is formatted in one call
+        label = str(case).replace('"', '""').replace('%', '%%')
+        if ',' in label or '"' in label:
+            label = '"' + label + '"'
+        fmt = label + ',%d,' + ','.join([self.fmt] * block.shape[1])
+        hours = np.arange(start, start + len(block))
+        np.savetxt(self.fp, np.column_stack([hours, block]), fmt=fmt)
+
+class ColumnarExporter(Exporter):
+    """Buffered columnar binary writer for hourly results"""
+
+    def __init__(self, path, columns=None, buffer_rows=8760, dtype='float64'):
+        """
+        Opens a columnar exporter (as for Exporter, with dtype the data type of the channels, e.g.
+        'float32' to halve the file size)
+        """
+        Exporter.__init__(self, path, columns, buffer_rows)
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.fp.write(MAGIC)
+
+    def flush(self):
+        # Consecutive blocks of the same case are written as one row group
+        groups = []
+        for case, start, block in self.buffer:
+            if groups and groups[-1][0] == case and groups[-1][1] + groups[-1][2] == start:
+                groups[-1][3].append(block)
+                groups[-1][2] = groups[-1][2] + len(block)
+            else:
+                groups.append([case, start, len(block), [block]])
+        self.buffer = [(case, start, np.concatenate(blocks)) for case, start, n, blocks in groups]
+        Exporter.flush(self)
+
+    def write_block(self, case, start, block):
+        header = json.dumps({
+            'rows'      : len(block),
+            'columns'   : self.columns,
+            'dtype'     : self.dtype.str,
+            'case'      : case,
+            'start'     : int(start)
+        }).encode()
+        data = np.asarray(block.T, dtype=self.dtype, order='C')
+        self.fp.write(GROUP_HEADER.pack(len(header)) + header + data.tobytes())
+
+def export_run(sim_out, exporter, case=0):
+    """Exports the hourly results of a run_sim result"""
+    exporter.write(sim_out, case)
+
+def export_stream(chunks, exporter, case=0):
+    """
+    Exports the chunks of a run (e.g. simulator.run_sim_stream) as they are produced
+
+    Outputs:
+        n_hours     Number of hours exported
+    """
+    n_hours = 0
+    for chunk in chunks:
+        exporter.write(chunk, case)
+        n_hours = n_hours + len(chunk['P_ld'])
+
+    return n_hours
+
+def export_cases(cases, exporter, run_fn=run_sim):
+    """
+    Runs a sweep of simulation cases and exports each result as soon as it is calculated (the
+    results are not kept in memory)
+
+    Inputs:
+        cases       List of case dictionaries (as for checkpoint.run_cases) with keys 'id', 'inputs'
+                    and optionally 'seed'
+        exporter    CSVExporter or ColumnarExporter
+        run_fn      Simulation function (default chron_sim.run_sim)
+    """
+    for case in cases:
+        if case.get('seed') is not None:
+            np.random.seed(case['seed'])
+        exporter.write(run_fn(*case['inputs']), case['id'])
+
+def read_columnar(path, columns=None):
+    """
+    Reads a columnar binary file
+
+    Inputs:
+        path        File name
+        columns     Channels to read (all channels if None)
+
+    Outputs:
+        data        Dictionary of arrays over all rows: 'case' (case id of each row), 'hour' and
+                    one array per channel
+    """
+    groups = []
+    size = os.path.getsize(path)
+    with open(path, 'rb') as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError(path + ' is not a CENTAUR columnar results file')
+        pos = len(MAGIC)
+        while pos + GROUP_HEADER.size <= size:
+            (n,) = GROUP_HEADER.unpack(fp.read(GROUP_HEADER.size))
+            header = fp.read(n)
+            if len(header) < n:
+                break
+            header = json.loads(header.decode())
+            dtype = np.dtype(header['dtype'])
+            n_bytes = header['rows'] * dtype.itemsize
+            start = pos + GROUP_HEADER.size + n
+            if start + n_bytes * len(header['columns']) > size:
+                # Incomplete row group at the end of the file (interrupted write)
+                break
+
+            values = {}
+            for j, key in enumerate(header['columns']):
+                if columns is None or key in columns:
+                    fp.seek(start + j * n_bytes)
+                    values[key] = np.frombuffer(fp.read(n_bytes), dtype=dtype).astype(float)
+            groups.append((header, values))
+            pos = start + n_bytes * len(header['columns'])
+            fp.seek(pos)
+
+    if columns is None:
+        columns = groups[0][0]['columns'] if groups else []
+    data = {
+        'case'  : np.repeat([header['case'] for header, values in groups], [header['rows'] for header, values in groups]),
+        'hour'  : np.concatenate([np.arange(header['start'], header['start'] + header['rows']) for header, values in groups]) if groups else np.zeros(0, dtype=int)
+    }
+    for key in columns:
+        data[key] = np.concatenate([values.get(key, np.full(header['rows'], np.nan)) for header, values in groups]) if groups else np.zeros(0)
+
+    return data
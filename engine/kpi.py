@@ -0,0 +1,167 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Key Performance Indicators
+
+Energy, reliability, generator and battery metrics of a simulation run, calculated with whole-array
+operations. Hourly channels may have any leading axes (e.g. a stack of runs from a sweep, see
+audit.stack_runs), in which case every metric has the same leading axes.
+
+Main Functions
+--------------
+- run_lengths: longest run and number of runs of True values (e.g. outages, generator on periods)
+- monthly: monthly totals of an hourly channel
+- hour_of_day: hour of the day totals of an hourly channel
+- kpis: all metrics of a run or ensemble
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+
+import engine.audit as audit
+import engine.genset as genset
+
+DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+def run_lengths(mask):
+    """
+    Run-length encodes a boolean hourly series
+
+    Inputs:
+        mask        Boolean array of shape (..., n_hours)
+
+    Outputs:
+        longest     Length of the longest run of True values (hours), shape (...)
+        n_runs      Number of runs of True values, shape (...)
+    """
+    mask = np.asarray(mask, dtype=bool)
+    count = np.cumsum(mask, axis=-1)
+
+    # Hours since the start of the current run (count less the count at the last False hour)
+    reset = np.maximum.accumulate(np.where(mask, 0, count), axis=-1)
+    longest = np.max(count - reset, axis=-1) if mask.shape[-1] else np.zeros(mask.shape[:-1], dtype=int)
+
+    starts = mask.copy()
+    starts[..., 1:] = mask[..., 1:] & ~mask[..., :-1]
+    n_runs = np.sum(starts, axis=-1)
+
+    return longest, n_runs
+
+def monthly(P):
+    """Returns the monthly totals of an hourly channel of shape (..., 8760), shape (..., 12)"""
+    month_start = np.cumsum([0] + DAYS[:-1]) * 24
+    return np.add.reduceat(np.asarray(P, dtype=float), month_start, axis=-1)
+
+def hour_of_day(P):
+    """Returns the hour of the day totals of an hourly channel of shape (..., 8760), shape (..., 24)"""
+    P = np.asarray(P, dtype=float)
+    return np.sum(P.reshape(P.shape[:-1] + (-1, 24)), axis=-2)
+
+def kpis(sim_out, batt_dict=None, gen_dict=None, tol=1e-6):
+    """
+    Calculates the key performance indicators of a simulation run (or ensemble)
+
+    Inputs:
+        sim_out     Dictionary of simulation outputs (as from chron_sim.run_sim or audit.stack_runs)
+        batt_dict   Dictionary of battery input parameters (for battery throughput and cycles)
+        gen_dict    Dictionary of generator input parameters (for fuel use and per unit run hours / starts)
+        tol         Power below which a channel is treated as zero (W)
+
+    Outputs:
+        kpi         Dictionary of metrics (energies in kWh, durations in hours):
+                        'E_ld', 'E_uns', 'E_gen', 'E_gen_exc', 'E_pv', 'E_pv_exc', 'E_pv_used'
+                                        Annual energies
+                        'E_bat'         Load supplied by the PV / battery system (battery systems)
+                        'H_G0', 'H_GT'  Annual GHI and incident irradiation (kWh/m2, PV systems)
+                        'frac_uns'      Unsupplied energy (per unit of demand)
+                        'LOLP'          Loss of load probability (fraction of hours with unsupplied load)
+                        'max_outage'    Longest continuous outage
+                        'n_outages'     Number of outages
+                        'gen_hours'     Hours with the generator(s) running
+                        'gen_starts'    Number of generator starts (from off to on)
+                        'max_gen_run'   Longest continuous generator run
+                        'fuel'          Fuel use (litres), with 'unit_run_hours' and 'unit_starts' per unit
+                        'E_gen_over'    Generator output (including excess) above the total generator
+                                        rating, which burns no fuel in the unit dispatch
+                        'E_dis', 'E_chg' Battery energy discharged and charged (from the state of charge)
+                        'throughput'    Battery energy throughput (discharged plus charged)
+                        'cycles'        Equivalent full battery cycles (discharged energy / nominal capacity)
+                        'monthly'       Dictionary of monthly energies, shape (..., 12)
+                        'hourly'        Dictionary of hour of the day energies, shape (..., 24)
+    """
+    topo = sim_out['topo'][0]
+    P_ld = np.asarray(sim_out['P_ld'], dtype=float)
+    zeros = np.zeros(P_ld.shape)
+
+    def channel(name):
+        value = sim_out.get(name)
+        if value is None or len(value) == 0:
+            return zeros
+        return np.asarray(value, dtype=float)
+
+    P_uns = channel('P_uns')
+    P_gen = channel('P_gen')
+    P_gen_exc = channel('P_gen_exc')
+    P_pv = channel('P_pv')
+    P_pv_exc = channel('P_pv_exc')
+
+    # Annual energies
+    kpi = {
+        'E_ld'      : np.sum(P_ld, axis=-1) / 1000,
+        'E_uns'     : np.sum(P_uns, axis=-1) / 1000,
+        'E_gen'     : np.sum(P_gen, axis=-1) / 1000,
+        'E_gen_exc' : np.sum(P_gen_exc, axis=-1) / 1000,
+        'E_pv'      : np.sum(P_pv, axis=-1) / 1000,
+        'E_pv_exc'  : np.sum(P_pv_exc, axis=-1) / 1000
+    }
+    kpi['E_pv_used'] = kpi['E_pv'] - kpi['E_pv_exc']
+    kpi['frac_uns'] = kpi['E_uns'] / kpi['E_ld']
+    if topo in [1, 2, 3]:
+        kpi['H_G0'] = np.sum(channel('G0'), axis=-1) / 1000
+        kpi['H_GT'] = np.sum(channel('GT'), axis=-1) / 1000
+
+    # Reliability
+    outage = P_uns > tol
+    kpi['LOLP'] = np.mean(outage, axis=-1)
+    kpi['max_outage'], kpi['n_outages'] = run_lengths(outage)
+
+    # Generator operation
+    gen_on = P_gen > tol
+    kpi['gen_hours'] = np.sum(gen_on, axis=-1)
+    kpi['max_gen_run'], kpi['gen_starts'] = run_lengths(gen_on)
+    if gen_dict is not None and topo in [0, 1, 3]:
+        # Fuel is burnt for the total generator output, including the excess output. run_sim applies
+        # the minimum loading (and cycle charging) to all units together, so all units are committed
+        # in hours with excess output. The excess reported during cycle charging can take the total
+        # above the generator rating; this part cannot be dispatched and is reported separately.
+        gen_out = genset.dispatch_units(P_gen + P_gen_exc, gen_dict, all_on=P_gen_exc > tol)
+        kpi['fuel'] = np.sum(gen_out['fuel'], axis=-1)
+        kpi['E_gen_over'] = np.sum(gen_out['P_uns'], axis=-1) / 1000
+        kpi['unit_run_hours'] = gen_out['run_hours']
+        kpi['unit_starts'] = gen_out['starts']
+
+    # Battery operation
+    if topo in [2, 3]:
+        kpi['E_bat'] = kpi['E_ld'] - kpi['E_gen'] - kpi['E_uns']
+        if batt_dict is not None and 'qmax' in sim_out:
+            P_b = audit.run_battery_power(sim_out, batt_dict)
+            kpi['E_dis'] = np.sum(np.clip(P_b, 0, None), axis=-1) / 1000
+            kpi['E_chg'] = -np.sum(np.clip(P_b, None, 0), axis=-1) / 1000
+            kpi['throughput'] = kpi['E_dis'] + kpi['E_chg']
+            kpi['cycles'] = kpi['E_dis'] / (batt_dict['C_nom'] * batt_dict['n_batt'] * batt_dict['v_dc'] / 1000)
+
+    # Monthly and hour of the day breakdowns
+    breakdown = {'E_ld' : P_ld, 'E_uns' : P_uns, 'E_gen' : P_gen, 'E_pv' : P_pv, 'E_pv_exc' : P_pv_exc}
+    kpi['monthly'] = {key : monthly(P) / 1000 for key, P in breakdown.items()}
+    kpi['hourly'] = {key : hour_of_day(P) / 1000 for key, P in breakdown.items()}
+    kpi['monthly']['outage_hours'] = monthly(outage)
+    kpi['hourly']['outage_hours'] = hour_of_day(outage)
+
+    return kpi
@@ -0,0 +1,185 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Project Data
+
+Converts project data in the CENTAUR project file (.ctr) format into the input dictionaries of
+chron_sim.run_sim, so that projects can be simulated without the GUI (e.g. from scripts,
+benchmarks and batch runs).
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import copy
+import json
+import numpy as np
+
+def default_project():
+    """Returns the default project (same data as gui.globals.init) in .ctr format"""
+    project = {
+        'latitude'      : -5.945556,
+        'longitude'     : 105.488494,
+        'sys_data'      : {
+            'sys_config'    : 3,
+            'ctrl_mode'     : 2,
+            'proj_title'    : 'Default project',
+            'proj_desc'     : 'Default project',
+            'seed'          : None
+        },
+        'pv_resource'   : np.array([[0.448, 25.59], [0.447, 25.65], [0.471, 25.84], [0.484, 26.09],
+                                    [0.499, 26.18], [0.501, 25.99], [0.501, 25.86], [0.510, 26.08],
+                                    [0.509, 26.22], [0.478, 26.15], [0.453, 25.81], [0.443, 25.66]]),
+        'pv_data'       : {
+            'k_e'    : 90.0,
+            'P_inv'  : 150000,
+            'k_m'    : 95.0,
+            'P_stc'  : 175000,
+            'gamma'  : 0.38,
+            'eff_pv' : 95.0,
+            'pv_cpl' : 'DC',
+            'tilt'   : 10.0,
+            'azimuth' : 180.0,
+            'albedo' : 20.0
+        },
+        'loads'         : np.array([[43.9, 43.9], [40.8, 40.8], [40.9, 40.9], [40.4, 40.4], [40.2, 40.2], [43.9, 43.9],
+                                    [45.2, 43.2], [35.2, 35.2], [34.0, 34.0], [32.1, 32.1], [31.1, 31.1], [31.3, 31.3],
+                                    [30.9, 30.9], [33.1, 33.1], [32.1, 32.1], [32.2, 32.2], [32.2, 32.2], [34.5, 34.5],
+                                    [56.8, 56.8], [58.5, 58.5], [59.3, 59.3], [55.8, 55.8], [51.9, 51.9], [48.4, 48.4]]),
+        'load_sigma'    : [0.1, 0.1],
+        'batt_char'     : np.array([[1, 600.0], [3, 260.0], [5, 180.0], [8, 120.0], [10, 100.2]]),
+        'batt_data'     : {
+            'n_batt'     : 2,
+            'C_nom'      : 1000,
+            'v_dc'       : 400,
+            'SOC_min'    : 30,
+            'SOC_0'      : 100,
+            'SOC_cyc'    : 80,
+            'eff_conv'   : 94.0,
+            'p_set'      : 80000,
+            't_set'      : [9,15],
+            'model'      : 'kibam'
+        },
+        'gen_data'      : {
+            'n_gen'     : 1,
+            'P_gen'     : 60,
+            'l_min'     : 40.0,
+            'e_f'       : 0.27,
+            'chg_eff'   : 95.0,
+            'c_f'       : 0.65
+        }
+    }
+
+    return project
+
+def _decode_array(obj):
+    """JSON object hook restoring the numpy arrays of a .ctr file"""
+    if isinstance(obj, dict) and '__nparray__' in obj:
+        return np.array(obj['data'])
+    return obj
+
+def _encode_array(obj):
+    """JSON default hook writing numpy values in the .ctr format"""
+    if isinstance(obj, np.ndarray):
+        return {'__nparray__' : True, 'data' : obj.tolist()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(repr(obj) + ' is not JSON serializable')
+
+def encode_project(project):
+    """Encodes project data as JSON text in .ctr format"""
+    return json.dumps(project, default=_encode_array)
+
+def decode_project(text):
+    """
+    Decodes project data in .ctr format (as written by gui.globals.write_project_to_file)
+
+    Inputs:
+        text        JSON text (string or bytes) of the project
+
+    Outputs:
+        project     Dictionary of project data (for build_inputs)
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+    return json.loads(text, object_hook=_decode_array)
+
+def build_inputs(project):
+    """
+    Builds the chron_sim.run_sim input dictionaries from project data in .ctr format
+    (percentages, including those of any PV sub-arrays, are converted to per unit values, as done
+    in the Simulation tab)
+
+    Inputs:
+        project     Dictionary of project data (as written to a .ctr file)
+
+    Outputs:
+        sys_dict, pv_dict, batt_dict, gen_dict, load_dict
+    """
+    pv_resource = np.array(project['pv_resource'])
+    batt_char = np.array(project['batt_char'])
+    loads = np.array(project['loads'])
+
+    pv_dict = copy.deepcopy(project['pv_data'])
+    pv_dict['Ktm'] = pv_resource[:,0].tolist()
+    pv_dict['T_amb'] = pv_resource[:,1].tolist()
+    for params in [pv_dict] + pv_dict.get('arrays', []):
+        for key in ['k_e', 'k_m', 'gamma', 'eff_pv', 'albedo']:
+            if key in params:
+                params[key] = params[key] / 100
+        if params.get('inv_curve') is not None:
+            params['inv_curve'] = (np.array(params['inv_curve']) / 100).tolist()
+
+    batt_dict = copy.deepcopy(project['batt_data'])
+    batt_dict['T'] = batt_char[:,0].tolist()
+    batt_dict['I'] = batt_char[:,1].tolist()
+    batt_dict['eff_conv'] = batt_dict['eff_conv'] / 100
+
+    gen_dict = copy.deepcopy(project['gen_data'])
+    gen_dict['l_min'] = gen_dict['l_min'] / 100
+    gen_dict['chg_eff'] = gen_dict['chg_eff'] / 100
+
+    load_dict = {
+        'l_sum' : loads[:,0].tolist(),
+        'l_win' : loads[:,1].tolist(),
+        'sigma_s' : project['load_sigma'][0],
+        'sigma_w' : project['load_sigma'][1]
+    }
+
+    sys_dict = copy.deepcopy(project['sys_data'])
+    sys_dict['lat'] = project['latitude']
+    sys_dict['is_gen'] = sys_dict['sys_config'] in [0, 1, 3]
+    sys_dict['is_pv'] = sys_dict['sys_config'] in [1, 2, 3]
+    sys_dict['is_batt'] = sys_dict['sys_config'] in [2, 3]
+
+    return sys_dict, pv_dict, batt_dict, gen_dict, load_dict
+
+def reference_projects():
+    """
+    Returns the matrix of reference projects covering every topology, control mode (1-4) and PV coupling
+
+    Outputs:
+        projects    Ordered list of (name, project) tuples
+    """
+    topologies = ['gen', 'pv-gen', 'pv-batt', 'pv-batt-gen']
+    projects = []
+    for sys_config in range(4):
+        for ctrl_mode in ([0, 1, 2, 3] if sys_config == 3 else [0]):
+            for pv_cpl in (['DC', 'AC'] if sys_config > 0 else ['AC']):
+                project = default_project()
+                project['sys_data']['sys_config'] = sys_config
+                project['sys_data']['ctrl_mode'] = ctrl_mode
+                project['pv_data']['pv_cpl'] = pv_cpl
+                name = topologies[sys_config]
+                if sys_config == 3:
+                    name = name + '_mode' + str(ctrl_mode + 1)
+                if sys_config > 0:
+                    name = name + '_' + pv_cpl
+                projects.append((name, project))
+
+    return projects
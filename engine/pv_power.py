@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+PV Power Model
+
+Converts hourly incident irradiance into PV system output. The cell temperature is calculated
+from the irradiance and ambient temperature, the DC output of the array is derated for
+temperature, and the output is passed through the solar charge controller (DC coupling) or the
+inverter (AC coupling, with an optional efficiency vs loading curve and a limit at the inverter
+rating). All calculations are whole-array operations, so the irradiance may span several years
+and have leading axes for several arrays or cases.
+
+With the default parameters (no 'noct' or 'inv_curve' in pv_dict), the output is the same as the
+original model of chron_sim.run_sim: the cell temperature is taken as the ambient temperature plus
+25 deg C, and the charge controller or inverter has a constant efficiency.
+
+Main Functions
+--------------
+- hourly_temperature: hourly series from monthly (or hourly) ambient temperatures
+- cell_temperature: hourly PV cell temperature (deg C)
+- inverter_efficiency: inverter efficiency at each hour from an efficiency vs loading curve
+- pv_power: hourly PV system output (W)
+- sub_arrays: parameters of each PV sub-array
+- capacity: total PV array capacity (W)
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+
+DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+T_STC = 25.0            # Cell temperature at standard test conditions (deg C)
+
+def hourly_temperature(T_amb, n_hours=8760):
+    """
+    Returns an hourly ambient temperature series
+
+    Inputs:
+        T_amb       Monthly (12 values) or hourly ambient temperatures (deg C)
+        n_hours     Number of hours (one year of temperatures is repeated for multi-year series;
+                    n_hours must be a whole multiple of the length of the series)
+
+    Outputs:
+        T           Hourly ambient temperatures, shape (..., n_hours)
+    """
+    T_amb = np.asarray(T_amb, dtype=float)
+    if T_amb.shape[-1] == 12:
+        T_amb = np.repeat(T_amb, np.array(DAYS) * 24, axis=-1)
+    if T_amb.shape[-1] != n_hours:
+        if n_hours % T_amb.shape[-1] != 0:
+            raise ValueError('Cannot repeat ' + str(T_amb.shape[-1]) + ' hourly temperatures over ' + str(n_hours) + ' hours (a whole number of repeats is needed)')
+        T_amb = np.tile(T_amb, n_hours // T_amb.shape[-1])
+    return T_amb
+
+def cell_temperature(GT, T_amb, noct=None):
+    """
+    Calculates the PV cell temperature
+
+    Inputs:
+        GT          Hourly incident irradiance (W/m2)
+        T_amb       Hourly ambient temperature (deg C)
+        noct        Nominal operating cell temperature (deg C, at 800 W/m2 and 20 deg C ambient),
+                    or None for the cell temperature of the original model (ambient plus 25 deg C)
+
+    Outputs:
+        T_cell      Hourly cell temperature (deg C)
+    """
+    if noct is None:
+        return T_amb + T_STC
+    return T_amb + (noct - 20) / 800 * np.asarray(GT, dtype=float)
+
+def inverter_efficiency(P_dc, P_inv, curve):
+    """
+    Interpolates the inverter efficiency at each hour from an efficiency vs loading curve
+
+    Inputs:
+        P_dc        Hourly DC input power (W)
+        P_inv       Inverter rating (W)
+        curve       Efficiency curve, list of (loading, efficiency) points in per unit (loading
+                    relative to the inverter rating), in increasing order of loading. The
+                    efficiency is held constant outside the curve.
+
+    Outputs:
+        eff         Hourly inverter efficiency (per unit)
+    """
+    curve = np.asarray(curve, dtype=float)
+    return np.interp(np.asarray(P_dc, dtype=float) / P_inv, curve[:,0], curve[:,1])
+
+def pv_power(GT, T_amb, pv_dict):
+    """
+    Calculates the hourly output of a PV system
+
+    Inputs:
+        GT          Hourly incident irradiance (W/m2), shape (..., n_hours)
+        T_amb       Monthly or hourly ambient temperatures (deg C), see hourly_temperature
+        pv_dict     Dictionary of solar PV input parameters (per unit values): 'P_stc', 'k_e',
+                    'k_m', 'gamma', 'eff_pv', 'pv_cpl' and 'P_inv', and optionally 'noct' (deg C)
+                    and 'inv_curve' (inverter efficiency vs loading, see inverter_efficiency)
+
+    Outputs:
+        P_pv        Hourly PV output (W) at the output of the charge controller (DC coupling) or
+                    inverter (AC coupling), shape (..., n_hours)
+    """
+    GT = np.asarray(GT, dtype=float)
+    T = hourly_temperature(T_amb, GT.shape[-1])
+
+    # Temperature derating relative to standard test conditions (in the original model, the
+    # cell temperature rise above STC is the ambient temperature)
+    if pv_dict.get('noct') is None:
+        k_t = 1 - pv_dict['gamma'] * T
+    else:
+        k_t = 1 - pv_dict['gamma'] * (cell_temperature(GT, T, pv_dict['noct']) - T_STC)
+
+    # DC output of the array
+    P_d = k_t * (pv_dict['P_stc'] * pv_dict['k_e'] * pv_dict['k_m'] / 1000)
+    P_dc = GT * P_d
+
+    if pv_dict['pv_cpl'] != 'AC':
+        return P_dc * pv_dict['eff_pv']
+
+    # Inverter efficiency, and limit at the inverter rating for AC coupled systems
+    if pv_dict.get('inv_curve') is not None:
+        P_ac = P_dc * inverter_efficiency(P_dc, pv_dict['P_inv'], pv_dict['inv_curve'])
+    else:
+        P_ac = P_dc * pv_dict['eff_pv']
+    return np.clip(P_ac, None, pv_dict['P_inv'])
+
+def sub_arrays(pv_dict):
+    """
+    Returns the parameters of each PV sub-array listed in pv_dict['arrays'] (each sub-array entry
+    overrides the parameters of pv_dict), or None if no sub-arrays are listed
+
+    The dispatch treats the total output of the sub-arrays as coupled at pv_dict['pv_cpl'], so the
+    sub-arrays must all have this coupling (conversion between the DC and AC buses is not modelled).
+    """
+    arrays = pv_dict.get('arrays')
+    if not arrays:
+        return None
+    arrays = [dict(pv_dict, **array) for array in arrays]
+    for j, array in enumerate(arrays):
+        if array['pv_cpl'] != pv_dict['pv_cpl']:
+            raise ValueError('PV sub-array ' + str(j) + ' is ' + str(array['pv_cpl']) + ' coupled, but the system is ' + str(pv_dict['pv_cpl']) + ' coupled (mixed couplings are not supported)')
+    return arrays
+
+def capacity(pv_dict):
+    """Returns the total PV array capacity at STC (W), the sum of the sub-arrays if any are listed"""
+    arrays = sub_arrays(pv_dict)
+    if arrays is None:
+        return pv_dict['P_stc']
+    return sum(array['P_stc'] for array in arrays)
@@ -0,0 +1,315 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Representative Days
+
+Shrinks an annual simulation for early-stage screening. The 365 days of the year are clustered on
+their hourly load and GHI profiles (as from load_model.create_loads and
+synth_solar.Aguiar_hourly_G0) into K representative days with k-medoids, each weighted by the
+number of days in its cluster. The stateless part of the dispatch is then run on the K * 24 hours
+of the representative days only, and the weighted results are scaled up to annual totals.
+
+Only dispatch without energy storage is stateless, so the generator, unsupplied and excess energies
+are estimated for the generator only and PV-generator topologies. For battery topologies, the
+state of charge links the days together and only the hourly PV / load energy balance (PV energy
+used directly, surplus and deficit) is estimated. approximation_error compares the estimates with
+a full chronological run on the same load and solar data.
+
+Main Functions
+--------------
+- daily_features: feature vector of each day (normalised hourly load and GHI)
+- k_medoids: k-medoids clustering of the rows of a feature matrix
+- cluster_days: representative days and weights of a year
+- representative_profiles: hourly profiles restricted to the representative days
+- dispatch: vectorised stateless dispatch (generator only and PV-generator topologies)
+- annual_metrics: weighted annual energies of a dispatch
+- screen: annual metrics of a design estimated from representative days
+- approximation_error: representative day estimates compared with a full run
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+
+from engine.chron_sim import generate_profiles, run_sim
+
+N_DAYS = 365
+CHANNELS = ['P_ld', 'G0', 'GT', 'P_pv']
+
+def daily_features(P_ld, G0=None):
+    """
+    Returns the feature vector of each day: the hourly load and GHI, each normalised by its annual
+    peak so that both profiles carry the same weight
+
+    Inputs:
+        P_ld        Hourly load demand (W), 8760 values
+        G0          Hourly global horizontal irradiance (W/m2), or None for systems without PV
+
+    Outputs:
+        X           Feature matrix, shape (365, 24) or (365, 48)
+    """
+    features = []
+    for P in [P_ld, G0]:
+        if P is None:
+            continue
+        P = np.asarray(P, dtype=float).reshape(N_DAYS, 24)
+        peak = np.max(np.abs(P))
+        features.append(P / peak if peak > 0 else P)
+
+    return np.hstack(features)
+
+def k_medoids(X, k, max_iter=100):
+    """
+    Clusters the rows of a feature matrix with k-medoids (Euclidean distance). The medoids are
+    initialised with the greedy build step of PAM and refined by alternating assignment and medoid
+    update steps, so the result is deterministic.
+
+    Inputs:
+        X           Feature matrix, shape (n, n_features)
+        k           Number of clusters
+        max_iter    Maximum number of refinement iterations
+
+    Outputs:
+        medoids     Row indices of the medoids, in increasing order, shape (k,)
+        labels      Cluster (index into medoids) of each row, shape (n,)
+    """
+    X = np.asarray(X, dtype=float)
+    n = len(X)
+    if not 1 <= k <= n:
+        raise ValueError('Number of clusters must be between 1 and ' + str(n))
+
+    # Pairwise distances between all rows
+    sq = np.sum(X ** 2, axis=1)
+    D = np.sqrt(np.maximum(sq[:,np.newaxis] + sq[np.newaxis,:] - 2 * np.dot(X, X.T), 0))
+
+    # Build: add the row that most reduces the total distance to the nearest medoid
+    medoids = [int(np.argmin(np.sum(D, axis=1)))]
+    nearest = D[medoids[0]].copy()
+    for j in range(1, k):
+        gain = np.sum(np.maximum(nearest[np.newaxis,:] - D, 0), axis=1)
+        gain[medoids] = -1
+        medoids.append(int(np.argmax(gain)))
+        nearest = np.minimum(nearest, D[medoids[-1]])
+    medoids = np.array(medoids)
+
+    # Refine: assign rows to the nearest medoid, then move each medoid to the member of its cluster
+    # with the least total distance to the other members
+    for it in range(max_iter):
+        labels = np.argmin(D[medoids], axis=0)
+        updated = medoids.copy()
+        for j in range(k):
+            members = np.flatnonzero(labels == j)
+            if len(members):
+                updated[j] = members[np.argmin(np.sum(D[np.ix_(members, members)], axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+
+    medoids = np.sort(medoids)
+    labels = np.argmin(D[medoids], axis=0)
+
+    return medoids, labels
+
+def cluster_days(P_ld, G0=None, k=12):
+    """
+    Selects K representative days of a year
+
+    Inputs:
+        P_ld        Hourly load demand (W), 8760 values
+        G0          Hourly global horizontal irradiance (W/m2), or None for systems without PV
+        k           Number of representative days
+
+    Outputs:
+        rep         Dictionary with the representative days 'days' (day of the year, 0-based,
+                    shape (k,)), their 'weights' (number of days represented, summing to 365) and
+                    the cluster 'labels' of every day of the year (index into days, shape (365,))
+    """
+    days, labels = k_medoids(daily_features(P_ld, G0), k)
+    rep = {
+        'days'      : days,
+        'weights'   : np.bincount(labels, minlength=k).astype(float),
+        'labels'    : labels
+    }
+
+    return rep
+
+def representative_profiles(profiles, rep):
+    """
+    Restricts hourly profiles (as from chron_sim.generate_profiles) to the representative days
+
+    Outputs:
+        rep_profiles    Dictionary of the hourly channels on the representative days (K * 24 values
+                        each), with the hourly 'weights' of each hour
+    """
+    hours = (np.asarray(rep['days'])[:,np.newaxis] * 24 + np.arange(24)).ravel()
+    rep_profiles = {key : np.asarray(profiles[key], dtype=float)[..., hours] for key in CHANNELS if key in profiles}
+    rep_profiles['weights'] = np.repeat(rep['weights'], 24)
+
+    return rep_profiles
+
+def dispatch(P_ld, P_pv, sys_dict, gen_dict):
+    """
+    Stateless dispatch of the generator only and PV-generator topologies (the same rules as
+    chron_sim.run_sim, evaluated for all hours at once)
+
+    Inputs:
+        P_ld        Hourly load demand (W), shape (..., n_hours)
+        P_pv        Hourly PV output (W), or None for the generator only topology
+        sys_dict    Dictionary of system design parameters
+        gen_dict    Dictionary of generator input parameters
+
+    Outputs:
+        out         Dictionary of hourly 'P_gen', 'P_gen_exc', 'P_uns' and 'P_pv_exc' (W)
+    """
+    if sys_dict['is_batt'] or not sys_dict['is_gen']:
+        raise ValueError('Stateless dispatch only supports the generator only and PV-generator topologies')
+
+    P_ld = np.asarray(P_ld, dtype=float)
+    Pg_tot = gen_dict['n_gen'] * gen_dict['P_gen'] * 1000
+    Pg_min = gen_dict['n_gen'] * gen_dict['l_min'] * gen_dict['P_gen'] * 1000
+
+    if not sys_dict['is_pv']:
+        out = {
+            'P_gen'     : np.clip(P_ld, None, Pg_tot),
+            'P_gen_exc' : np.clip(Pg_min - P_ld, 0, None),
+            'P_uns'     : np.clip(P_ld - Pg_tot, 0, None),
+            'P_pv_exc'  : np.zeros(P_ld.shape)
+        }
+        return out
+
+    P_pv = np.asarray(P_pv, dtype=float)
+    low = P_pv + Pg_min > P_ld                  # Low load conditions (generator at minimum loading)
+    part = low & (P_pv > 0) & (Pg_min < P_ld)   # Part of the PV output curtailed
+    over = ~low & (Pg_tot + P_pv < P_ld)        # Generator under-capacity
+
+    out = {
+        'P_gen'     : np.where(low, np.where(part, Pg_min, P_ld), np.where(over, Pg_tot, P_ld - P_pv)),
+        'P_gen_exc' : np.where(low & ~part, Pg_min - P_ld, 0.0),
+        'P_uns'     : np.where(over, P_ld - Pg_tot - P_pv, 0.0),
+        'P_pv_exc'  : np.where(part, P_pv + Pg_min - P_ld, np.where(low & (P_pv > 0) & (Pg_min > P_ld), P_pv, 0.0))
+    }
+
+    return out
+
+def annual_metrics(P_ld, P_pv=None, out=None, weights=None, e_f=0.0):
+    """
+    Returns the weighted annual energies of a dispatch
+
+    Inputs:
+        P_ld        Hourly load demand (W), shape (..., n_hours)
+        P_pv        Hourly PV output (W), or None for systems without PV
+        out         Dictionary of hourly dispatch outputs (as from dispatch or chron_sim.run_sim),
+                    or None for the energy balance only
+        weights     Weight of each hour (e.g. rep_profiles['weights']), or None for a full year
+        e_f         Generator fuel efficiency (litres/kWh)
+
+    Outputs:
+        metrics     Dictionary of annual energies in kWh: 'E_ld', and for PV systems 'E_pv',
+                    'E_pv_direct' (PV output used by the load in the same hour), 'E_surplus' and
+                    'E_deficit' (PV output above and load above the PV output), and for dispatch
+                    outputs 'E_gen', 'E_gen_exc', 'E_uns', 'E_pv_exc', 'gen_hours' and fuel use
+                    in litres ('fuel')
+    """
+    P_ld = np.asarray(P_ld, dtype=float)
+    if weights is None:
+        weights = np.ones(P_ld.shape[-1])
+
+    def total(P):
+        return np.dot(np.asarray(P, dtype=float), weights) / 1000
+
+    metrics = {'E_ld' : total(P_ld)}
+    if P_pv is not None:
+        P_pv = np.asarray(P_pv, dtype=float)
+        metrics['E_pv'] = total(P_pv)
+        metrics['E_pv_direct'] = total(np.minimum(P_pv, P_ld))
+        metrics['E_surplus'] = total(np.clip(P_pv - P_ld, 0, None))
+        metrics['E_deficit'] = total(np.clip(P_ld - P_pv, 0, None))
+    if out is not None:
+        for key in ['P_gen', 'P_gen_exc', 'P_uns', 'P_pv_exc']:
+            P = out.get(key)
+            metrics['E' + key[1:]] = total(P if P is not None and len(P) else np.zeros(P_ld.shape))
+        metrics['gen_hours'] = np.dot(np.asarray(out['P_gen'], dtype=float) > 0, weights)
+        metrics['fuel'] = (metrics['E_gen'] + metrics['E_gen_exc']) * e_f
+
+    return metrics
+
+def screen(sys_dict, pv_dict, gen_dict, load_dict, k=12, profiles=None, rep=None):
+    """
+    Estimates the annual metrics of a design from representative days
+
+    Inputs:
+        sys_dict    Dictionary of system design parameters
+        pv_dict     Dictionary of solar PV input parameters
+        gen_dict    Dictionary of generator input parameters
+        load_dict   Dictionary of load input parameters
+        k           Number of representative days
+        profiles    Optional hourly profiles (as from chron_sim.generate_profiles), otherwise new
+                    load and solar data are generated
+        rep         Optional representative days (as from cluster_days), e.g. to screen several
+                    designs on the same days
+
+    Outputs:
+        metrics     Dictionary of estimated annual metrics (see annual_metrics). The dispatch
+                    metrics are only estimated for topologies without a battery.
+        rep         Representative days used
+    """
+    if profiles is None:
+        profiles = generate_profiles(sys_dict, pv_dict, load_dict)
+    if rep is None:
+        rep = cluster_days(profiles['P_ld'], profiles.get('G0') if sys_dict['is_pv'] else None, k)
+
+    rep_profiles = representative_profiles(profiles, rep)
+    P_pv = rep_profiles['P_pv'] if sys_dict['is_pv'] else None
+    out = None
+    if sys_dict['is_gen'] and not sys_dict['is_batt']:
+        out = dispatch(rep_profiles['P_ld'], P_pv, sys_dict, gen_dict)
+    metrics = annual_metrics(rep_profiles['P_ld'], P_pv, out, rep_profiles['weights'], gen_dict.get('e_f', 0))
+
+    return metrics, rep
+
+def approximation_error(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, k=12, seed=0):
+    """
+    Compares the representative day estimates of a design with a full chronological run on the same
+    load and solar data
+
+    Inputs:
+        (as for chron_sim.run_sim)
+        k           Number of representative days
+        seed        Random seed for the load and solar data
+
+    Outputs:
+        results     Dictionary with:
+                        'full'          Annual metrics of the full run (see annual_metrics)
+                        'approx'        Annual metrics estimated from the representative days
+                        'rel_error'     Relative error of each estimated metric
+                        'max_error'     Largest absolute relative error
+                        'rep'           Representative days (see cluster_days)
+    """
+    np.random.seed(seed)
+    profiles = generate_profiles(sys_dict, pv_dict, load_dict)
+    approx, rep = screen(sys_dict, pv_dict, gen_dict, load_dict, k, profiles)
+
+    sim_out = run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, profiles)
+    out = sim_out if 'E_gen' in approx else None
+    full = annual_metrics(sim_out['P_ld'], sim_out['P_pv'] if sys_dict['is_pv'] else None, out, None, gen_dict.get('e_f', 0))
+
+    rel_error = {}
+    for key in approx:
+        scale = np.abs(full[key]) if full[key] != 0 else np.abs(full['E_ld'])
+        rel_error[key] = (approx[key] - full[key]) / scale
+
+    results = {
+        'full'      : {key : full[key] for key in approx},
+        'approx'    : approx,
+        'rel_error' : rel_error,
+        'max_error' : max(abs(value) for value in rel_error.values()),
+        'rep'       : rep
+    }
+
+    return results
@@ -0,0 +1,187 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Simulation Result Cache
+
+Memoises whole simulation runs on disk. The inputs to a run (input dictionaries, random seed,
+simulation function and engine version) are converted to a canonical JSON form and hashed, and
+the outputs are stored under that hash. The cache is bounded in size and evicts the least recently
+used results first. Runs without a random seed are never cached, since their results are not
+reproducible.
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import numpy as np
+
+from engine.chron_sim import ENGINE_VERSION, run_sim
+import engine.weather as weather
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.centaur', 'cache')
+
+def canonical(obj):
+    """
+    Returns a canonical, JSON serialisable form of an input object
+    (dictionary keys are sorted, sequences become lists and all numbers become floats). Weather
+    file names (pv_dict['weather']) are replaced by the identity of the file, so that editing or
+    replacing the file changes the hash.
+    """
+    if isinstance(obj, dict):
+        return {str(key) : _weather_key(obj[key]) if key == 'weather' else canonical(obj[key]) for key in sorted(obj, key=str)}
+    if isinstance(obj, np.ndarray):
+        return {'__nparray__' : list(obj.shape), 'data' : canonical(obj.ravel().tolist())}
+    if isinstance(obj, (list, tuple)):
+        return [canonical(value) for value in obj]
+    if isinstance(obj, (bool, np.bool_)) or obj is None:
+        return None if obj is None else bool(obj)
+    if isinstance(obj, (int, float, np.integer, np.floating)):
+        return float(obj)
+    return str(obj)
+
+def _weather_key(value):
+    """Canonical form of a weather entry (file identity for file names)"""
+    if not isinstance(value, str):
+        return canonical(value)
+    try:
+        return {'__file__' : canonical(weather.file_key(value))}
+    except OSError:
+        # Missing file (the run itself will fail)
+        return {'__file__' : [os.path.abspath(value)]}
+
+def input_hash(run_fn, args, seed):
+    """
+    Returns the hash (hex string) of the canonical inputs of a simulation run
+
+    Inputs:
+        run_fn      Simulation function
+        args        Tuple of arguments to run_fn
+        seed        Random seed set before the run
+    """
+    key = {
+        'engine'    : ENGINE_VERSION,
+        'function'  : run_fn.__module__ + '.' + run_fn.__name__,
+        'args'      : canonical(args),
+        'seed'      : canonical(seed)
+    }
+    text = json.dumps(key, sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class ResultCache(object):
+    """On-disk cache of simulation results with size-bounded LRU eviction"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=500 * 2**20):
+        """
+        Inputs:
+            cache_dir   Directory holding the cached results
+            max_bytes   Maximum total size of the cached results (bytes)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.pkl')
+
+    def get(self, key):
+        """Returns the cached result for a key, or None if it is not in the cache"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fp:
+                result = pickle.load(fp)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # Mark as recently used
+        os.utime(path, None)
+        return result
+
+    def put(self, key, result):
+        """Stores a result in the cache (written atomically), then evicts old results if needed"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fp:
+            pickle.dump(result, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used results until the cache is within its size limit"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(entry[1] for entry in entries)
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total = total - size
+
+    def clear(self):
+        """Removes all cached results"""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def call(self, run_fn, args, seed):
+        """
+        Returns the result of run_fn(*args) with the random seed set, from the cache if available
+
+        Outputs:
+            result      Simulation result (hourly lists are returned as numpy arrays)
+            hit         True if the result came from the cache
+        """
+        if seed is None:
+            return _as_arrays(run_fn(*args)), False
+
+        key = input_hash(run_fn, args, seed)
+        result = self.get(key)
+        if result is not None:
+            return result, True
+
+        np.random.seed(seed)
+        result = _as_arrays(run_fn(*args))
+        self.put(key, result)
+
+        return result, False
+
+def _as_arrays(sim_out):
+    """Converts hourly list outputs to numpy arrays (so cached and fresh results look the same)"""
+    if not isinstance(sim_out, dict):
+        return sim_out
+    return {key : (np.array(value, dtype=float) if isinstance(value, list) else value) for key, value in sim_out.items()}
+
+def cached_run_sim(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, seed, cache=None):
+    """
+    Runs chron_sim.run_sim through the result cache
+
+    Inputs:
+        sys_dict, pv_dict, batt_dict, gen_dict, load_dict   Input dictionaries (as for chron_sim.run_sim)
+        seed        Random seed (None for an uncached run with a random seed)
+        cache       ResultCache to use (a cache in the default directory if None)
+
+    Outputs:
+        sim_out     Dictionary of simulation result outputs
+        hit         True if the result came from the cache
+    """
+    if cache is None:
+        cache = ResultCache()
+
+    return cache.call(run_sim, (sys_dict, pv_dict, batt_dict, gen_dict, load_dict), seed)
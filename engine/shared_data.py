@@ -0,0 +1,202 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Shared Memory Data Plane for Process Pools
+
+The parent process publishes the hourly load and weather arrays of a sweep (e.g. 'P_ld', 'G0',
+'GT' and 'P_pv' for every site and year) once, into a single shared memory segment. Tasks sent
+to worker processes carry only a small manifest (segment name, and offset, shape and type of each
+array), and workers attach to the segment by name and use read-only numpy views of the arrays, so
+the arrays are neither pickled with every task nor copied into every worker.
+
+The publishing process owns the segment and unlinks it when it is closed (or at exit). Segments
+are also registered with the multiprocessing resource tracker, which unlinks them if the parent
+crashes. Workers keep their attachments open between tasks and close them when they exit.
+
+Main Functions
+--------------
+- SharedArrays: publishes a dictionary of arrays in a shared memory segment
+- attach: returns read-only views of published arrays (in a worker process)
+- run_cases_shared: runs a sweep of cases on a process pool with shared hourly profiles
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import atexit
+import multiprocessing
+import os
+import numpy as np
+from multiprocessing import shared_memory
+
+from engine.chron_sim import run_sim
+
+ALIGN = 64              # Byte alignment of each array in the segment
+
+_published = {}         # Segments created by this process (and the creating process id), keyed by name
+_attached = {}          # Segments attached by this process, keyed by name
+
+class SharedArrays(object):
+    """Dictionary of numpy arrays published in a shared memory segment"""
+
+    def __init__(self, arrays):
+        """
+        Copies the arrays into a new shared memory segment
+
+        Inputs:
+            arrays      Dictionary of numpy arrays, keyed by string (e.g. 'site1/P_ld')
+        """
+        layout = {}
+        size = 0
+        for key, value in arrays.items():
+            value = np.ascontiguousarray(value)
+            layout[key] = (size, value.shape, value.dtype.str)
+            size = size + (value.nbytes + ALIGN - 1) // ALIGN * ALIGN
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.manifest = {'name' : self.shm.name, 'arrays' : layout}
+        _published[self.shm.name] = (self.shm, os.getpid())
+
+        for key, value in arrays.items():
+            offset, shape, dtype = layout[key]
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            view[...] = value
+
+    def views(self, prefix=None):
+        """Returns read-only views of the published arrays (see attach)"""
+        return _views(self.shm, self.manifest, prefix)
+
+    def close(self):
+        """Releases and unlinks the segment (views of it must no longer be used)"""
+        if self.shm.name in _published:
+            shm, pid = _published.pop(self.shm.name)
+            _release(shm, unlink=(pid == os.getpid()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def _views(shm, manifest, prefix=None):
+    """Read-only numpy views of the arrays in a segment, optionally only those under 'prefix/'"""
+    views = {}
+    for key, (offset, shape, dtype) in manifest['arrays'].items():
+        if prefix is not None:
+            if not key.startswith(prefix + '/'):
+                continue
+            key = key[len(prefix) + 1:]
+        view = np.ndarray(tuple(shape), dtype=dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        views[key] = view
+    return views
+
+def _release(shm, unlink=False):
+    """Closes a segment, unlinking it if this process owns it"""
+    try:
+        shm.close()
+    except BufferError:
+        # Views of the segment are still referenced; the mapping is released with them
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+def attach(manifest, prefix=None):
+    """
+    Returns read-only views of published arrays, attaching to the segment on first use (the
+    attachment is kept for later tasks in the same process)
+
+    Inputs:
+        manifest    Manifest of a SharedArrays object (SharedArrays.manifest)
+        prefix      Only return arrays with keys starting 'prefix/' (with the prefix removed)
+
+    Outputs:
+        views       Dictionary of read-only numpy arrays
+    """
+    name = manifest['name']
+    if name in _published:
+        # Published by this process (or inherited by a forked worker)
+        shm = _published[name][0]
+    else:
+        if name not in _attached:
+            _attached[name] = shared_memory.SharedMemory(name=name)
+        shm = _attached[name]
+    return _views(shm, manifest, prefix)
+
+def detach_all():
+    """Closes all attached segments (called at exit)"""
+    for name in list(_attached):
+        _release(_attached.pop(name))
+
+def _cleanup():
+    detach_all()
+    for name in list(_published):
+        shm, pid = _published.pop(name)
+        _release(shm, unlink=(pid == os.getpid()))
+
+atexit.register(_cleanup)
+
+def publish_profiles(profiles):
+    """
+    Publishes the hourly profiles of several sites or years
+
+    Inputs:
+        profiles    Dictionary of profile dictionaries (as from chron_sim.generate_profiles), keyed
+                    by site or year name
+
+    Outputs:
+        shared      SharedArrays object with keys 'name/P_ld', 'name/G0', ...
+    """
+    arrays = {}
+    for name, channels in profiles.items():
+        for key, value in channels.items():
+            arrays[str(name) + '/' + key] = np.asarray(value, dtype=float)
+    return SharedArrays(arrays)
+
+def _run_case(task):
+    """Runs one case in a worker process with shared profiles"""
+    manifest, case, run_fn, summarise = task
+    profiles = attach(manifest, str(case['profiles']))
+    result = run_fn(*case['inputs'], profiles=profiles)
+    if summarise is not None:
+        result = summarise(result)
+    return case['id'], result
+
+def run_cases_shared(cases, shared, processes=None, run_fn=run_sim, summarise=None, chunksize=1):
+    """
+    Runs a sweep of simulation cases on a process pool, with the hourly profiles of each case read
+    from shared memory
+
+    Inputs:
+        cases       List of case dictionaries with keys 'id', 'inputs' (tuple of arguments for run_fn)
+                    and 'profiles' (name of the published profiles, see publish_profiles)
+        shared      SharedArrays object of the published profiles
+        processes   Number of worker processes (default the number of CPUs)
+        run_fn      Simulation function accepting a 'profiles' keyword (default chron_sim.run_sim)
+        summarise   Optional function applied to each result in the worker (e.g. to return only
+                    annual totals, so that the hourly outputs are not sent back to the parent)
+        chunksize   Number of cases sent to a worker at a time
+
+    Outputs:
+        results     Dictionary of results keyed by case id
+    """
+    tasks = [(shared.manifest, case, run_fn, summarise) for case in cases]
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = dict(pool.imap_unordered(_run_case, tasks, chunksize))
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return results
@@ -0,0 +1,412 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Incremental Hybrid Power System Simulator
+
+Stateful, hour-by-hour version of the dispatch in chron_sim.run_sim for digital twin and real-time
+use. A Simulator holds the battery state between calls, so the latest measured load and PV output
+can be fed in one hour at a time, and the state can be snapshotted and restored to fork what-if
+branches without re-simulating from the start of the year. run_sim_stream runs whole years with a
+Simulator and yields the results month by month, so that partial results can be shown while a run
+is in progress.
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+from collections import namedtuple
+import numpy as np
+
+from engine.chron_sim import battery_model, generate_profiles
+
+# Dispatch decision for a single hour (powers in W, state of charge in %)
+StepResult = namedtuple('StepResult', ['P_gen', 'P_gen_exc', 'P_uns', 'P_pv_exc', 'q'])
+
+class Simulator(object):
+    """
+    Hour-by-hour hybrid power system simulator
+
+    The dispatch logic is identical to chron_sim.run_sim for all topologies and control modes 1-4.
+    The mutable state (q1, q2, soc, cyc_charge, hour, pv_out) is held in slots, and snapshot() /
+    restore() copy only this state.
+    """
+
+    __slots__ = ('topo', 'ctrl_mode', 'pv_cpl', 'Pg_tot', 'Pg_min', 'chg_eff',
+                 'v_n', 'eff_conv', 'SOC_min', 'SOC_cyc', 'p_set', 't_set', 'k', 'c', 'qmax', 'batt_step',
+                 'q1', 'q2', 'soc', 'cyc_charge', 'hour', 'pv_out')
+
+    def __init__(self, sys_dict, pv_dict, batt_dict, gen_dict):
+        """
+        Sets up the simulator with the same input dictionaries as chron_sim.run_sim (no load data needed)
+        """
+        is_pv = sys_dict['is_pv']
+        is_batt = sys_dict['is_batt']
+        is_gen = sys_dict['is_gen']
+        self.ctrl_mode = sys_dict['ctrl_mode'] + 1
+
+        if is_gen and not is_pv and not is_batt:
+            self.topo = (0, 'Generator only')
+        elif is_gen and is_pv and not is_batt:
+            self.topo = (1, 'Solar PV-Generator')
+        elif not is_gen and is_pv and is_batt:
+            self.topo = (2, 'Solar PV-Battery')
+        elif is_gen and is_pv and is_batt:
+            self.topo = (3, 'Solar PV-Battery-Generator')
+        else:
+            raise ValueError('Unsupported system topology')
+
+        self.pv_cpl = pv_dict['pv_cpl'] if is_pv else 'AC'
+
+        if is_gen:
+            self.Pg_tot = gen_dict['n_gen'] * gen_dict['P_gen'] * 1000
+            self.Pg_min = gen_dict['n_gen'] * gen_dict['l_min'] * gen_dict['P_gen'] * 1000
+            self.chg_eff = gen_dict['chg_eff']
+        else:
+            self.Pg_tot = 0
+            self.Pg_min = 0
+            self.chg_eff = 1.0
+
+        self.cyc_charge = False
+        self.hour = 0
+        self.pv_out = 0
+
+        if is_batt:
+            self.v_n = batt_dict['v_dc']
+            self.eff_conv = batt_dict['eff_conv']
+            self.SOC_min = batt_dict['SOC_min']
+            self.SOC_cyc = batt_dict['SOC_cyc']
+            self.p_set = batt_dict['p_set']
+            self.t_set = batt_dict['t_set']
+            self.k, self.c, self.qmax, self.batt_step = battery_model(batt_dict)
+
+            # Initial charge is assumed to be qmax (as for chron_sim.run_sim)
+            self.q1 = self.qmax * self.c
+            self.q2 = self.qmax * (1 - self.c)
+            self.soc = batt_dict['SOC_0']
+        else:
+            self.q1 = 0
+            self.q2 = 0
+            self.soc = 0
+
+    def snapshot(self):
+        """Returns a copy of the simulator state"""
+        return (self.q1, self.q2, self.soc, self.cyc_charge, self.hour, self.pv_out)
+
+    def restore(self, state):
+        """Restores the simulator state from a snapshot"""
+        self.q1, self.q2, self.soc, self.cyc_charge, self.hour, self.pv_out = state
+
+    def _battery(self, i_b):
+        """Steps the battery with current i_b (A) and returns the wasted current (A)"""
+        self.q1, self.q2, i_w = self.batt_step(self.q1, self.q2, self.k, self.c, self.qmax, i_b, 1)
+        self.soc = (self.q1 + self.q2) / self.qmax * 100
+        return i_w
+
+    def step(self, load, pv):
+        """
+        Simulates one hour
+
+        Inputs:
+            load    Load demand for the hour (W)
+            pv      PV array output for the hour (W, including inverter / SCC efficiency)
+
+        Outputs:
+            StepResult(P_gen, P_gen_exc, P_uns, P_pv_exc, q) for the hour
+        """
+        topo = self.topo[0]
+        if topo == 0:
+            result = StepResult(min(load, self.Pg_tot), max(self.Pg_min - load, 0), max(load - self.Pg_tot, 0), 0, 0)
+        elif topo == 1:
+            result = self._pv_gen(load, pv)
+        elif topo == 2:
+            result = self._pv_batt(load, pv)
+        elif self.ctrl_mode in [1, 2, 3]:
+            result = self._battery_dominant(load, pv)
+        elif self.ctrl_mode == 4:
+            result = self._ramp_control(load, pv)
+        else:
+            raise ValueError('Unsupported control mode')
+
+        self.hour = self.hour + 1
+        return result
+
+    def _pv_gen(self, load, pv):
+        """Solar PV-generator topology"""
+        Pg_min = self.Pg_min
+        Pg_tot = self.Pg_tot
+
+        if (pv + Pg_min) > load:
+            # Low load conditions
+            if pv > 0 and Pg_min < load:
+                # Partial PV output curtailed / dumped
+                return StepResult(Pg_min, 0, 0, pv + Pg_min - load, 0)
+            if pv > 0 and Pg_min > load:
+                # All PV output curtailed / dumped
+                return StepResult(load, Pg_min - load, 0, pv, 0)
+            return StepResult(load, Pg_min - load, 0, 0, 0)
+        if (Pg_tot + pv) < load:
+            # Generator under-capacity / overloaded
+            return StepResult(Pg_tot, 0, load - Pg_tot - pv, 0, 0)
+        # Normal operation
+        return StepResult(load - pv, 0, 0, 0, 0)
+
+    def _pv_batt(self, load, pv):
+        """Solar PV-battery topology"""
+        v_n = self.v_n
+        eff_conv = self.eff_conv
+
+        if self.pv_cpl == 'DC':
+            i = (load / (v_n * eff_conv) - pv / v_n) / eff_conv
+        else:
+            i = (load - pv) / v_n
+            if i < 0:
+                i = i * eff_conv
+            else:
+                i = i / eff_conv
+
+        if (self.soc < self.SOC_min) and (i > 0):
+            # Battery under minimum SOC, load unsupplied
+            return StepResult(0, 0, i * v_n, 0, self.soc)
+
+        i_w = self._battery(i)
+        return StepResult(0, 0, 0, max(i_w, 0) * v_n, self.soc)
+
+    def _battery_dominant(self, load, pv):
+        """Solar PV-battery-generator topology, control modes 1-3"""
+        v_n = self.v_n
+        eff_conv = self.eff_conv
+        ctrl_mode = self.ctrl_mode
+        Pg_tot = self.Pg_tot
+        Pg_min = self.Pg_min
+
+        # Net battery current (positive current denotes battery discharge)
+        if self.pv_cpl == 'DC':
+            i_b = load / (v_n * eff_conv) - pv / v_n
+        else:
+            i_l = (load - pv) / v_n
+            if i_l < 0:
+                i_b = i_l * eff_conv
+            else:
+                i_b = i_l / eff_conv
+
+        if not ((self.soc < self.SOC_min) or self.cyc_charge):
+            # Generator not in operation
+            i_w = self._battery(i_b)
+            return StepResult(0, 0, 0, max(i_w, 0) * v_n, self.soc)
+
+        P_uns = 0
+        if i_b > 0:
+            # Inadequate PV to supply the load
+            if ctrl_mode == 1:
+                e_g = i_b * v_n / self.chg_eff
+            else:
+                e_g = i_b * v_n / eff_conv
+
+            if e_g > Pg_tot:
+                # Generator overloaded
+                P_uns = e_g - Pg_tot
+                P_gen = Pg_tot
+                i_b = 0
+            elif ctrl_mode == 3:
+                # Generator load-following mode
+                if e_g < Pg_min:
+                    P_gen = Pg_min
+                    i_b = -(Pg_min - e_g) * eff_conv / v_n
+                else:
+                    P_gen = e_g
+                    i_b = 0
+            else:
+                # Generator has excess capacity to supply battery
+                P_gen = Pg_tot
+                if ctrl_mode == 1:
+                    i_b = -(Pg_tot - e_g) * self.chg_eff / v_n
+                else:
+                    i_b = -(Pg_tot - e_g) * eff_conv / v_n
+        else:
+            # Adequate PV to supply the load (and excess PV goes to battery)
+            P_gen = Pg_tot
+            i_b = i_b - Pg_tot * self.chg_eff / v_n
+
+        i_w = self._battery(i_b)
+
+        # Keep generator in cycle charging mode until the cycle charge setpoint is reached (modes 1 and 2)
+        self.cyc_charge = self.soc < self.SOC_cyc and ctrl_mode in [1, 2]
+
+        return StepResult(P_gen, max(i_w, 0) * v_n, P_uns, 0, self.soc)
+
+    def _ramp_control(self, load, pv):
+        """Solar PV-battery-generator topology, control mode 4 (genset grid former, battery ramp control)"""
+        v_n = self.v_n
+        eff_conv = self.eff_conv
+        Pg_tot = self.Pg_tot
+        Pg_min = self.Pg_min
+        p_set = self.p_set
+
+        # Hour of the day
+        h = (self.hour + 1) % 24
+
+        if h >= self.t_set[0] and h < self.t_set[1] and load > p_set:
+            # Solar / battery ramp (output) control
+            if self.pv_cpl == 'DC':
+                i_b = p_set / (v_n * eff_conv) - pv / v_n
+            else:
+                i_net = (p_set - pv) / v_n
+                if i_net < 0:
+                    i_b = i_net * eff_conv
+                else:
+                    i_b = i_net / eff_conv
+
+            p_def = 0
+            if (self.soc < self.SOC_min) and (i_b > 0):
+                # Battery under minimum SOC, do not discharge further
+                p_def = i_b * v_n * eff_conv
+                i_b = 0
+
+            # Generator loading (pv_out is the AC side PV output of the last hour outside the
+            # ramp control window, as in chron_sim.run_sim)
+            P_uns = 0
+            if (p_set - p_def + Pg_min) > load:
+                P_gen = Pg_min
+                P_gen_exc = Pg_min - load + p_set - p_def
+            else:
+                P_gen_exc = 0
+                if (Pg_tot + self.pv_out) < load:
+                    P_gen = Pg_tot
+                    P_uns = load - Pg_tot - (p_set - p_def)
+                else:
+                    P_gen = load - self.pv_out
+
+            i_w = self._battery(i_b)
+            return StepResult(P_gen, P_gen_exc, P_uns, max(i_w, 0) * v_n, self.soc)
+
+        # Normal PV-generator operation (with any excess PV charging the battery)
+        if self.pv_cpl == 'DC':
+            pv_out = pv * eff_conv
+        else:
+            pv_out = pv
+        self.pv_out = pv_out
+
+        pv_exc = 0
+        P_uns = 0
+        P_gen_exc = 0
+        if (pv_out + Pg_min) > load:
+            # Low load conditions
+            if pv_out > 0 and Pg_min < load:
+                # Partial PV output used to charge battery
+                pv_exc = pv_out + Pg_min - load
+                P_gen = Pg_min
+            else:
+                P_gen_exc = Pg_min - load
+                P_gen = load
+                if pv_out > 0 and Pg_min > load:
+                    pv_exc = pv_out
+        elif (Pg_tot + pv_out) < load:
+            # Generator under-capacity / overloaded
+            P_gen = Pg_tot
+            P_uns = load - Pg_tot - pv_out
+        else:
+            # Normal operation
+            P_gen = load - pv_out
+
+        # Excess PV current at DC side
+        if self.pv_cpl == 'DC':
+            i_b = -pv_exc / (v_n * eff_conv)
+        else:
+            i_b = -pv_exc / v_n * eff_conv
+
+        i_w = self._battery(i_b)
+        return StepResult(P_gen, P_gen_exc, P_uns, max(i_w, 0) * v_n, self.soc)
+
+def run_sim_stream(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, n_years=1, profile_fn=generate_profiles):
+    """
+    Runs a chronological simulation and yields the results one month at a time
+
+    The results are identical to chron_sim.run_sim (with the same random state). The caller can
+    stop iterating at any time to cancel the run.
+
+    Inputs:
+        sys_dict, pv_dict, batt_dict, gen_dict, load_dict   Input dictionaries (as for chron_sim.run_sim)
+        n_years     Number of years to simulate (new load and solar data are generated for each year)
+        profile_fn  Function generating the load and solar data of each year (called as
+                    chron_sim.generate_profiles, which is the default)
+
+    Outputs:
+        chunk       Dictionary of results for one month: 'year', 'month' (0-11), 'start' (hour of the
+                    run at the start of the month), 'topo', hourly 'P_ld', 'P_gen', 'P_gen_exc', 'P_uns'
+                    and 'P_pv_exc', with 'G0', 'GT' and 'P_pv' for PV systems, and 'q0' (state of charge
+                    at the start of the month), 'q' (state of charge at the end of each hour) and
+                    'qmax' for battery systems
+    """
+    days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    sim = Simulator(sys_dict, pv_dict, batt_dict, gen_dict)
+
+    start = 0
+    for year in range(n_years):
+        profiles = profile_fn(sys_dict, pv_dict, load_dict)
+        P_ld = profiles['P_ld']
+        P_pv = profiles.get('P_pv', np.zeros(len(P_ld)))
+
+        h0 = 0
+        for month in range(12):
+            h1 = h0 + days[month] * 24
+            q0 = sim.soc
+            out = np.array([sim.step(P_ld[i], P_pv[i]) for i in range(h0, h1)])
+
+            chunk = {
+                'year'      : year,
+                'month'     : month,
+                'start'     : start + h0,
+                'topo'      : sim.topo,
+                'P_ld'      : P_ld[h0:h1],
+                'P_gen'     : out[:,0],
+                'P_gen_exc' : out[:,1],
+                'P_uns'     : out[:,2],
+                'P_pv_exc'  : out[:,3]
+            }
+            if sys_dict['is_pv']:
+                for key in ['G0', 'GT', 'P_pv']:
+                    chunk[key] = np.asarray(profiles[key][h0:h1], dtype=float)
+            if sys_dict['is_batt']:
+                chunk['q0'] = q0
+                chunk['q'] = out[:,4]
+                chunk['qmax'] = sim.qmax
+
+            yield chunk
+            h0 = h1
+        start = start + len(P_ld)
+
+def join_chunks(chunks):
+    """
+    Joins the chunks yielded by run_sim_stream into a dictionary of outputs in the same form as
+    chron_sim.run_sim (hourly outputs as numpy arrays)
+    """
+    topo = chunks[0]['topo']
+
+    def join(key):
+        if key not in chunks[0]:
+            return np.zeros(0)
+        return np.concatenate([chunk[key] for chunk in chunks]).astype(float)
+
+    sim_out = {'topo' : topo}
+    for key in ['P_ld', 'G0', 'GT', 'P_pv', 'P_gen', 'P_gen_exc', 'P_uns', 'P_pv_exc']:
+        sim_out[key] = join(key)
+
+    # Outputs that chron_sim.run_sim leaves empty (or does not return) for the topology
+    if topo[0] == 0:
+        sim_out['P_pv_exc'] = np.zeros(0)
+        del sim_out['GT']
+    if topo[0] == 2:
+        sim_out['P_gen'] = np.zeros(0)
+        sim_out['P_gen_exc'] = np.zeros(0)
+    if 'q' in chunks[0]:
+        sim_out['q'] = np.concatenate([[chunks[0]['q0']], join('q')])
+        sim_out['qmax'] = chunks[0]['qmax']
+    else:
+        sim_out['q'] = np.zeros(0)
+
+    return sim_out
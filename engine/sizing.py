@@ -0,0 +1,208 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Two-Stage Design Sizing
+
+Candidate designs are first screened with the vectorised energy bucket battery model and the
+best candidates are then re-simulated with the full kinetic battery model in chron_sim.run_sim.
+The difference between the two stages is reported as the screening error.
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import copy
+import numpy as np
+
+import engine.bucket_battery as bb
+import engine.pv_power as pv_power
+from engine.chron_sim import generate_profiles, run_sim
+
+def fuel_objective(metrics):
+    """
+    Default sizing objective: annual fuel use (litres) plus a penalty of 10 litres per kWh unsupplied
+    """
+    return metrics['fuel'] + 10 * metrics['E_uns']
+
+def design_metrics(P_gen, P_gen_exc, P_uns, P_pv_exc, e_f):
+    """
+    Returns the annual summary metrics used to rank candidate designs
+
+    Inputs:
+        P_gen       Hourly generator output (W), array of shape (n_cand, 8760) or (8760,)
+        P_gen_exc   Hourly excess generator output (W)
+        P_uns       Hourly power unsupplied (W)
+        P_pv_exc    Hourly excess solar PV output (W)
+        e_f         Generator fuel efficiency (litres/kWh)
+
+    Outputs:
+        metrics     Dictionary of annual energies in kWh ('E_gen', 'E_gen_exc', 'E_uns', 'E_pv_exc')
+                    and fuel use in litres ('fuel')
+    """
+    metrics = {
+        'E_gen'     : np.sum(P_gen, axis=-1) / 1000,
+        'E_gen_exc' : np.sum(P_gen_exc, axis=-1) / 1000,
+        'E_uns'     : np.sum(P_uns, axis=-1) / 1000,
+        'E_pv_exc'  : np.sum(P_pv_exc, axis=-1) / 1000
+    }
+    metrics['fuel'] = (metrics['E_gen'] + metrics['E_gen_exc']) * e_f
+
+    return metrics
+
+def apply_candidate(pv_dict, batt_dict, gen_dict, candidate):
+    """
+    Returns copies of the PV, battery and generator dictionaries with the candidate design applied
+
+    Inputs:
+        candidate   Dictionary of design overrides, any of 'P_stc', 'P_inv', 'n_batt', 'n_gen', 'P_gen'
+    """
+    pv_dict = copy.deepcopy(pv_dict)
+    batt_dict = copy.deepcopy(batt_dict)
+    gen_dict = copy.deepcopy(gen_dict)
+
+    for key, value in candidate.items():
+        if key in ['P_stc', 'P_inv']:
+            pv_dict[key] = value
+        elif key == 'n_batt':
+            batt_dict[key] = value
+        elif key in ['n_gen', 'P_gen']:
+            gen_dict[key] = value
+        else:
+            raise ValueError('Unsupported design parameter: ' + str(key))
+
+    return pv_dict, batt_dict, gen_dict
+
+def screen_designs(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, candidates, seed=0, objective=fuel_objective):
+    """
+    Screens a set of candidate designs with the energy bucket battery model
+
+    Inputs:
+        sys_dict    Dictionary of system design parameters (PV-battery or PV-battery-generator
+                    topology with control mode 1, 2 or 3)
+        pv_dict     Dictionary of solar PV input parameters
+        batt_dict   Dictionary of battery input parameters
+        gen_dict    Dictionary of generator input parameters
+        load_dict   Dictionary of load input parameters
+        candidates  List of candidate design dictionaries (see apply_candidate)
+        seed        Random seed for the load and solar data
+        objective   Function mapping a dictionary of design metrics to a scalar (lower is better)
+
+    Outputs:
+        scores      Array of objective values for each candidate
+        metrics     Dictionary of design metrics, each an array over the candidates
+    """
+    if not sys_dict['is_pv'] or not sys_dict['is_batt']:
+        raise ValueError('Design screening requires a PV-battery or PV-battery-generator topology')
+    if pv_dict.get('arrays'):
+        # The candidate PV size and inverter limit apply to a single array
+        raise ValueError('Design screening does not support PV sub-arrays')
+
+    if sys_dict['is_gen']:
+        ctrl_mode = sys_dict['ctrl_mode'] + 1
+        if ctrl_mode not in [1, 2, 3]:
+            raise ValueError('Design screening only supports control modes 1, 2 and 3')
+    else:
+        ctrl_mode = 0
+
+    # Generate the load and solar data once for all candidates
+    np.random.seed(seed)
+    profiles = generate_profiles(sys_dict, pv_dict, load_dict)
+    P_ld = profiles['P_ld']
+
+    n_cand = len(candidates)
+    P_pv = np.zeros((n_cand, len(P_ld)))
+    qmax = np.zeros(n_cand)
+    ic_max = np.zeros(n_cand)
+    id_max = np.zeros(n_cand)
+    Pg_tot = np.zeros(n_cand)
+    Pg_min = np.zeros(n_cand)
+
+    for j in range(n_cand):
+        pv_j, batt_j, gen_j = apply_candidate(pv_dict, batt_dict, gen_dict, candidates[j])
+
+        # PV output of the candidate array and inverter (the output in the profiles is already
+        # limited at the base inverter rating, so it cannot be scaled)
+        P_pv[j] = pv_power.pv_power(profiles['GT'], profiles['T_amb'], pv_j)
+
+        qmax[j] = batt_j['C_nom'] * batt_j['n_batt']
+        ic_max[j], id_max[j] = bb.current_limits(batt_j['C_nom'], batt_j['n_batt'], batt_j.get('C_rate_chg', 0.2), batt_j.get('C_rate_dis', 1.0))
+
+        if sys_dict['is_gen']:
+            Pg_tot[j] = gen_j['n_gen'] * gen_j['P_gen'] * 1000
+            Pg_min[j] = gen_j['n_gen'] * gen_j['l_min'] * gen_j['P_gen'] * 1000
+
+    design = {
+        'qmax'      : qmax,
+        'ic_max'    : ic_max,
+        'id_max'    : id_max,
+        'Pg_tot'    : Pg_tot,
+        'Pg_min'    : Pg_min,
+        'v_n'       : batt_dict['v_dc'],
+        'eff_conv'  : batt_dict['eff_conv'],
+        'chg_eff'   : gen_dict.get('chg_eff', 1.0),
+        'eff_chg'   : batt_dict.get('eff_chg', 1.0),
+        'eff_dis'   : batt_dict.get('eff_dis', 1.0),
+        'SOC_0'     : batt_dict['SOC_0'],
+        'SOC_min'   : batt_dict['SOC_min'],
+        'SOC_cyc'   : batt_dict['SOC_cyc'],
+        'pv_cpl'    : pv_dict['pv_cpl']
+    }
+
+    sim_out = bb.simulate(P_ld, P_pv, design, ctrl_mode)
+    metrics = design_metrics(sim_out['P_gen'], sim_out['P_gen_exc'], sim_out['P_uns'], sim_out['P_pv_exc'], gen_dict.get('e_f', 0))
+    scores = np.array([objective({key : metrics[key][j] for key in metrics}) for j in range(n_cand)])
+
+    return scores, metrics
+
+def two_stage_sizing(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, candidates, top_n=5, seed=0, objective=fuel_objective):
+    """
+    Screens candidate designs with the energy bucket battery model, then re-simulates the top_n
+    candidates with the kinetic battery model (using the same load and solar data)
+
+    Inputs:
+        (as for screen_designs)
+        top_n       Number of best screened candidates to re-simulate with the kinetic battery model
+
+    Outputs:
+        results     Dictionary with:
+                        'screen_scores'     Screening objective for every candidate
+                        'ranking'           Candidate indices of the top_n candidates (best screened first)
+                        'kibam_scores'      Kinetic battery model objective for the top_n candidates
+                        'best'              Index of the best candidate after re-simulation
+                        'screen_error'      Relative error of the screening objective for the top_n candidates
+                        'max_screen_error'  Largest absolute relative screening error
+                        'rank_agreement'    True if both stages rank the top_n candidates in the same order
+    """
+    screen_scores, screen_metrics = screen_designs(sys_dict, pv_dict, batt_dict, gen_dict, load_dict, candidates, seed, objective)
+    ranking = np.argsort(screen_scores, kind='stable')[:top_n]
+
+    kibam_scores = np.zeros(len(ranking))
+    for n, j in enumerate(ranking):
+        pv_j, batt_j, gen_j = apply_candidate(pv_dict, batt_dict, gen_dict, candidates[j])
+        batt_j['model'] = 'kibam'
+
+        # Re-seed so that the kinetic battery run sees the same load and solar data
+        np.random.seed(seed)
+        sim_out = run_sim(sys_dict, pv_j, batt_j, gen_j, load_dict)
+        metrics = design_metrics(sim_out['P_gen'], sim_out['P_gen_exc'], sim_out['P_uns'], sim_out['P_pv_exc'], gen_dict.get('e_f', 0))
+        kibam_scores[n] = objective(metrics)
+
+    screen_top = screen_scores[ranking]
+    screen_error = (screen_top - kibam_scores) / np.where(kibam_scores != 0, np.abs(kibam_scores), 1)
+
+    results = {
+        'screen_scores'     : screen_scores,
+        'ranking'           : ranking,
+        'kibam_scores'      : kibam_scores,
+        'best'              : ranking[np.argmin(kibam_scores)],
+        'screen_error'      : screen_error,
+        'max_screen_error'  : np.max(np.abs(screen_error)),
+        'rank_agreement'    : bool(np.all(np.argsort(kibam_scores, kind='stable') == np.arange(len(ranking))))
+    }
+
+    return results
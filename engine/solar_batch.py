@@ -0,0 +1,295 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Batched Multi-Site Solar Synthesis
+
+Versions of the synth_solar functions that synthesise a year of hourly irradiance for many sites
+(each with its own latitude, monthly mean clearness indices and array orientation) in one call.
+Every result is an array of shape (n_sites, 8760).
+
+The solar geometry (trend irradiances and beam ratios) is calculated by broadcasting over sites,
+days and hours, and gives the same values as synth_solar.cached_trend and synth_solar.beam_ratio.
+The stochastic models are the same as in synth_solar (Aguiar Markov transition matrices for daily
+clearness indices, TAG model for hourly clearness indices), stepped through the days of the year
+(daily model) or the hours of the day (hourly model) for all sites, and all days, at once. The
+random numbers are drawn in a different order, so the sequences are statistically equivalent to,
+but not the same as, running the single-site functions for each site with the same seed.
+
+Main Functions
+--------------
+- trend_matrix: hourly trend (extraterrestrial) irradiances for each site
+- beam_ratio_matrix: hourly ratios of tilted to horizontal beam irradiance for each site
+- batch_daily_Kt: daily clearness indices for each site
+- batch_hourly_kt: hourly clearness indices for each site
+- batch_hourly_G0: hourly irradiances on a horizontal plane for each site (W/m2)
+- batch_incident_HDKR: hourly irradiances incident on a tilted plane for each site (W/m2)
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+
+from engine.synth_solar import MTM_LIB, MTM_MAX, MTM_MIN, MTM_STATES, _beam_ratio_hours, declination, eccentricity, sunrise
+
+DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# Cumulative transition matrices and states of each mean monthly Kt band (as in synth_solar.Aguiar_daily_Kt)
+MTM_CUM = np.array([np.cumsum(np.asarray(MTM_LIB[i]), axis=1) for i in range(10)])
+MTM_STEP = (np.array(MTM_MAX) - np.array(MTM_MIN)) / 10
+MTM_STATE_VALUES = np.array([np.arange(MTM_MIN[i], MTM_MAX[i], MTM_STEP[i]) for i in range(10)])
+
+def _sites(values, n_sites=None):
+    """Returns a per-site parameter as a column array of shape (n_sites, 1)"""
+    values = np.atleast_1d(np.asarray(values, dtype=float))
+    if n_sites is not None:
+        values = np.broadcast_to(values, (n_sites,))
+    return values.reshape(-1, 1)
+
+def trend_matrix(lats):
+    """
+    Returns the annual sequences of hourly trend (extraterrestrial) irradiances on a horizontal
+    plane for several sites (as synth_solar.trend_sequence)
+
+    Inputs:
+        lats        Latitudes of the sites (in decimal degrees), array of length n_sites
+
+    Outputs:
+        G0c         Trend irradiances (W/m2), shape (n_sites, 8760)
+    """
+    lat_rad = np.radians(_sites(lats))
+    n = np.arange(1,366)
+    epsilon = eccentricity(n)
+    delta = declination(n)
+    omega = sunrise(delta, lat_rad)
+
+    # Daily extraterrestrial irradiation (on a horizontal plane) Wh/m2/day, shape (n_sites, 365)
+    B0d = 24 / np.pi * 1367 * epsilon * (omega * np.sin(delta) * np.sin(lat_rad) - np.cos(delta) * np.cos(lat_rad) * np.sin(-omega))
+
+    # Hour angles at the start, end and centre of each hour
+    h = np.arange(1,25)
+    h_start = (h - 13) * np.pi / 12
+    h_end = (h - 12) * np.pi / 12
+    h_ang = (h - 12.5) * np.pi / 12
+
+    # Hourly clear sky irradiance, shape (n_sites, 365, 24)
+    omega_s = -omega[:,:,np.newaxis]
+    a = 0.409 - 0.5016 * np.sin(omega_s + 60 * np.pi/180)
+    b = 0.6609 + 0.4767 * np.sin(omega_s + 60 * np.pi/180)
+    G0c = np.pi / 24 * (np.cos(h_ang) - np.cos(omega_s)) / (omega_s * np.cos(omega_s) - np.sin(omega_s)) * (a + b * np.cos(h_ang)) * B0d[:,:,np.newaxis]
+
+    # Zero irradiance before sunrise and after sunset
+    h_sunrise = np.sum(h_start <= omega_s, axis=2, keepdims=True)
+    h_sunset = np.sum(h_end <= -omega_s, axis=2, keepdims=True)
+    hour = np.arange(24)
+    G0c = np.where((hour < h_sunrise) | (hour >= h_sunset), 0.0, G0c)
+
+    return G0c.reshape(len(lat_rad), 8760)
+
+def beam_ratio_matrix(lats, tilts, azimuths):
+    """
+    Returns the ratios of beam irradiance on a tilted surface to beam irradiance on a horizontal
+    surface for every hour of the year for several sites (as synth_solar.beam_ratio)
+
+    Inputs:
+        lats        Latitudes of the sites (in decimal degrees), array of length n_sites
+        tilts       Tilt angles of the surfaces (in degrees), scalar or array of length n_sites
+        azimuths    Azimuthal angles of the surfaces (in degrees), scalar or array of length n_sites
+
+    Outputs:
+        Rb          Beam ratios, shape (n_sites, 8760)
+    """
+    phi = np.radians(_sites(lats))
+    beta = np.radians(_sites(tilts, len(phi)))
+    gamma = np.radians(_sites(azimuths, len(phi)))
+
+    return _beam_ratio_hours(phi, beta, gamma)
+
+def batch_daily_Kt(Ktm):
+    """
+    Generates a year of synthetic daily clearness indices for several sites with the Markov
+    transition matrices of synth_solar.Aguiar_daily_Kt (the first day of each month starts at the
+    mean clearness index of the previous month)
+
+    Inputs:
+        Ktm         Monthly mean clearness indices, shape (n_sites, 12)
+
+    Outputs:
+        Kt          Daily clearness indices, shape (n_sites, 365)
+    """
+    Ktm = np.atleast_2d(np.asarray(Ktm, dtype=float))
+    n_sites = Ktm.shape[0]
+    sites = np.arange(n_sites)
+    Kt = np.empty((n_sites, 365))
+
+    d = 0
+    Kt0 = Ktm[:,11]
+    for m in range(12):
+        # Transition matrices and states of each site for the month
+        band = np.sum(np.array(MTM_STATES) <= Ktm[:,m,np.newaxis], axis=1)
+        cum = MTM_CUM[band]
+        states = MTM_STATE_VALUES[band]
+        step = MTM_STEP[band]
+
+        Kti = Kt0
+        Kt[:,d] = Kti
+        for i in range(1, DAYS[m]):
+            # Transition from the state of the previous day (state 0 wraps to the last row, as in Aguiar_daily_Kt)
+            row = np.sum(states <= Kti[:,np.newaxis], axis=1)
+            cum_row = cum[sites, (row - 1) % 10]
+
+            # The random number is scaled to the row total, since some rows of the published
+            # matrices sum to slightly less than 1 (which would leave no state to interpolate in)
+            R = np.random.rand(n_sites) * cum_row[:,-1]
+            new_state = np.sum(cum_row <= R[:,np.newaxis], axis=1) + 1
+
+            # Interpolate within the new state
+            lower = np.where(new_state == 1, 0.0, cum_row[sites, np.maximum(new_state - 2, 0)])
+            k_interp = (R - lower) / (cum_row[sites, new_state - 1] - lower)
+            Kti = states[sites, new_state - 1] + k_interp * step
+            Kt[:,d + i] = Kti
+
+        d = d + DAYS[m]
+        Kt0 = Ktm[:,m]
+
+    return Kt
+
+def batch_hourly_kt(Kt, lats, max_iter=10, stats=None):
+    """
+    Generates a year of synthetic hourly clearness indices for several sites with the TAG model of
+    synth_solar.Aguiar_hourly_kt. All days of all sites are generated together, hour by hour.
+
+    Inputs:
+        Kt          Daily clearness indices, shape (n_sites, 365)
+        lats        Latitudes of the sites (in decimal degrees), array of length n_sites
+        max_iter    Maximum number of iterations for each new kt
+        stats       Optional dictionary in which the number of rejected samples is accumulated
+                    (under the key 'kt_retries')
+
+    Outputs:
+        kt          Hourly clearness indices, shape (n_sites, 8760)
+    """
+    Kt = np.atleast_2d(np.asarray(Kt, dtype=float))
+    lat_rad = np.radians(_sites(lats))
+    delta = declination(np.arange(1,366))
+    omega = sunrise(delta, lat_rad)
+    delta = np.broadcast_to(delta, Kt.shape)
+    lat_rad = np.broadcast_to(lat_rad, Kt.shape)
+
+    # Autocorrelation coefficient and algorithm constants of each day, shape (n_sites, 365)
+    phi = 0.38 + 0.06 * np.cos(7.4*Kt - 2.5)
+    lmbda = -0.19 + 1.12 * Kt + 0.24 * np.exp(-8 * Kt)
+    eta = 0.32 - 1.6 * (Kt - 0.5) ** 2
+    kappa = 0.19 + 2.27 * Kt ** 2 - 2.51 * Kt ** 3
+    A = 0.14 * np.exp (-20 * (Kt - 0.35) ** 2)
+    B = 3 * (Kt - 0.45) ** 2 + 16 * Kt ** 5
+
+    kt = np.zeros(Kt.shape + (24,))
+    y = np.zeros(Kt.shape)
+    retries = 0
+    for h in range(1,25):
+        angle_start = (h - 13) * np.pi / 12
+        angle_end = (h - 12) * np.pi / 12
+        sun = np.nonzero((angle_start > -omega) & (angle_end < omega))
+        y_prev = y[sun]
+        y = np.zeros(Kt.shape)
+        if len(y_prev) == 0:
+            continue
+
+        # Clear sky clearness index, solar elevation, mean and standard deviation of the sunlit days
+        kcs = 0.88 * np.cos(np.pi * (h - 12.5) / 30)
+        h_ang = (h - 12.5) * np.pi / 12
+        hs = np.arcsin (np.cos(h_ang) * np.cos(delta[sun]) * np.cos(lat_rad[sun]) + np.sin(delta[sun]) * np.sin(lat_rad[sun]))
+        ktm = lmbda[sun] + eta[sun] * np.exp(-kappa[sun] / np.sin(hs))
+        sigma = A[sun] * np.exp (B[sun] * (1 - np.sin(hs)))
+        phi_sun = phi[sun]
+
+        # Redraw kt where it is below 0 or above the clear sky kt (clipped after max_iter redraws)
+        kti = np.empty(len(y_prev))
+        yi = np.empty(len(y_prev))
+        pending = np.arange(len(y_prev))
+        for n_iter in range(max_iter + 1):
+            z = np.random.rand(len(pending))
+            r = sigma[pending] * (z ** 0.135 - (1 - z) ** 0.135) / 0.1975
+            yi[pending] = phi_sun[pending] * y_prev[pending] + r
+            kti[pending] = ktm[pending] + sigma[pending] * yi[pending]
+            if n_iter == max_iter:
+                kti[pending] = np.clip(kti[pending], 0, kcs)
+            pending = pending[(kti[pending] < 0) | (kti[pending] > kcs)]
+            if len(pending) == 0:
+                break
+            retries = retries + len(pending)
+
+        kt[sun + (h - 1,)] = kti
+        y[sun] = yi
+
+    if stats is not None:
+        stats['kt_retries'] = stats.get('kt_retries', 0) + retries
+
+    return kt.reshape(Kt.shape[0], 8760)
+
+def batch_hourly_G0(Ktm, lats, stats=None):
+    """
+    Generates a year of synthetic hourly irradiances on a horizontal plane for several sites
+    (as synth_solar.Aguiar_hourly_G0)
+
+    Inputs:
+        Ktm         Monthly mean clearness indices, shape (n_sites, 12)
+        lats        Latitudes of the sites (in decimal degrees), array of length n_sites
+        stats       Optional dictionary of counters (see batch_hourly_kt)
+
+    Outputs:
+        G0          Hourly global horizontal irradiances (W/m2), shape (n_sites, 8760)
+        kt          Hourly clearness indices, shape (n_sites, 8760)
+    """
+    kt = batch_hourly_kt(batch_daily_Kt(Ktm), lats, 10, stats)
+    G0 = trend_matrix(lats) * kt
+
+    return G0, kt
+
+def batch_incident_HDKR(G0, kt, lats, tilts, azimuths, albedos):
+    """
+    Calculates the hourly irradiances incident on tilted surfaces for several sites with the HDKR
+    model (as synth_solar.incident_HDKR)
+
+    Inputs:
+        G0          Hourly global horizontal irradiances (W/m2), shape (n_sites, 8760)
+        kt          Hourly clearness indices, shape (n_sites, 8760)
+        lats        Latitudes of the sites (in decimal degrees), array of length n_sites
+        tilts       Tilt angles of the surfaces (in degrees), scalar or array of length n_sites
+        azimuths    Azimuthal angles of the surfaces (in degrees), scalar or array of length n_sites
+        albedos     Ground reflectances (per unit), scalar or array of length n_sites
+
+    Outputs:
+        GT          Hourly incident irradiances (W/m2), shape (n_sites, 8760)
+    """
+    G0 = np.atleast_2d(np.asarray(G0, dtype=float))
+    kt = np.atleast_2d(np.asarray(kt, dtype=float))
+    n_sites = G0.shape[0]
+    beta = np.radians(_sites(tilts, n_sites))
+    albedo = _sites(albedos, n_sites)
+    G0c = trend_matrix(lats)
+    Rb = beam_ratio_matrix(lats, tilts, azimuths)
+
+    # Diffuse fraction
+    Df = np.where(kt <= 0.22, 1.0 - 0.09 * kt,
+                  np.where(kt <= 0.8, 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4, 0.165))
+
+    # Beam and diffuse radiation
+    Gb = (1 - Df) * G0
+    Gd = Df * G0
+
+    # Horizon brightening factor and anisotropy index (zero at night)
+    day = G0 > 0
+    f = np.sqrt(np.divide(Gb, G0, out=np.zeros(G0.shape), where=day))
+    Ai = np.divide(Gb, G0c, out=np.zeros(G0.shape), where=day)
+
+    # Global radiation incident on PV array (HDKR model)
+    GT = (Gb + Gd * Ai) * Rb + Gd * (1 - Ai) * (1 + np.cos(beta)) / 2 * (1 + f * np.sin(beta/2) ** 3) + G0 * albedo * (1 - np.cos(beta)) / 2
+
+    return GT
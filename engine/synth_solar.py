@@ -13,6 +13,9 @@ Main Functions
 - Aguiar_hourly_kt: generate sequence of hourly clearness indices for a single solar day
 - Aguiar_daily_Kt: generate sequence of daily clearness indices given mean monthly Kt
 - trend_sequence: generate annual sequence of hourly trend irradiances (no randomness)
+- cached_trend: memoised trend irradiances for a latitude
+- beam_ratio: memoised ratio of beam irradiance on a tilted plane to a horizontal plane
+- beam_ratios: beam ratios of several surface orientations
 - incident_HDKR: generate annual sequence of hourly irradiances incident on a tilted plane with HDKR model (W/m2)
 
 Note: all hourly sequences are calculated in terms of solar time at the location (not civil time)
@@ -37,8 +40,135 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+from functools import lru_cache
 import numpy as np
 
+# Markov Transition Matrices of Aguiar et al (keyed by mean monthly Kt band)
+MTM_LIB = {}
+MTM_STATES = [0.30, 0.35, 0.40, 0.45, 0.50, 0.55, 0.60, 0.65, 0.70]
+MTM_MIN = [0.031, 0.058, 0.051, 0.052, 0.028, 0.053, 0.044, 0.085, 0.010, 0.319]
+MTM_MAX = [0.705, 0.694, 0.753, 0.753, 0.807, 0.856, 0.818, 0.846, 0.842, 0.865]
+
+# Kt <= 0.30
+MTM_LIB[0] = np.matrix([[0.229,0.333,0.208,0.042,0.083,0.042,0.042,0.021,0.000,0.000],
+                [0.167,0.319,0.194,0.139,0.097,0.028,0.042,0.000,0.014,0.000],
+                [0.250,0.250,0.091,0.136,0.091,0.046,0.046,0.023,0.068,0.000],
+                [0.158,0.237,0.158,0.263,0.026,0.053,0.079,0.026,0.000,0.000],
+                [0.211,0.053,0.211,0.158,0.053,0.053,0.158,0.105,0.000,0.000],
+                [0.125,0.125,0.250,0.188,0.063,0.125,0.000,0.125,0.000,0.000],
+                [0.040,0.240,0.080,0.120,0.080,0.080,0.120,0.120,0.080,0.040],
+                [0.000,0.250,0.000,0.125,0.000,0.125,0.125,0.250,0.063,0.063],
+                [0.000,0.250,0.000,0.125,0.250,0.000,0.250,0.000,0.000,0.125],
+                [0.000,0.000,0.000,0.000,0.000,0.000,0.500,0.250,0.000,0.250]])
+
+# 0.30 < Kt <= 0.35
+MTM_LIB[1] = np.matrix([[0.000,0.000,0.091,0.000,0.364,0.091,0.182,0.000,0.273,0.000],
+                [0.118,0.118,0.176,0.118,0.059,0.118,0.176,0.059,0.059,0.000],
+                [0.067,0.267,0.067,0.200,0.067,0.000,0.133,0.133,0.000,0.067],
+                [0.118,0.235,0.000,0.235,0.059,0.176,0.118,0.000,0.059,0.000],
+                [0.077,0.154,0.308,0.077,0.154,0.077,0.000,0.077,0.077,0.000],
+                [0.083,0.000,0.167,0.250,0.083,0.167,0.000,0.083,0.167,0.000],
+                [0.222,0.222,0.000,0.111,0.111,0.000,0.111,0.222,0.000,0.000],
+                [0.091,0.182,0.273,0.000,0.091,0.273,0.000,0.091,0.000,0.000],
+                [0.111,0.111,0.111,0.222,0.000,0.000,0.000,0.222,0.111,0.111],
+                [0.000,0.000,0.000,0.000,0.000,0.000,0.500,0.000,0.000,0.500]])
+
+# 0.35 < Kt <= 0.40
+MTM_LIB[2] = np.matrix([[0.206,0.088,0.176,0.176,0.088,0.029,0.176,0.029,0.029,0.000],
+                [0.120,0.100,0.140,0.160,0.120,0.220,0.100,0.000,0.020,0.020],
+                [0.077,0.123,0.185,0.123,0.077,0.139,0.092,0.123,0.061,0.000],
+                [0.048,0.111,0.095,0.206,0.206,0.190,0.095,0.048,0.000,0.000],
+                [0.059,0.137,0.118,0.137,0.098,0.118,0.118,0.157,0.059,0.000],
+                [0.014,0.097,0.139,0.153,0.125,0.139,0.208,0.056,0.042,0.028],
+                [0.073,0.101,0.116,0.145,0.087,0.159,0.203,0.087,0.029,0.000],
+                [0.019,0.037,0.111,0.056,0.074,0.111,0.185,0.296,0.074,0.037],
+                [0.035,0.069,0.035,0.000,0.035,0.103,0.172,0.138,0.379,0.035],
+                [0.000,0.167,0.167,0.000,0.167,0.000,0.000,0.333,0.000,0.167]])
+
+# 0.40 < Kt <= 0.45                 
+MTM_LIB[3] = np.matrix([[0.167,0.167,0.167,0.000,0.083,0.125,0.000,0.167,0.125,0.000],
+                [0.117,0.117,0.150,0.117,0.083,0.117,0.200,0.067,0.017,0.017],
+                [0.049,0.085,0.134,0.158,0.098,0.110,0.134,0.134,0.061,0.037],
+                [0.039,0.090,0.141,0.141,0.167,0.141,0.090,0.141,0.039,0.013],
+                [0.009,0.139,0.074,0.093,0.194,0.139,0.167,0.093,0.074,0.019],
+                [0.036,0.018,0.117,0.099,0.144,0.180,0.180,0.117,0.072,0.036],
+                [0.000,0.046,0.061,0.061,0.136,0.159,0.273,0.167,0.098,0.000],
+                [0.016,0.056,0.080,0.128,0.104,0.080,0.160,0.208,0.136,0.032],
+                [0.011,0.053,0.021,0.043,0.128,0.096,0.074,0.223,0.277,0.074],
+                [0.000,0.074,0.037,0.000,0.074,0.074,0.074,0.074,0.333,0.259]])              
+
+# 0.45 < Kt <= 0.50
+MTM_LIB[4] = np.matrix([[0.120,0.200,0.160,0.120,0.120,0.120,0.080,0.000,0.040,0.040],
+                [0.100,0.080,0.120,0.140,0.140,0.200,0.180,0.040,0.000,0.000],
+                [0.046,0.114,0.068,0.171,0.125,0.171,0.080,0.159,0.057,0.011],
+                [0.015,0.061,0.084,0.099,0.191,0.153,0.153,0.115,0.115,0.015],
+                [0.024,0.030,0.098,0.098,0.165,0.195,0.195,0.140,0.043,0.012],
+                [0.015,0.026,0.062,0.124,0.144,0.170,0.170,0.222,0.062,0.005],
+                [0.000,0.013,0.045,0.108,0.112,0.175,0.188,0.224,0.117,0.018],
+                [0.008,0.023,0.054,0.066,0.093,0.125,0.191,0.253,0.183,0.004],
+                [0.006,0.022,0.061,0.033,0.067,0.083,0.139,0.222,0.322,0.044],
+                [0.000,0.046,0.091,0.091,0.046,0.046,0.136,0.091,0.273,0.182]])
+
+# 0.50 < Kt <= 0.55
+MTM_LIB[5] = np.matrix([[0.250,0.179,0.107,0.107,0.143,0.071,0.107,0.036,0.000,0.000],
+                [0.133,0.022,0.089,0.111,0.156,0.178,0.111,0.133,0.067,0.000],
+                [0.064,0.048,0.143,0.048,0.175,0.143,0.206,0.095,0.079,0.000],
+                [0.000,0.022,0.078,0.111,0.156,0.156,0.244,0.167,0.044,0.022],
+                [0.016,0.027,0.037,0.069,0.160,0.219,0.230,0.160,0.075,0.005],
+                [0.013,0.025,0.030,0.093,0.144,0.202,0.215,0.219,0.055,0.004],
+                [0.006,0.041,0.035,0.064,0.090,0.180,0.337,0.192,0.049,0.006],
+                [0.012,0.021,0.029,0.035,0.132,0.123,0.184,0.371,0.082,0.012],
+                [0.008,0.016,0.016,0.024,0.071,0.103,0.159,0.270,0.309,0.024],
+                [0.000,0.000,0.000,0.000,0.059,0.000,0.059,0.294,0.412,0.176]])
+
+# 0.55 < Kt <= 0.60
+MTM_LIB[6] = np.matrix([[0.217,0.087,0.000,0.174,0.130,0.087,0.087,0.130,0.087,0.000],
+                [0.026,0.079,0.132,0.079,0.026,0.158,0.158,0.132,0.158,0.053],
+                [0.020,0.020,0.020,0.040,0.160,0.180,0.160,0.200,0.100,0.100],
+                [0.025,0.013,0.038,0.076,0.076,0.139,0.139,0.266,0.215,0.013],
+                [0.030,0.030,0.050,0.020,0.091,0.131,0.162,0.283,0.131,0.071],
+                [0.006,0.006,0.013,0.057,0.057,0.121,0.204,0.287,0.185,0.064],
+                [0.004,0.026,0.037,0.030,0.093,0.107,0.193,0.307,0.167,0.037],
+                [0.011,0.009,0.014,0.042,0.041,0.071,0.152,0.418,0.203,0.041],
+                [0.012,0.022,0.022,0.038,0.019,0.050,0.113,0.281,0.360,0.084],
+                [0.008,0.024,0.039,0.039,0.063,0.039,0.118,0.118,0.284,0.268]])
+
+# 0.60 < Kt <= 0.65
+MTM_LIB[7] = np.matrix([[0.067,0.133,0.133,0.067,0.067,0.200,0.133,0.133,0.067,0.000],
+                [0.118,0.059,0.059,0.059,0.059,0.118,0.118,0.235,0.118,0.059],
+                [0.000,0.024,0.024,0.049,0.146,0.073,0.195,0.244,0.195,0.049],
+                [0.026,0.000,0.026,0.026,0.053,0.184,0.263,0.184,0.237,0.000],
+                [0.014,0.000,0.042,0.056,0.069,0.097,0.139,0.306,0.278,0.000],
+                [0.009,0.009,0.052,0.069,0.052,0.112,0.215,0.285,0.138,0.060],
+                [0.009,0.009,0.026,0.017,0.094,0.099,0.232,0.283,0.210,0.021],
+                [0.010,0.014,0.016,0.019,0.027,0.062,0.163,0.467,0.202,0.019],
+                [0.004,0.007,0.031,0.017,0.033,0.050,0.086,0.252,0.469,0.050],
+                [0.000,0.000,0.015,0.046,0.031,0.046,0.077,0.123,0.446,0.215]])
+
+# 0.65 < Kt <= 0.70
+MTM_LIB[8] = np.matrix([[0.000,0.000,0.000,0.000,0.000,0.000,0.000,0.000,1.000,0.000],
+                [0.000,0.000,0.000,0.000,0.000,0.000,0.000,0.000,1.000,0.000],
+                [0.000,0.000,0.000,0.000,0.000,0.000,0.250,0.250,0.500,0.000],
+                [0.000,0.000,0.000,0.000,0.250,0.000,0.000,0.375,0.250,0.125],
+                [0.000,0.000,0.000,0.083,0.000,0.167,0.167,0.250,0.333,0.000],
+                [0.000,0.000,0.042,0.042,0.042,0.083,0.083,0.292,0.292,0.125],
+                [0.000,0.000,0.032,0.000,0.000,0.032,0.129,0.387,0.355,0.065],
+                [0.000,0.000,0.000,0.038,0.038,0.075,0.047,0.340,0.415,0.047],
+                [0.004,0.004,0.007,0.007,0.011,0.030,0.052,0.141,0.654,0.089],
+                [0.000,0.000,0.000,0.000,0.061,0.061,0.030,0.030,0.349,0.470]])
+
+# Kt > 0.70
+MTM_LIB[9] = np.matrix([[0.000,0.000,0.000,0.000,0.000,0.000,0.000,0.000,1.000,0.000],
+                [0.100,0.100,0.100,0.100,0.100,0.100,0.100,0.100,0.100,0.100],
+                [0.000,0.000,0.000,0.250,0.000,0.000,0.000,0.500,0.250,0.000],
+                [0.000,0.000,0.143,0.143,0.000,0.143,0.143,0.429,0.000,0.000],
+                [0.000,0.000,0.000,0.200,0.000,0.000,0.200,0.400,0.200,0.000],
+                [0.000,0.000,0.000,0.000,0.000,0.000,0.222,0.444,0.333,0.000],
+                [0.000,0.000,0.000,0.000,0.080,0.080,0.080,0.480,0.240,0.040],
+                [0.000,0.000,0.027,0.009,0.027,0.018,0.135,0.523,0.252,0.009],
+                [0.000,0.000,0.000,0.022,0.000,0.043,0.043,0.326,0.511,0.054],
+                [0.000,0.000,0.000,0.143,0.000,0.000,0.000,0.143,0.714,0.000]])
+
 def declination(n):
     """
     Returns the solar declination (in radians) on the n-th day of the year using the accurate 
@@ -90,139 +220,13 @@ def Aguiar_daily_Kt(Ktm, Kt0, nd):
             nd is the number of daily clearness indices to generate
     """
 
-    # Markov Transition Matrices
-    MTM_lib = {}
-    MTM_states = [0.30, 0.35, 0.40, 0.45, 0.50, 0.55, 0.60, 0.65, 0.70]
-    MTM_min = [0.031, 0.058, 0.051, 0.052, 0.028, 0.053, 0.044, 0.085, 0.010, 0.319]
-    MTM_max = [0.705, 0.694, 0.753, 0.753, 0.807, 0.856, 0.818, 0.846, 0.842, 0.865]
-
-    # Kt <= 0.30
-    MTM_lib[0] = np.matrix([[0.229,0.333,0.208,0.042,0.083,0.042,0.042,0.021,0.000,0.000],
-                    [0.167,0.319,0.194,0.139,0.097,0.028,0.042,0.000,0.014,0.000],
-                    [0.250,0.250,0.091,0.136,0.091,0.046,0.046,0.023,0.068,0.000],
-                    [0.158,0.237,0.158,0.263,0.026,0.053,0.079,0.026,0.000,0.000],
-                    [0.211,0.053,0.211,0.158,0.053,0.053,0.158,0.105,0.000,0.000],
-                    [0.125,0.125,0.250,0.188,0.063,0.125,0.000,0.125,0.000,0.000],
-                    [0.040,0.240,0.080,0.120,0.080,0.080,0.120,0.120,0.080,0.040],
-                    [0.000,0.250,0.000,0.125,0.000,0.125,0.125,0.250,0.063,0.063],
-                    [0.000,0.250,0.000,0.125,0.250,0.000,0.250,0.000,0.000,0.125],
-                    [0.000,0.000,0.000,0.000,0.000,0.000,0.500,0.250,0.000,0.250]])
-
-    # 0.30 < Kt <= 0.35
-    MTM_lib[1] = np.matrix([[0.000,0.000,0.091,0.000,0.364,0.091,0.182,0.000,0.273,0.000],
-                    [0.118,0.118,0.176,0.118,0.059,0.118,0.176,0.059,0.059,0.000],
-                    [0.067,0.267,0.067,0.200,0.067,0.000,0.133,0.133,0.000,0.067],
-                    [0.118,0.235,0.000,0.235,0.059,0.176,0.118,0.000,0.059,0.000],
-                    [0.077,0.154,0.308,0.077,0.154,0.077,0.000,0.077,0.077,0.000],
-                    [0.083,0.000,0.167,0.250,0.083,0.167,0.000,0.083,0.167,0.000],
-                    [0.222,0.222,0.000,0.111,0.111,0.000,0.111,0.222,0.000,0.000],
-                    [0.091,0.182,0.273,0.000,0.091,0.273,0.000,0.091,0.000,0.000],
-                    [0.111,0.111,0.111,0.222,0.000,0.000,0.000,0.222,0.111,0.111],
-                    [0.000,0.000,0.000,0.000,0.000,0.000,0.500,0.000,0.000,0.500]])
-
-    # 0.35 < Kt <= 0.40
-    MTM_lib[2] = np.matrix([[0.206,0.088,0.176,0.176,0.088,0.029,0.176,0.029,0.029,0.000],
-                    [0.120,0.100,0.140,0.160,0.120,0.220,0.100,0.000,0.020,0.020],
-                    [0.077,0.123,0.185,0.123,0.077,0.139,0.092,0.123,0.061,0.000],
-                    [0.048,0.111,0.095,0.206,0.206,0.190,0.095,0.048,0.000,0.000],
-                    [0.059,0.137,0.118,0.137,0.098,0.118,0.118,0.157,0.059,0.000],
-                    [0.014,0.097,0.139,0.153,0.125,0.139,0.208,0.056,0.042,0.028],
-                    [0.073,0.101,0.116,0.145,0.087,0.159,0.203,0.087,0.029,0.000],
-                    [0.019,0.037,0.111,0.056,0.074,0.111,0.185,0.296,0.074,0.037],
-                    [0.035,0.069,0.035,0.000,0.035,0.103,0.172,0.138,0.379,0.035],
-                    [0.000,0.167,0.167,0.000,0.167,0.000,0.000,0.333,0.000,0.167]])
-
-    # 0.40 < Kt <= 0.45                 
-    MTM_lib[3] = np.matrix([[0.167,0.167,0.167,0.000,0.083,0.125,0.000,0.167,0.125,0.000],
-                    [0.117,0.117,0.150,0.117,0.083,0.117,0.200,0.067,0.017,0.017],
-                    [0.049,0.085,0.134,0.158,0.098,0.110,0.134,0.134,0.061,0.037],
-                    [0.039,0.090,0.141,0.141,0.167,0.141,0.090,0.141,0.039,0.013],
-                    [0.009,0.139,0.074,0.093,0.194,0.139,0.167,0.093,0.074,0.019],
-                    [0.036,0.018,0.117,0.099,0.144,0.180,0.180,0.117,0.072,0.036],
-                    [0.000,0.046,0.061,0.061,0.136,0.159,0.273,0.167,0.098,0.000],
-                    [0.016,0.056,0.080,0.128,0.104,0.080,0.160,0.208,0.136,0.032],
-                    [0.011,0.053,0.021,0.043,0.128,0.096,0.074,0.223,0.277,0.074],
-                    [0.000,0.074,0.037,0.000,0.074,0.074,0.074,0.074,0.333,0.259]])              
-
-    # 0.45 < Kt <= 0.50
-    MTM_lib[4] = np.matrix([[0.120,0.200,0.160,0.120,0.120,0.120,0.080,0.000,0.040,0.040],
-                    [0.100,0.080,0.120,0.140,0.140,0.200,0.180,0.040,0.000,0.000],
-                    [0.046,0.114,0.068,0.171,0.125,0.171,0.080,0.159,0.057,0.011],
-                    [0.015,0.061,0.084,0.099,0.191,0.153,0.153,0.115,0.115,0.015],
-                    [0.024,0.030,0.098,0.098,0.165,0.195,0.195,0.140,0.043,0.012],
-                    [0.015,0.026,0.062,0.124,0.144,0.170,0.170,0.222,0.062,0.005],
-                    [0.000,0.013,0.045,0.108,0.112,0.175,0.188,0.224,0.117,0.018],
-                    [0.008,0.023,0.054,0.066,0.093,0.125,0.191,0.253,0.183,0.004],
-                    [0.006,0.022,0.061,0.033,0.067,0.083,0.139,0.222,0.322,0.044],
-                    [0.000,0.046,0.091,0.091,0.046,0.046,0.136,0.091,0.273,0.182]])
-
-    # 0.50 < Kt <= 0.55
-    MTM_lib[5] = np.matrix([[0.250,0.179,0.107,0.107,0.143,0.071,0.107,0.036,0.000,0.000],
-                    [0.133,0.022,0.089,0.111,0.156,0.178,0.111,0.133,0.067,0.000],
-                    [0.064,0.048,0.143,0.048,0.175,0.143,0.206,0.095,0.079,0.000],
-                    [0.000,0.022,0.078,0.111,0.156,0.156,0.244,0.167,0.044,0.022],
-                    [0.016,0.027,0.037,0.069,0.160,0.219,0.230,0.160,0.075,0.005],
-                    [0.013,0.025,0.030,0.093,0.144,0.202,0.215,0.219,0.055,0.004],
-                    [0.006,0.041,0.035,0.064,0.090,0.180,0.337,0.192,0.049,0.006],
-                    [0.012,0.021,0.029,0.035,0.132,0.123,0.184,0.371,0.082,0.012],
-                    [0.008,0.016,0.016,0.024,0.071,0.103,0.159,0.270,0.309,0.024],
-                    [0.000,0.000,0.000,0.000,0.059,0.000,0.059,0.294,0.412,0.176]])
-
-    # 0.55 < Kt <= 0.60
-    MTM_lib[6] = np.matrix([[0.217,0.087,0.000,0.174,0.130,0.087,0.087,0.130,0.087,0.000],
-                    [0.026,0.079,0.132,0.079,0.026,0.158,0.158,0.132,0.158,0.053],
-                    [0.020,0.020,0.020,0.040,0.160,0.180,0.160,0.200,0.100,0.100],
-                    [0.025,0.013,0.038,0.076,0.076,0.139,0.139,0.266,0.215,0.013],
-                    [0.030,0.030,0.050,0.020,0.091,0.131,0.162,0.283,0.131,0.071],
-                    [0.006,0.006,0.013,0.057,0.057,0.121,0.204,0.287,0.185,0.064],
-                    [0.004,0.026,0.037,0.030,0.093,0.107,0.193,0.307,0.167,0.037],
-                    [0.011,0.009,0.014,0.042,0.041,0.071,0.152,0.418,0.203,0.041],
-                    [0.012,0.022,0.022,0.038,0.019,0.050,0.113,0.281,0.360,0.084],
-                    [0.008,0.024,0.039,0.039,0.063,0.039,0.118,0.118,0.284,0.268]])
-
-    # 0.60 < Kt <= 0.65
-    MTM_lib[7] = np.matrix([[0.067,0.133,0.133,0.067,0.067,0.200,0.133,0.133,0.067,0.000],
-                    [0.118,0.059,0.059,0.059,0.059,0.118,0.118,0.235,0.118,0.059],
-                    [0.000,0.024,0.024,0.049,0.146,0.073,0.195,0.244,0.195,0.049],
-                    [0.026,0.000,0.026,0.026,0.053,0.184,0.263,0.184,0.237,0.000],
-                    [0.014,0.000,0.042,0.056,0.069,0.097,0.139,0.306,0.278,0.000],
-                    [0.009,0.009,0.052,0.069,0.052,0.112,0.215,0.285,0.138,0.060],
-                    [0.009,0.009,0.026,0.017,0.094,0.099,0.232,0.283,0.210,0.021],
-                    [0.010,0.014,0.016,0.019,0.027,0.062,0.163,0.467,0.202,0.019],
-                    [0.004,0.007,0.031,0.017,0.033,0.050,0.086,0.252,0.469,0.050],
-                    [0.000,0.000,0.015,0.046,0.031,0.046,0.077,0.123,0.446,0.215]])
-
-    # 0.65 < Kt <= 0.70
-    MTM_lib[8] = np.matrix([[0.000,0.000,0.000,0.000,0.000,0.000,0.000,0.000,1.000,0.000],
-                    [0.000,0.000,0.000,0.000,0.000,0.000,0.000,0.000,1.000,0.000],
-                    [0.000,0.000,0.000,0.000,0.000,0.000,0.250,0.250,0.500,0.000],
-                    [0.000,0.000,0.000,0.000,0.250,0.000,0.000,0.375,0.250,0.125],
-                    [0.000,0.000,0.000,0.083,0.000,0.167,0.167,0.250,0.333,0.000],
-                    [0.000,0.000,0.042,0.042,0.042,0.083,0.083,0.292,0.292,0.125],
-                    [0.000,0.000,0.032,0.000,0.000,0.032,0.129,0.387,0.355,0.065],
-                    [0.000,0.000,0.000,0.038,0.038,0.075,0.047,0.340,0.415,0.047],
-                    [0.004,0.004,0.007,0.007,0.011,0.030,0.052,0.141,0.654,0.089],
-                    [0.000,0.000,0.000,0.000,0.061,0.061,0.030,0.030,0.349,0.470]])
-
-    # Kt > 0.70
-    MTM_lib[9] = np.matrix([[0.000,0.000,0.000,0.000,0.000,0.000,0.000,0.000,1.000,0.000],
-                    [0.100,0.100,0.100,0.100,0.100,0.100,0.100,0.100,0.100,0.100],
-                    [0.000,0.000,0.000,0.250,0.000,0.000,0.000,0.500,0.250,0.000],
-                    [0.000,0.000,0.143,0.143,0.000,0.143,0.143,0.429,0.000,0.000],
-                    [0.000,0.000,0.000,0.200,0.000,0.000,0.200,0.400,0.200,0.000],
-                    [0.000,0.000,0.000,0.000,0.000,0.000,0.222,0.444,0.333,0.000],
-                    [0.000,0.000,0.000,0.000,0.080,0.080,0.080,0.480,0.240,0.040],
-                    [0.000,0.000,0.027,0.009,0.027,0.018,0.135,0.523,0.252,0.009],
-                    [0.000,0.000,0.000,0.022,0.000,0.043,0.043,0.326,0.511,0.054],
-                    [0.000,0.000,0.000,0.143,0.000,0.000,0.000,0.143,0.714,0.000]])
-    
     # Determine the appropriate MTM based on the mean monthly Kt    
-    MTM_index = np.digitize([Ktm], MTM_states)[0]
-    MTM = MTM_lib[MTM_index]
+    MTM_index = np.digitize([Ktm], MTM_STATES)[0]
+    MTM = MTM_LIB[MTM_index]
     
     # Calculate states and step sizes
-    min_state = MTM_min[MTM_index]                 
-    max_state = MTM_max[MTM_index] 
+    min_state = MTM_MIN[MTM_index]                 
+    max_state = MTM_MAX[MTM_index] 
     step_size = (max_state - min_state)/10
     states = np.arange(min_state, max_state, step_size)
     
@@ -249,7 +253,7 @@ def Aguiar_daily_Kt(Ktm, Kt0, nd):
     
     return Kt
 
-def Aguiar_hourly_kt(Kt, n, lat, max_iter):    
+def Aguiar_hourly_kt(Kt, n, lat, max_iter, stats=None):    
     """
     Generates a sequence of synthetic hourly clearness indices (kt) using the mean daily clearness 
     index (Kt) as the input. The algorithm is based on the method by Aguiar et al in the paper:
@@ -261,6 +265,8 @@ def Aguiar_hourly_kt(Kt, n, lat, max_iter):
             n is the day of the year (n=1 is midnight on January 1)
             lat is the latitude of the location (degrees)
             max_iter is the maximum number of iterations for each new kt
+            stats is an optional dictionary in which the number of rejected samples is accumulated
+            (under the key 'kt_retries')
     """
     # Solar declination in radians
     delta = declination(n)  
@@ -318,6 +324,9 @@ def Aguiar_hourly_kt(Kt, n, lat, max_iter):
                     if kti > kcs:
                         kti = kcs
             
+            if stats is not None:
+                stats['kt_retries'] = stats.get('kt_retries', 0) + iter - 1
+            
             kt.append(kti)
             y.append(yi)
         else:
@@ -373,7 +382,65 @@ def trend_sequence(lat):
     
     return G0c
 
-def Aguiar_hourly_G0(Ktm, lat):
+@lru_cache(maxsize=32)
+def cached_trend(lat):
+    """
+    Returns the trend sequence for a latitude as a read-only array. The sequence has no randomness,
+    so it is only calculated once for each latitude (per process).
+    """
+    G0c = np.array(trend_sequence(lat))
+    G0c.flags.writeable = False
+    return G0c
+
+@lru_cache(maxsize=32)
+def beam_ratio(lat, tilt, azimuth):
+    """
+    Returns the ratio of beam irradiance on a tilted surface to beam irradiance on a horizontal
+    surface for every hour of the year, as a read-only array (memoised, since it only depends on
+    the geometry)
+    
+    Inputs: lat is the latitude of the location (in decimal degrees)
+            tilt is the tilt angle of the surface (in degrees)
+            azimuth is the azimuthal angle of the surface (in degrees)
+    """
+    Rb = _beam_ratio_hours(np.radians(lat), np.radians(tilt), np.radians(azimuth))
+    Rb.flags.writeable = False
+    
+    return Rb
+
+def _beam_ratio_hours(phi, beta, gamma):
+    """
+    Returns the beam ratios for every hour of the year, broadcasting the latitude phi, tilt beta and
+    azimuth gamma (in radians) against the hours, i.e. arrays of shape (..., 1) give results of
+    shape (..., 8760)
+    """
+    # Hour angle at the centre of each hour (0 is solar noon) and declination for every hour of the year
+    h = np.tile(np.arange(1,25), 365)
+    omega = (h - 12.5) * np.pi / 12
+    delta = np.repeat(declination(np.arange(1,366)), 24)
+    
+    # Calculate angle of incidence on tilted surface for every hour of the year
+    cos_theta = np.sin(delta) * np.sin(phi) * np.cos(beta) - np.sin(delta) * np.cos(phi) * np.sin(beta) * np.cos(gamma) + np.cos(delta) * np.cos(phi) * np.cos(beta) * np.cos(omega) + np.cos(delta) * np.sin(phi) * np.sin(beta) * np.cos(gamma) * np.cos(omega) + np.cos(delta) * np.sin(beta) * np.sin(gamma) * np.sin(omega)
+    
+    # Calculate zenith angle for every hour of the year
+    cos_theta_z = np.cos(phi) * np.cos(delta) * np.cos(omega) + np.sin(phi) * np.sin(delta)
+    
+    # Ratio of beam radiation on tilted surface to beam radiation on horizontal surface
+    return cos_theta / cos_theta_z
+
+def beam_ratios(lat, tilts, azimuths):
+    """
+    Returns the beam ratios (see beam_ratio) of several surface orientations, as an array of shape
+    (n_surfaces, 8760)
+    
+    Inputs: lat is the latitude of the location (in decimal degrees)
+            tilts is a sequence of tilt angles (in degrees)
+            azimuths is a sequence of azimuthal angles (in degrees), or a single angle for all surfaces
+    """
+    beta, gamma = np.broadcast_arrays(np.radians(np.asarray(tilts, dtype=float)), np.radians(np.asarray(azimuths, dtype=float)))
+    return _beam_ratio_hours(np.radians(lat), beta[...,np.newaxis], gamma[...,np.newaxis])
+
+def Aguiar_hourly_G0(Ktm, lat, stats=None):
     """
     Generates an annual sequence of synthetic hourly irradiance values G0 (on a horizontal plane)
     based on monthly mean clearness indices. The methods proposed by Aguiar et al for the generation
@@ -381,6 +448,7 @@ def Aguiar_hourly_G0(Ktm, lat):
     
     Inputs: Ktm is an array of monthly mean clearness indices
             lat is the latitude of the location (in decimal degrees)
+            stats is an optional dictionary of counters (see Aguiar_hourly_kt)
     """
     days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31] 
     
@@ -395,11 +463,11 @@ def Aguiar_hourly_G0(Ktm, lat):
     # Generate hourly clearness indices for each hour in the year
     kt = []
     for d in range(365):
-        kti = Aguiar_hourly_kt(Kt[d], d+1, lat, 10)
+        kti = Aguiar_hourly_kt(Kt[d], d+1, lat, 10, stats)
         kt.extend(kti)
     
     # Generate trend irradiances for each hour in the year
-    G0c = trend_sequence(lat)
+    G0c = cached_trend(lat)
     
     # Calculate synthetic irradiance for each hour of the year
     G0 = G0c * np.array(kt)
@@ -417,33 +485,26 @@ def incident_HDKR(G0, Kt, lat, tilt, azimuth, albedo):
             tilt is the tilt angle of the surface (in degrees)
             azimuth is the azimuthal angle of the surface (in degrees)
             albedo is the ground reflectance (in per unit - 0.0 = 0%, 1.0 = 100%)
+    
+    tilt, azimuth and albedo may also be sequences with one value for each of several surfaces
+    (e.g. PV sub-arrays). The irradiances are then returned as an array of shape (n_surfaces, 8760);
+    the diffuse fraction, anisotropy index and horizon brightening factor are calculated once and
+    only the final combination is evaluated for all surfaces at once.
     """
     
-    phi = np.radians(lat)
     beta = np.radians(tilt)
-    gamma = np.radians(azimuth)
     
     # Generate trend (extraterrestrial) irradiances for each hour in the year
-    G0c = trend_sequence(lat)
-    
-    # Set up hour angles for each hour of the year
-    h = np.array(list(np.arange(1,25)) * 365)
-    omega = (h - 12.5) * np.pi / 12     # Hour angle at centre of each hour (0 is solar noon)
-    
-    # Calculate declination for every hour of the year
-    dec_d = []
-    for d in range(1,366):
-        dec_d.append(declination(d))    
-    delta = np.repeat(np.array(dec_d), 24)
-    
-    # Calculate angle of incidence on tilted surface for every hour of the year
-    cos_theta = np.sin(delta) * np.sin(phi) * np.cos(beta) - np.sin(delta) * np.cos(phi) * np.sin(beta) * np.cos(gamma) + np.cos(delta) * np.cos(phi) * np.cos(beta) * np.cos(omega) + np.cos(delta) * np.sin(phi) * np.sin(beta) * np.cos(gamma) * np.cos(omega) + np.cos(delta) * np.sin(beta) * np.sin(gamma) * np.sin(omega)
-    
-    # Calculate zenith angle for every hour of the year
-    cos_theta_z = np.cos(phi) * np.cos(delta) * np.cos(omega) + np.sin(phi) * np.sin(delta)
+    G0c = cached_trend(lat)
     
     # Ratio of beam radiation on tilted surface to beam radiation on horizontal surface
-    Rb = cos_theta / cos_theta_z
+    if np.broadcast(tilt, azimuth, albedo).ndim == 0:
+        Rb = beam_ratio(lat, tilt, azimuth)
+    else:
+        tilt, azimuth, albedo = np.broadcast_arrays(np.asarray(tilt, dtype=float), np.asarray(azimuth, dtype=float), np.asarray(albedo, dtype=float))
+        Rb = beam_ratios(lat, tilt, azimuth)
+        beta = np.radians(tilt)[:,np.newaxis]
+        albedo = albedo[:,np.newaxis]
     
     # Diffuse fraction for each hour of the year
     Df = []
@@ -0,0 +1,230 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Weather File Reader
+
+Reads hourly irradiance and temperature from typical meteorological year files, as an alternative
+to synthesising irradiance from monthly clearness indices. EnergyPlus weather files (EPW) and
+TMY3 CSV files are supported. Only the needed columns (GHI, DNI, DHI and dry-bulb temperature) are
+parsed, with numpy's vectorised text reader, and the parsed series are cached in binary (.npz) form,
+keyed by the path, size and modification time of the file, so reloading a file takes milliseconds.
+
+A weather file is used in a simulation by setting pv_dict['weather'] to its path (or to the
+dictionary returned by read_weather). chron_sim.generate_profiles then takes the GHI from the file,
+transposes it onto the PV array with the measured diffuse irradiance (transpose_HDKR) and derates
+the PV output with the hourly temperature.
+
+Note that weather files are in local standard time, while the synthetic series and the sun
+position calculations of synth_solar are in solar time (which differs by up to about an hour).
+
+Main Functions
+--------------
+- read_weather: reads a weather file (from the binary cache if available)
+- parse_epw: parses an EPW file
+- parse_tmy3: parses a TMY3 CSV file
+- file_key: identity of a weather file (for cache keys)
+- transpose_HDKR: hourly irradiance incident on a tilted plane from measured GHI and DHI (W/m2)
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+import engine.synth_solar as synth_solar
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.centaur', 'weather')
+CACHE_VERSION = 1
+CHANNELS = ['GHI', 'DNI', 'DHI', 'T_amb']
+RB_MAX = 10.0           # Upper limit of the beam ratio (sun elevation of about 6 degrees on a horizontal plane)
+
+# Data columns of EPW files (0-based) and headings of TMY3 columns
+EPW_COLUMNS = {'T_amb' : 6, 'GHI' : 13, 'DNI' : 14, 'DHI' : 15}
+EPW_MISSING = {'T_amb' : 99.9, 'GHI' : 9999, 'DNI' : 9999, 'DHI' : 9999}
+TMY3_HEADINGS = {'GHI' : 'GHI (W/m^2)', 'DNI' : 'DNI (W/m^2)', 'DHI' : 'DHI (W/m^2)', 'T_amb' : 'Dry-bulb (C)'}
+
+def _clean(weather, missing):
+    """
+    Fills missing values: irradiances are set to zero and temperatures are interpolated, and the
+    29th of February is dropped from leap year files
+    """
+    n = len(weather['GHI'])
+    if n == 8784:
+        keep = np.r_[0:59*24, 60*24:8784]
+        for key in CHANNELS:
+            weather[key] = weather[key][keep]
+    elif n != 8760:
+        raise ValueError('Weather file has ' + str(n) + ' hourly records (8760 or 8784 expected)')
+
+    for key in CHANNELS:
+        values = np.asarray(weather[key], dtype=float)
+        bad = ~np.isfinite(values)
+        if key in missing:
+            bad = bad | (values >= missing[key])
+        if bad.any():
+            if key == 'T_amb':
+                hours = np.arange(len(values))
+                values[bad] = np.interp(hours[bad], hours[~bad], values[~bad])
+            else:
+                values[bad] = 0.0
+        weather[key] = values
+
+    return weather
+
+def parse_epw(path):
+    """
+    Parses an EnergyPlus weather (EPW) file
+
+    Outputs:
+        weather     Dictionary with hourly 'GHI', 'DNI', 'DHI' (W/m2) and 'T_amb' (deg C) arrays,
+                    and the 'name', 'lat', 'lon', 'tz' and 'elev' of the location
+    """
+    with open(path, encoding='latin-1') as fp:
+        location = fp.readline().strip().split(',')
+    if location[0].upper() != 'LOCATION':
+        raise ValueError(path + ' is not an EPW file')
+
+    keys = sorted(EPW_COLUMNS, key=EPW_COLUMNS.get)
+    data = np.loadtxt(path, delimiter=',', skiprows=8, usecols=[EPW_COLUMNS[key] for key in keys],
+                      encoding='latin-1', ndmin=2)
+    weather = {key : data[:,j] for j, key in enumerate(keys)}
+    weather.update({
+        'name'  : location[1],
+        'lat'   : float(location[6]),
+        'lon'   : float(location[7]),
+        'tz'    : float(location[8]),
+        'elev'  : float(location[9])
+    })
+
+    return _clean(weather, EPW_MISSING)
+
+def parse_tmy3(path):
+    """
+    Parses a TMY3 CSV file (outputs as for parse_epw)
+    """
+    with open(path, encoding='latin-1') as fp:
+        location = fp.readline().strip().split(',')
+        headings = [heading.strip() for heading in fp.readline().strip().split(',')]
+    try:
+        columns = {key : headings.index(heading) for key, heading in TMY3_HEADINGS.items()}
+    except ValueError:
+        raise ValueError(path + ' is not a TMY3 file (columns ' + ', '.join(TMY3_HEADINGS.values()) + ' expected)')
+
+    keys = sorted(columns, key=columns.get)
+    data = np.loadtxt(path, delimiter=',', skiprows=2, usecols=[columns[key] for key in keys],
+                      encoding='latin-1', ndmin=2)
+    weather = {key : data[:,j] for j, key in enumerate(keys)}
+    weather.update({
+        'name'  : location[1].strip('"'),
+        'lat'   : float(location[4]),
+        'lon'   : float(location[5]),
+        'tz'    : float(location[3]),
+        'elev'  : float(location[6])
+    })
+
+    return _clean(weather, {})
+
+def file_key(path):
+    """
+    Returns the identity of a weather file (absolute path, size and modification time), which
+    changes whenever the file is edited or replaced
+    """
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+def _cache_path(path, cache_dir):
+    """Cache file of a weather file, keyed by the identity of the file"""
+    key = json.dumps([CACHE_VERSION] + file_key(path))
+    return os.path.join(cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.npz')
+
+def read_weather(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Reads an EPW or TMY3 weather file, using the binary cache if the file has been read before
+
+    Inputs:
+        path        Weather file name (EPW, or TMY3 CSV)
+        cache_dir   Directory of the binary cache (None to always parse the file)
+
+    Outputs:
+        weather     Dictionary of hourly series and location (see parse_epw)
+    """
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = _cache_path(path, cache_dir)
+        try:
+            with np.load(cache_path) as npz:
+                weather = {key : npz[key] for key in CHANNELS}
+                weather.update(json.loads(str(npz['location'])))
+            return weather
+        except (IOError, OSError, KeyError, ValueError):
+            pass
+
+    with open(path, encoding='latin-1') as fp:
+        first = fp.readline()
+    if first.upper().startswith('LOCATION'):
+        weather = parse_epw(path)
+    else:
+        weather = parse_tmy3(path)
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        location = {key : value for key, value in weather.items() if key not in CHANNELS}
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fp:
+            np.savez(fp, location=json.dumps(location), **{key : weather[key] for key in CHANNELS})
+        os.replace(tmp_path, cache_path)
+
+    return weather
+
+def transpose_HDKR(G0, Gd, lat, tilt, azimuth, albedo):
+    """
+    Calculates the hourly irradiance incident on a tilted surface with the HDKR model (as
+    synth_solar.incident_HDKR), with the measured diffuse irradiance instead of a diffuse fraction
+    correlation
+
+    Inputs:
+        G0          Hourly global horizontal irradiances (W/m2)
+        Gd          Hourly diffuse horizontal irradiances (W/m2)
+        lat         Latitude of the location (in decimal degrees)
+        tilt        Tilt angle of the surface (in degrees)
+        azimuth     Azimuthal angle of the surface (in degrees)
+        albedo      Ground reflectance (in per unit)
+
+        (tilt, azimuth and albedo may also be sequences, as for synth_solar.incident_HDKR)
+
+    Outputs:
+        GT          Hourly incident irradiances (W/m2), shape (8760,) or (n_surfaces, 8760)
+    """
+    G0 = np.asarray(G0, dtype=float)
+    Gd = np.minimum(np.asarray(Gd, dtype=float), G0)
+    beta = np.radians(tilt)
+    G0c = synth_solar.cached_trend(lat)
+    if np.broadcast(tilt, azimuth, albedo).ndim == 0:
+        Rb = synth_solar.beam_ratio(lat, tilt, azimuth)
+    else:
+        tilt, azimuth, albedo = np.broadcast_arrays(np.asarray(tilt, dtype=float), np.asarray(azimuth, dtype=float), np.asarray(albedo, dtype=float))
+        Rb = synth_solar.beam_ratios(lat, tilt, azimuth)
+        beta = np.radians(tilt)[:,np.newaxis]
+        albedo = albedo[:,np.newaxis]
+
+    # Beam ratio, limited near sunrise and sunset (where measured and solar time hours differ)
+    Rb = np.where(G0c > 0, np.clip(Rb, 0, RB_MAX), 0.0)
+
+    # Beam radiation, horizon brightening factor and anisotropy index
+    Gb = G0 - Gd
+    f = np.sqrt(np.divide(Gb, G0, out=np.zeros(len(G0)), where=G0 > 0))
+    Ai = np.minimum(np.divide(Gb, G0c, out=np.zeros(len(G0)), where=G0c > 0), 1.0)
+
+    # Global radiation incident on PV array (HDKR model)
+    GT = (Gb + Gd * Ai) * Rb + Gd * (1 - Ai) * (1 + np.cos(beta)) / 2 * (1 + f * np.sin(beta/2) ** 3) + G0 * albedo * (1 - np.cos(beta)) / 2
+
+    return GT
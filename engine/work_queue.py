@@ -0,0 +1,284 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+File-Based Work Queue for Distributed Sweeps
+
+Spreads a sweep of simulation cases over any number of worker processes, on one or several
+machines, that share a directory (e.g. on a network filesystem). No broker is needed: the queue is
+the directory itself.
+
+    root/queue/<name>.case              Case waiting to be run (pickled case dictionary)
+    root/claimed/<name>.case@worker     Case claimed by a worker
+    root/results/<name>.result          Result of the case (pickled (case id, result) tuple)
+    root/failed/<name>.error            Error of a case that raised an exception
+
+Case file names are unique (submission time, a random batch id and the index of the case in its
+batch), so cases can be submitted while workers are claiming and recovering others, and workers
+claim them in order of submission.
+
+The coordinator writes the case files (submit_cases). A worker claims a case by renaming it from
+queue/ to claimed/ with its worker id appended; rename is atomic, so only one worker gets each
+case. While the case runs, the worker touches its claim file every few seconds (heartbeat). Claims
+that have not been touched for longer than the stale time (e.g. the worker or its machine died)
+are renamed back into the queue by the next worker that looks, and the case is run again. Results
+and case files are written to a temporary file and renamed into place, so readers never see a
+partly written file. Ages are measured against the modification time of a file touched in the
+queue directory, so the clocks of the machines do not need to agree.
+
+Main Functions
+--------------
+- submit_cases: writes the cases of a sweep into a queue directory
+- run_worker: claims and runs cases until the queue is empty
+- recover_stale: returns stale claims to the queue
+- progress: numbers of queued, claimed, completed and failed cases
+- collect_results: reads the results (and errors) of a sweep
+- run_sweep: runs a sweep with several local worker processes
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import multiprocessing
+import os
+import pickle
+import socket
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+import numpy as np
+
+from engine.chron_sim import run_sim
+
+HEARTBEAT = 5.0         # Interval between touches of a claim file (s)
+STALE = 60.0            # Age after which an untouched claim is returned to the queue (s)
+POLL = 1.0              # Interval at which idle workers look for new or stale cases (s)
+
+DIRS = ['queue', 'claimed', 'results', 'failed', 'tmp']
+
+def _dirs(root):
+    """Returns the queue subdirectories, creating them if needed"""
+    paths = {name : os.path.join(root, name) for name in DIRS}
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+    return paths
+
+def _write(paths, path, obj):
+    """Writes a pickled object to a temporary file and renames it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=paths['tmp'])
+    with os.fdopen(fd, 'wb') as fp:
+        pickle.dump(obj, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def _read(path):
+    with open(path, 'rb') as fp:
+        return pickle.load(fp)
+
+def _fs_now(paths):
+    """Current time on the clock of the shared filesystem"""
+    path = os.path.join(paths['tmp'], 'clock.' + worker_name())
+    with open(path, 'wb'):
+        pass
+    now = os.stat(path).st_mtime
+    os.remove(path)
+    return now
+
+def worker_name():
+    """Default worker id (host name and process id)"""
+    return socket.gethostname().replace('@', '_') + '.' + str(os.getpid())
+
+def submit_cases(cases, root):
+    """
+    Writes the cases of a sweep into a queue directory
+
+    Inputs:
+        cases       List of case dictionaries (as for checkpoint.run_cases) with keys 'id' (unique,
+                    picklable), 'inputs' (tuple of arguments for the simulation function) and
+                    optionally 'seed' (random seed set before the run)
+        root        Queue directory (created if needed)
+
+    Outputs:
+        n_cases     Number of cases written
+    """
+    paths = _dirs(root)
+    batch = '%020d-%s' % (time.time_ns(), uuid.uuid4().hex)
+    for i, case in enumerate(cases):
+        _write(paths, os.path.join(paths['queue'], '%s-%08d.case' % (batch, i)), case)
+
+    return len(cases)
+
+def recover_stale(root, stale=STALE):
+    """
+    Returns claims that have not been touched for longer than the stale time to the queue
+    (claims of cases that already have a result are removed)
+
+    Outputs:
+        recovered   List of recovered case file names
+    """
+    paths = _dirs(root)
+    now = _fs_now(paths)
+    recovered = []
+    for claim in os.listdir(paths['claimed']):
+        path = os.path.join(paths['claimed'], claim)
+        name = claim.split('@')[0]
+        try:
+            if now - os.stat(path).st_mtime < stale:
+                continue
+            if os.path.exists(os.path.join(paths['results'], name[:-5] + '.result')):
+                os.remove(path)
+            else:
+                os.rename(path, os.path.join(paths['queue'], name))
+                recovered.append(name)
+        except FileNotFoundError:
+            # Finished, or recovered by another worker, in the meantime
+            pass
+
+    return recovered
+
+def _claim(paths, worker_id):
+    """Claims the next queued case, returning (case file name, claim path) or None if the queue is empty"""
+    for name in sorted(os.listdir(paths['queue'])):
+        claim = os.path.join(paths['claimed'], name + '@' + worker_id)
+        try:
+            os.rename(os.path.join(paths['queue'], name), claim)
+        except FileNotFoundError:
+            # Claimed by another worker
+            continue
+        # Restart the stale clock (rename keeps the modification time of the case file)
+        os.utime(claim, None)
+        return name, claim
+
+    return None
+
+def _heartbeat(claim, stop, interval):
+    while not stop.wait(interval):
+        try:
+            os.utime(claim, None)
+        except FileNotFoundError:
+            return
+
+def run_worker(root, run_fn=run_sim, summarise=None, worker_id=None, wait=False, heartbeat=HEARTBEAT, stale=STALE, poll=POLL):
+    """
+    Claims and runs cases from a queue directory
+
+    Inputs:
+        root        Queue directory
+        run_fn      Simulation function (default chron_sim.run_sim)
+        summarise   Optional function applied to each result before it is written (e.g. to keep
+                    only annual totals for large sweeps)
+        worker_id   Worker id appended to claim file names (default host name and process id)
+        wait        Keep polling until every case is completed or failed (otherwise return as soon
+                    as the queue is empty, leaving cases claimed by other workers to them)
+        heartbeat   Interval between touches of the claim file of the running case (s)
+        stale       Age after which untouched claims of other workers are returned to the queue (s)
+        poll        Interval at which an idle worker looks for new or stale cases (s)
+
+    Outputs:
+        n_run       Number of cases run by this worker
+    """
+    paths = _dirs(root)
+    worker_id = worker_id or worker_name()
+    n_run = 0
+    while True:
+        recover_stale(root, stale)
+        claimed = _claim(paths, worker_id)
+        if claimed is None:
+            if not wait or not os.listdir(paths['claimed']):
+                return n_run
+            time.sleep(poll)
+            continue
+
+        name, claim = claimed
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(claim, stop, heartbeat), daemon=True)
+        beat.start()
+        try:
+            case = _read(claim)
+            try:
+                if case.get('seed') is not None:
+                    np.random.seed(case['seed'])
+                result = run_fn(*case['inputs'])
+                if summarise is not None:
+                    result = summarise(result)
+                _write(paths, os.path.join(paths['results'], name[:-5] + '.result'), (case['id'], result))
+            except (Exception, SystemExit):
+                # SystemExit (e.g. a failed battery constant fit) must not end the worker, or the
+                # case would be recovered and kill the next worker
+                _write(paths, os.path.join(paths['failed'], name[:-5] + '.error'), (case['id'], traceback.format_exc()))
+        finally:
+            stop.set()
+            beat.join()
+        try:
+            os.remove(claim)
+        except FileNotFoundError:
+            pass
+        n_run = n_run + 1
+
+def progress(root):
+    """Returns the numbers of 'queued', 'claimed', 'done' and 'failed' cases in a queue directory"""
+    paths = _dirs(root)
+    return {
+        'queued'    : len(os.listdir(paths['queue'])),
+        'claimed'   : len(os.listdir(paths['claimed'])),
+        'done'      : len(os.listdir(paths['results'])),
+        'failed'    : len(os.listdir(paths['failed']))
+    }
+
+def collect_results(root):
+    """
+    Reads the results of a sweep
+
+    Outputs:
+        results     Dictionary of results keyed by case id
+        errors      Dictionary of error tracebacks (strings) keyed by case id
+    """
+    paths = _dirs(root)
+    results = {}
+    errors = {}
+    for name in sorted(os.listdir(paths['results'])):
+        case_id, result = _read(os.path.join(paths['results'], name))
+        results[case_id] = result
+    for name in sorted(os.listdir(paths['failed'])):
+        case_id, error = _read(os.path.join(paths['failed'], name))
+        if case_id not in results:
+            errors[case_id] = error
+
+    return results, errors
+
+def run_sweep(cases, root, processes=None, run_fn=run_sim, summarise=None, stale=STALE):
+    """
+    Runs a sweep with several local worker processes sharing a queue directory (workers on other
+    machines may join in with run_worker on the same directory)
+
+    Inputs:
+        cases       List of case dictionaries (see submit_cases), or None to only run the cases
+                    already in the queue
+        root        Queue directory
+        processes   Number of worker processes (default the number of CPUs)
+        run_fn      Simulation function (default chron_sim.run_sim)
+        summarise   Optional function applied to each result in the worker
+        stale       Age after which untouched claims are returned to the queue (s)
+
+    Outputs:
+        results     Dictionary of results keyed by case id
+        errors      Dictionary of error tracebacks keyed by case id
+    """
+    if cases:
+        submit_cases(cases, root)
+
+    workers = []
+    for i in range(processes or os.cpu_count() or 1):
+        worker = multiprocessing.Process(target=run_worker, args=(root, run_fn, summarise),
+                                         kwargs={'wait' : True, 'stale' : stale})
+        worker.start()
+        workers.append(worker)
+    for worker in workers:
+        worker.join()
+
+    return collect_results(root)
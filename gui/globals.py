@@ -39,7 +39,8 @@ def init():
         'sys_config'    : 3,                  # System configuration (0=Gen, 1=PV-Gen, 2=PV-batt, 3=PV-batt-gen)
         'ctrl_mode'     : 2,                  # PV-battery-gen control mode (0,1,2,3,4)
         'proj_title'    : 'Default project',
-        'proj_desc'     : 'Default project'
+        'proj_desc'     : 'Default project',
+        'seed'          : None                # Random seed for load and solar data (None for a new random sequence each run)
     }
     
     pv_resource = np.array([[0.448, 25.59],
@@ -110,7 +111,8 @@ def init():
         'SOC_cyc'    : 80,                                     # State of charge setpoint for cycle charging
         'eff_conv'   : 94.0,                                   # Battery converter / inverter   efficiency (%)
         'p_set'      : 80000,                                  # PV output setpoint for ramp control mode at AC load side (in W)
-        't_set'      : [9,15]                                  # Time start/end for ramp control mode (hour of day)
+        't_set'      : [9,15],                                 # Time start/end for ramp control mode (hour of day)
+        'model'      : 'kibam'                                 # Battery model ('kibam' or 'bucket')
     }
 
     gen_data = {
@@ -125,6 +127,126 @@ def init():
     global filename   
     filename = ""    
     
+    dirty.clear()
+    derived.clear()
+    
+
+def project_data():
+    """Return the project data as a dictionary (in the format written to file)."""
+    return {name : getattr(sys.modules[__name__], name) for name in FIELDS}
+
+"""
+Change notification
+
+Project data should be changed with set_value and update_values (or, for arrays edited in place,
+followed by a call to notify) so that only fields whose values actually change are flagged. Fields
+are named after the global variables ('pv_data') or single entries of them ('pv_data.tilt').
+Listeners and derived data are only refreshed when a field they depend on changes.
+"""
+
+FIELDS = ['latitude', 'longitude', 'sys_data', 'pv_resource', 'pv_data', 'loads', 'load_sigma', 'gen_data', 'batt_data', 'batt_char']
+
+listeners = []          # List of (fields, callback) tuples
+dirty = set()           # Fields changed since the project was last loaded or saved
+derived = {}            # Derived data, keyed by name
+derived_fields = {}     # Fields each item of derived data depends on
+
+def _affects(fields, changed):
+    """Return True if a change to the changed fields affects any of the fields."""
+    for field in fields:
+        group = field.split('.')[0]
+        if field in changed or group in changed:
+            return True
+        if field == group and any(c.split('.')[0] == group for c in changed):
+            return True
+    return False
+
+def _equal(a, b):
+    """Return True if two field values are equal."""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    return a == b
+
+def subscribe(fields, callback):
+    """Call callback(changed) whenever any of the fields change.
+    
+    :param fields: Fields to watch, e.g. ['batt_char', 'batt_data.n_batt'].
+    :type fields: List
+    :param callback: Function called with the set of changed fields.
+    :type callback: Function
+    """
+    listeners.append((list(fields), callback))
+
+def notify(changed):
+    """Flag fields as changed, invalidate the derived data that depends on them and call their listeners.
+    
+    :param changed: Changed fields.
+    :type changed: List
+    """
+    changed = set(changed)
+    if len(changed) == 0:
+        return
+    dirty.update(changed)
+    dirty.update([c.split('.')[0] for c in changed])
+    for name in list(derived):
+        if _affects(derived_fields[name], changed):
+            del derived[name]
+    for fields, callback in list(listeners):
+        if _affects(fields, changed):
+            callback(changed)
+
+def set_value(name, value):
+    """Set a global variable (e.g. latitude), notifying listeners if its value changes.
+    
+    :returns: True if the value changed.
+    """
+    module = sys.modules[__name__]
+    changed = not _equal(getattr(module, name), value)
+    setattr(module, name, value)
+    if changed:
+        notify([name])
+    return changed
+
+def update_values(name, values):
+    """Set entries of a global dictionary or list (e.g. pv_data), notifying listeners of the entries that change.
+    
+    :param name: Name of the global variable.
+    :type name: String
+    :param values: New values keyed by dictionary key or list index.
+    :type values: Dictionary
+    :returns: List of changed fields.
+    """
+    container = getattr(sys.modules[__name__], name)
+    changed = []
+    for key, value in values.items():
+        if isinstance(container, dict) and key not in container:
+            changed.append(name + '.' + str(key))
+        elif not _equal(container[key], value):
+            changed.append(name + '.' + str(key))
+        container[key] = value
+    notify(changed)
+    return changed
+
+def get_derived(name, fields, fn):
+    """Return derived data, calculating it with fn() only if a field it depends on has changed since it was last calculated.
+    
+    :param name: Name of the derived data.
+    :type name: String
+    :param fields: Fields the derived data depends on.
+    :type fields: List
+    :param fn: Function calculating the derived data.
+    :type fn: Function
+    """
+    if name not in derived:
+        derived[name] = fn()
+        derived_fields[name] = list(fields)
+    return derived[name]
+
+def is_dirty(field = None):
+    """Return True if the field (or any field if None) has changed since the project was last loaded or saved."""
+    if field is None:
+        return len(dirty) > 0
+    return field in dirty
 
 def write_project_to_file(fname, data = False, readable = True):
     """Write project settings and data to file.  Uses simplejson library.
@@ -142,18 +264,7 @@ def write_project_to_file(fname, data = False, readable = True):
     global filename
         
     if not data:    
-        data = dict()    
-        
-        data['latitude'] = latitude
-        data['longitude'] = longitude
-        data['sys_data'] = sys_data
-        data['pv_resource'] = pv_resource
-        data['pv_data'] = pv_data
-        data['loads'] = loads
-        data['load_sigma'] = load_sigma
-        data['gen_data'] = gen_data
-        data['batt_data'] = batt_data
-        data['batt_char'] = batt_char
+        data = project_data()
         
     try:
         fp = open(fname, mode = 'w')
@@ -165,6 +276,7 @@ def write_project_to_file(fname, data = False, readable = True):
         filename = fname
     except:
         return False
+    dirty.clear()
     return True
     
 
@@ -208,6 +320,8 @@ def load_project_from_file(fname, populate = True):
             gen_data = data['gen_data']
             batt_data = data['batt_data']
             batt_char = data['batt_char']
+            notify(FIELDS)
+            dirty.clear()
             
     except:
         print(sys.exc_info()[0], sys.exc_info()[1])
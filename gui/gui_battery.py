@@ -18,6 +18,7 @@ from PyQt4 import QtCore, QtGui
 import numpy as np
 import gui.globals as globals
 import gui.utility as utility
+from engine.chron_sim import battery_constants
                       
 class battery_ui(QtGui.QWidget): 
     
@@ -50,11 +51,20 @@ class battery_ui(QtGui.QWidget):
         self.edit_Vdc = QtGui.QLineEdit()
         self.edit_Vdc.setFixedWidth(100)
         
+        label11 = QtGui.QLabel('Battery model:')
+        label11.setFixedWidth(100)
+        
+        self.combo_model = QtGui.QComboBox()
+        self.combo_model.addItems(["Kinetic (KiBaM)","Energy bucket"])
+        
         title2 = QtGui.QLabel('Battery discharge characteristics')
         title2.setFont(QtGui.QFont('arial', weight=QtGui.QFont.Bold))
         
         headings = ['Time (hours)', 'Capacity (A)']
-        self.tableWidget = SolarTable(window, headings = headings, alternatingRowColors = True)
+        bounds = [(0.0, 999999, True, False), (0.0, 999999, True, False)]
+        model = utility.ArrayTableModel(headings = headings, bounds = bounds, names = ['Discharge Time', 'Discharge Current'])
+        self.tableWidget = utility.ArrayTable(window, model, alternatingRowColors = True)
+        model.dataChanged.connect(lambda *args: globals.notify(['batt_char']))
         #self.tableWidget.setMinimumHeight(200)
         
         vline = QtGui.QFrame()
@@ -108,6 +118,9 @@ class battery_ui(QtGui.QWidget):
         self.edit_SOC_cyc = QtGui.QLineEdit()
         self.edit_SOC_cyc.setFixedWidth(100)
         
+        label12 = QtGui.QLabel('Fitted kinetic model:')
+        self.label_fit = QtGui.QLabel()
+        
         layout = QtGui.QGridLayout()
         layout.addWidget(title1, 0, 0)
         layout.addWidget(label1, 1, 0)
@@ -118,9 +131,11 @@ class battery_ui(QtGui.QWidget):
         layout.addWidget(label3a, 3, 0)
         layout.addWidget(self.edit_Vdc, 3, 1)
         layout.addWidget(label3b, 3, 2)
-        layout.addWidget(title2, 4, 0, 1, 2)
-        layout.addWidget(self.tableWidget, 5, 0, 10, 3)
-        layout.addWidget(vline, 0, 3, 15, 3)
+        layout.addWidget(label11, 4, 0)
+        layout.addWidget(self.combo_model, 4, 1)
+        layout.addWidget(title2, 5, 0, 1, 2)
+        layout.addWidget(self.tableWidget, 6, 0, 10, 3)
+        layout.addWidget(vline, 0, 3, 16, 3)
         layout.addWidget(title3, 0, 4)
         layout.addWidget(label4a, 1, 4)
         layout.addWidget(self.edit_effConv, 1, 5)
@@ -144,6 +159,8 @@ class battery_ui(QtGui.QWidget):
         layout.addWidget(label9a, 8, 4)
         layout.addWidget(self.edit_Toff, 8, 5)
         layout.addWidget(label9b, 8, 6)
+        layout.addWidget(label12, 9, 4)
+        layout.addWidget(self.label_fit, 9, 5, 1, 2)
         self.setLayout(layout)
 
         self.edit_nBatt.editingFinished.connect(utility.create_validation_hook(self, self.edit_nBatt, "Number of batteries", 0, 99999))
@@ -158,49 +175,40 @@ class battery_ui(QtGui.QWidget):
         self.edit_Ton.editingFinished.connect(utility.create_validation_hook(self, self.edit_Ton, "Ramp control start time", 0, 23))
         self.edit_Toff.editingFinished.connect(utility.create_validation_hook(self, self.edit_Toff, "Ramp control stop time", 0, 23))
         
-        self.tableWidget.itemChanged.connect(self.update_data_matrix)
+        # The model fit is only recalculated when the discharge data or number of batteries change
+        globals.subscribe(['batt_char', 'batt_data.n_batt'], self.update_fit)
 
         self.refresh_data()  
     
     def update_data(self):
         """Update global variables to match GUI fields"""
-        globals.batt_data['n_batt'] = int(self.edit_nBatt.text())
-        globals.batt_data['C_nom'] = float(self.edit_Cnom.text())
-        globals.batt_data['v_dc'] = float(self.edit_Vdc.text())
-        globals.batt_data['eff_conv'] = float(self.edit_effConv.text())
-        globals.batt_data['SOC_0'] = float(self.edit_initSOC.text())
-        globals.batt_data['SOC_min'] = float(self.edit_minSOC.text())
-        globals.batt_data['SOC_cyc'] = float(self.edit_SOC_cyc.text())
-        globals.batt_data['p_set'] = float(self.edit_Pset.text())
-        globals.batt_data['t_set'][0] = int(self.edit_Ton.text())
-        globals.batt_data['t_set'][1] = int(self.edit_Toff.text())
-        
-    def update_data_matrix(self, tableWidgetItem): 
-        """Update battery constants whenever table data is changed"""
-        value = 0.0
-        if tableWidgetItem.column() == 0:
-            element = "Discharge Time"
-            lower_bound = 0.0
-            upper_bound = 999999
-            value = utility.validate(tableWidgetItem.text(), lower_bound, upper_bound, l_inclusive = True, u_inclusive = False)
-        elif tableWidgetItem.column() == 1:
-            element = "Discharge Current"
-            lower_bound = 0.0
-            upper_bound = 999999
-            value = utility.validate(tableWidgetItem.text(), lower_bound, upper_bound, l_inclusive = True, u_inclusive = False)
-        
-        if value is not False:   
-            columns = [0,1]            
-            column = columns[tableWidgetItem.column()]
-            update_mapping = (globals.batt_char[tableWidgetItem.row(), column] != value)            
-            globals.batt_char[tableWidgetItem.row(), column] = value
-            #tableWidgetItem.setText(str(value))
-            
+        globals.update_values('batt_data', {
+            'n_batt'   : int(self.edit_nBatt.text()),
+            'C_nom'    : float(self.edit_Cnom.text()),
+            'v_dc'     : float(self.edit_Vdc.text()),
+            'eff_conv' : float(self.edit_effConv.text()),
+            'SOC_0'    : float(self.edit_initSOC.text()),
+            'SOC_min'  : float(self.edit_minSOC.text()),
+            'SOC_cyc'  : float(self.edit_SOC_cyc.text()),
+            'p_set'    : float(self.edit_Pset.text()),
+            't_set'    : [int(self.edit_Ton.text()), int(self.edit_Toff.text())],
+            'model'    : ['kibam', 'bucket'][self.combo_model.currentIndex()]
+        })
+    
+    def fit_battery(self):
+        """Fit the kinetic battery model to the discharge characteristics"""
+        try:
+            return battery_constants(globals.batt_char[:,1].tolist(), globals.batt_char[:,0].tolist(), globals.batt_data['n_batt'])
+        except (SystemExit, Exception):
+            return None
+    
+    def update_fit(self, changed = None):
+        """Update the fitted kinetic model constants (only refitted if the inputs have changed)"""
+        fit = globals.get_derived('batt_fit', ['batt_char', 'batt_data.n_batt'], self.fit_battery)
+        if fit is None:
+            self.label_fit.setText('Fit failed')
         else:
-            self.main_window.show_status_message(element + " Row " + str(tableWidgetItem.row() + 1) + ": Input value '" + tableWidgetItem.text() + "' out of bounds. (" + str(lower_bound) + " to " + str(upper_bound) + "). Value not set.", error = True, beep = True)
-            self.tableWidget.itemChanged.disconnect()
-            self.refresh_data()          
-            self.tableWidget.itemChanged.connect(self.update_data_matrix)            
+            self.label_fit.setText('k = %.4f, c = %.4f, qmax = %.1f Ah' % (fit[0], fit[1], fit[2]))
         
     def refresh_data(self):
         """Update GUI fields to match global variables"""
@@ -214,28 +222,7 @@ class battery_ui(QtGui.QWidget):
         self.edit_Pset.setText(str(globals.batt_data['p_set']))
         self.edit_Ton.setText(str(globals.batt_data['t_set'][0]))
         self.edit_Toff.setText(str(globals.batt_data['t_set'][1]))
+        self.combo_model.setCurrentIndex(['kibam', 'bucket'].index(globals.batt_data.get('model', 'kibam')))
         
         self.tableWidget.fill_table(globals.batt_char)
-            
-class SolarTable(utility.CentaurTable): 
-    """Modified version of LowFi table specifically for the Right Of Way tab."""
-
-    def signal_mapping(signal_mapper):
-        self.signal_mapper = signal_mapper
-
-    def fill_table(self, data):
-        """Fill table from 2D list or numpy array."""
-        if len(data) > 0:
-            if isinstance(data, np.ndarray):
-                data = data.tolist()
-            data_rows = len(data)
-            data_columns = len(data[0])
-            
-            if data_columns > 0:
-                self.setRowCount(data_rows)
-                for r in range(0, data_rows):
-                    # Update real columns
-                    for c in range(2):
-                        item = QtGui.QTableWidgetItem()                        
-                        item.setText(str(data[r][c]))      
-                        self.setItem(r, c, item)
\ No newline at end of file
+        self.update_fit()
@@ -85,11 +85,13 @@ class gen_ui(QtGui.QWidget):
     
     def update_data(self):
         """Update global variables to match GUI fields"""
-        globals.gen_data['n_gen'] = int(self.edit_nGen.text())
-        globals.gen_data['P_gen'] = float(self.edit_Pgen.text())
-        globals.gen_data['l_min'] = float(self.edit_Pmin.text())
-        globals.gen_data['e_f'] = float(self.edit_sfc.text())
-        globals.gen_data['chg_eff'] = float(self.edit_ChgEff.text())
+        globals.update_values('gen_data', {
+            'n_gen'   : int(self.edit_nGen.text()),
+            'P_gen'   : float(self.edit_Pgen.text()),
+            'l_min'   : float(self.edit_Pmin.text()),
+            'e_f'     : float(self.edit_sfc.text()),
+            'chg_eff' : float(self.edit_ChgEff.text())
+        })
                      
     def refresh_data(self):
         """Update GUI fields to match global variables"""
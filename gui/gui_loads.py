@@ -45,11 +45,12 @@ class loads_ui(QtGui.QWidget):
         title2.setFont(QtGui.QFont('arial', weight=QtGui.QFont.Bold))
         
         headings = ['Summer (kW)', 'Winter (kW)']
-        self.tableWidget = SolarTable(window, headings = headings, alternatingRowColors = True)
-        self.tableWidget.setMinimumHeight(500)
         vheadings = ['00:00', '01:00', '02:00', '03:00', '04:00', '05:00', '06:00', '07:00', '08:00', '09:00', '10:00', '11:00', '12:00', '13:00', '14:00', '15:00', '16:00', '17:00', '18:00', '19:00', '20:00', '21:00', '22:00', '23:00']
-        self.tableWidget.setRowCount(len(vheadings)) 
-        self.tableWidget.setVerticalHeaderLabels(vheadings)
+        bounds = [(0.0, 999999, True, False), (0.0, 999999, True, False)]
+        model = utility.ArrayTableModel(headings = headings, vheadings = vheadings, bounds = bounds, names = ['Summer Load', 'Winter Load'])
+        self.tableWidget = utility.ArrayTable(window, model, alternatingRowColors = True)
+        self.tableWidget.setMinimumHeight(500)
+        model.dataChanged.connect(lambda *args: globals.notify(['loads']))
         
         layout = QtGui.QGridLayout()
         layout.addWidget(title1, 0, 0)
@@ -64,68 +65,15 @@ class loads_ui(QtGui.QWidget):
         self.edit_sigma_s.editingFinished.connect(utility.create_validation_hook(self, self.edit_sigma_s, "Summer dispersion", 0, 99999))
         
         self.edit_sigma_w.editingFinished.connect(utility.create_validation_hook(self, self.edit_sigma_w, "Winter dispersion", 0, 99999))
-        
-        self.tableWidget.itemChanged.connect(self.update_data_matrix)
 
         self.refresh_data()  
     
     def update_data(self):
         """Update global variables to match GUI fields"""
-        globals.load_sigma[0] = float(self.edit_sigma_s.text())
-        globals.load_sigma[1] = float(self.edit_sigma_w.text())
+        globals.update_values('load_sigma', {0 : float(self.edit_sigma_s.text()), 1 : float(self.edit_sigma_w.text())})
            
-    def update_data_matrix(self, tableWidgetItem): 
-        """Update load matrix whenever table data is changed"""
-        value = 0.0
-        if tableWidgetItem.column() == 0:
-            element = "Summer Load"
-            lower_bound = 0.0
-            upper_bound = 999999
-            value = utility.validate(tableWidgetItem.text(), lower_bound, upper_bound, l_inclusive = True, u_inclusive = False)
-        elif tableWidgetItem.column() == 1:
-            element = "Winter Load"
-            lower_bound = 0.0
-            upper_bound = 999999
-            value = utility.validate(tableWidgetItem.text(), lower_bound, upper_bound, l_inclusive = True, u_inclusive = False)
-        
-        if value is not False:   
-            columns = [0,1]            
-            column = columns[tableWidgetItem.column()]
-            update_mapping = (globals.loads[tableWidgetItem.row(), column] != value)            
-            globals.loads[tableWidgetItem.row(), column] = value
-            #tableWidgetItem.setText(str(value))
-            
-        else:
-            self.main_window.show_status_message(element + " Hour " + str(tableWidgetItem.row()) + ": Input value '" + tableWidgetItem.text() + "' out of bounds. (" + str(lower_bound) + " to " + str(upper_bound) + "). Value not set.", error = True, beep = True)
-            self.tableWidget.itemChanged.disconnect()
-            self.refresh_data()          
-            self.tableWidget.itemChanged.connect(self.update_data_matrix)            
-        
     def refresh_data(self):
         """Update GUI fields to match global variables"""
         self.edit_sigma_s.setText(str(globals.load_sigma[0]))
         self.edit_sigma_w.setText(str(globals.load_sigma[1]))
         self.tableWidget.fill_table(globals.loads)
-            
-class SolarTable(utility.CentaurTable): 
-    """Modified version of LowFi table specifically for the Right Of Way tab."""
-
-    def signal_mapping(signal_mapper):
-        self.signal_mapper = signal_mapper
-
-    def fill_table(self, data):
-        """Fill table from 2D list or numpy array."""
-        if len(data) > 0:
-            if isinstance(data, np.ndarray):
-                data = data.tolist()
-            data_rows = len(data)
-            data_columns = len(data[0])
-            
-            if data_columns > 0:
-                self.setRowCount(data_rows)
-                for r in range(0, data_rows):
-                    # Update real columns
-                    for c in range(2):
-                        item = QtGui.QTableWidgetItem()                        
-                        item.setText(str(data[r][c]))      
-                        self.setItem(r, c, item)
\ No newline at end of file
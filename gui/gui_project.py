@@ -47,6 +47,11 @@ class project_ui(QtGui.QWidget):
         self.combo_ctrl = QtGui.QComboBox()
         self.combo_ctrl.addItems(["Mode 1: Battery grid former, genset backup","Mode 2: Mixed master, genset cycle charging","Mode 3: Mixed master, genset load following","Mode 4: Genset grid former, battery ramp control"])
         
+        label5 = QtGui.QLabel('Random seed:')
+        self.edit_seed = QtGui.QLineEdit()
+        self.edit_seed.setFixedWidth(100)
+        self.edit_seed.setToolTip('Leave blank for a new random sequence each run. Runs with a seed are cached.')
+        
         layout = QtGui.QGridLayout()
         layout.addWidget(title1, 0, 0)
         layout.addWidget(label1, 1, 0)
@@ -58,20 +63,28 @@ class project_ui(QtGui.QWidget):
         layout.addWidget(self.combo_config, 4, 1)
         layout.addWidget(label4, 5, 0)
         layout.addWidget(self.combo_ctrl, 5, 1)
+        layout.addWidget(label5, 6, 0)
+        layout.addWidget(self.edit_seed, 6, 1)
         self.setLayout(layout)
         
         self.refresh_data() 
                 
     def update_data(self):
         """Update global variables to match GUI fields"""
-        globals.sys_data['proj_title'] = self.edit_title.text()
-        globals.sys_data['proj_desc'] = self.edit_desc.toPlainText()
-        globals.sys_data['sys_config'] = self.combo_config.currentIndex()
-        globals.sys_data['ctrl_mode'] = self.combo_ctrl.currentIndex()
+        seed = utility.validate(self.edit_seed.text(), 0, 2**32 - 1, convert_to_integer = True)
+        globals.update_values('sys_data', {
+            'proj_title' : self.edit_title.text(),
+            'proj_desc'  : self.edit_desc.toPlainText(),
+            'sys_config' : self.combo_config.currentIndex(),
+            'ctrl_mode'  : self.combo_ctrl.currentIndex(),
+            'seed'       : None if seed is False else seed
+        })
                      
     def refresh_data(self):
         """Update GUI fields to match global variables"""
         self.edit_title.setText(str(globals.sys_data['proj_title']))
         self.edit_desc.setText(str(globals.sys_data['proj_desc']))
         self.combo_config.setCurrentIndex(globals.sys_data['sys_config'])
-        self.combo_ctrl.setCurrentIndex(globals.sys_data['ctrl_mode'])
\ No newline at end of file
+        self.combo_ctrl.setCurrentIndex(globals.sys_data['ctrl_mode'])
+        seed = globals.sys_data.get('seed')
+        self.edit_seed.setText('' if seed is None else str(seed))
\ No newline at end of file
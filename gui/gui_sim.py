@@ -16,10 +16,51 @@ Last edited: January 2018
 
 from PyQt4 import QtCore, QtGui
 import numpy as np
-import matplotlib.pyplot as plt
 import gui.globals as globals
 import gui.utility as utility
+from gui.plot_canvas import PlotCanvas, heatmap_matrix
 from engine.chron_sim import run_sim
+from engine.project import build_inputs
+from engine.result_cache import ResultCache, cached_run_sim, input_hash
+from engine.simulator import run_sim_stream, join_chunks
+import engine.kpi as kpi
+import engine.audit as audit
+import engine.pv_power as pv_power
+
+# Plot channels: combo box label -> (output key, scaling factor, plot title)
+PLOT_CHANNELS = {
+    'Load Demand'       : ('P_ld', 1, 'Load Demand (W)'),
+    'Generator Output'  : ('P_gen', 1 / 1000, 'Generator Output (kW)'),
+    'Solar PV Output'   : ('P_pv', 1, 'Solar PV Output (Wp)'),
+    'Battery SoC'       : ('q', 1, 'Battery state of charge (%)')
+}
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+class SimWorker(QtCore.QThread):
+    """Runs a simulation in a background thread and emits the results one month at a time"""
+    
+    chunk_ready = QtCore.pyqtSignal(object)
+    
+    def __init__(self, inputs, seed, parent=None):
+        QtCore.QThread.__init__(self, parent)
+        self.inputs = inputs
+        self.seed = seed
+        self.cancelled = False
+        self.error = None
+    
+    def run(self):
+        try:
+            if self.seed is not None:
+                np.random.seed(self.seed)
+            for chunk in run_sim_stream(*self.inputs):
+                if self.cancelled:
+                    break
+                self.chunk_ready.emit(chunk)
+        except BaseException as e:
+            # The battery constant fit raises SystemExit when it fails, so catch everything (the
+            # exception must not end the thread without being recorded)
+            self.error = e
                       
 class sim_ui(QtGui.QWidget): 
     
@@ -28,8 +69,15 @@ class sim_ui(QtGui.QWidget):
         
         self.main_window = window        
         
-        run_button = QtGui.QPushButton("Run")
-        run_button.setFixedWidth(80)
+        self.run_button = QtGui.QPushButton("Run")
+        self.run_button.setFixedWidth(80)
+        
+        self.cancel_button = QtGui.QPushButton("Cancel")
+        self.cancel_button.setFixedWidth(80)
+        self.cancel_button.setEnabled(False)
+        
+        self.perf_check = QtGui.QCheckBox("Report performance")
+        self.perf_check.setToolTip('Report the time spent in each phase of the simulation and hot path counters')
         
         title1 = QtGui.QLabel('Output Window')
         title1.setFont(QtGui.QFont('arial', weight=QtGui.QFont.Bold))
@@ -41,7 +89,7 @@ class sim_ui(QtGui.QWidget):
         self.textBox = QtGui.QTextEdit()
         self.textBox.setReadOnly(True)
         self.textBox.setFont(font)
-        self.textBox.setMinimumSize(QtCore.QSize(1000,400))
+        self.textBox.setMinimumSize(QtCore.QSize(1000,250))
         
         title2 = QtGui.QLabel('Plot Outputs')
         title2.setFont(QtGui.QFont('arial', weight=QtGui.QFont.Bold))
@@ -50,20 +98,38 @@ class sim_ui(QtGui.QWidget):
         self.combo_plot.setFixedWidth(150)
         plot_button = QtGui.QPushButton("Plot")
         
+        self.canvas = PlotCanvas(self)
+        self.canvas.setMinimumSize(QtCore.QSize(1000,300))
+        self.sim_out = None
+        self.heatmaps = {}
+        self.worker = None
+        self.chunks = []
+        
+        # Partial results are redrawn at most 10 times per second while a simulation is running
+        self.plot_dirty = False
+        self.redraw_timer = QtCore.QTimer(self)
+        self.redraw_timer.setInterval(100)
+        
         layout = QtGui.QGridLayout()
-        layout.addWidget(run_button, 0, 0)
+        layout.addWidget(self.run_button, 0, 0)
+        layout.addWidget(self.cancel_button, 0, 1)
+        layout.addWidget(self.perf_check, 0, 2)
         layout.addWidget(title1, 1, 0)
         layout.addWidget(clear_button, 1, 1)
         layout.addWidget(self.textBox, 2, 0, 3, 8)
         layout.addWidget(title2, 5, 0)
         layout.addWidget(self.combo_plot, 6, 0)
         layout.addWidget(plot_button, 6, 1)
+        layout.addWidget(self.canvas, 7, 0, 1, 8)
         
         self.setLayout(layout)
 
-        run_button.clicked.connect(self.runBtnClicked)
+        self.run_button.clicked.connect(self.runBtnClicked)
+        self.cancel_button.clicked.connect(self.cancelBtnClicked)
+        self.redraw_timer.timeout.connect(self.redraw_partial)
         clear_button.clicked.connect(self.clear_fn)
         plot_button.clicked.connect(self.plotBtnClicked)
+        self.combo_plot.currentIndexChanged.connect(self.plotBtnClicked)
         
         # Clear output window
         self.textBox.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
@@ -96,79 +162,116 @@ class sim_ui(QtGui.QWidget):
         for p in self.main_window.pages:
             p.update_data()
         
-        # Build up input dictionaries from global data
-        pv_dict = globals.pv_data
-        pv_dict['Ktm'] = globals.pv_resource[:,0].tolist()
-        pv_dict['T_amb'] = globals.pv_resource[:,1].tolist()
-        pv_dict['k_e'] = pv_dict['k_e'] / 100
-        pv_dict['k_m'] = pv_dict['k_m'] / 100
-        pv_dict['gamma'] = pv_dict['gamma'] / 100
-        pv_dict['eff_pv'] = pv_dict['eff_pv'] / 100
-        pv_dict['albedo'] = pv_dict['albedo'] / 100
-        
-        batt_dict = globals.batt_data
-        batt_dict['T'] = globals.batt_char[:,0].tolist()
-        batt_dict['I'] = globals.batt_char[:,1].tolist()
-        batt_dict['eff_conv'] = batt_dict['eff_conv'] / 100
-        
-        gen_dict = globals.gen_data
-        gen_dict['l_min'] = gen_dict['l_min'] / 100
-        gen_dict['chg_eff'] = gen_dict['chg_eff'] / 100
-        
-        load_dict = {
-            'l_sum' : globals.loads[:,0].tolist(),
-            'l_win' : globals.loads[:,1].tolist(),
-            'sigma_s' : globals.load_sigma[0], 
-            'sigma_w' : globals.load_sigma[1]
-        }
+        # Build up input dictionaries from (copies of) the global data, so that the percentage
+        # conversions do not change the project data
+        sys_dict, pv_dict, batt_dict, gen_dict, load_dict = build_inputs(globals.project_data())
         
+        # Discard the results (and cached heatmaps) of the previous run
+        self.sim_out = None
+        self.heatmaps = {}
         self.combo_plot.clear()
         self.combo_plot.addItem('Load Demand')
-        sys_dict = globals.sys_data
-        sys_dict['lat'] = globals.latitude
-        if sys_dict['sys_config'] in [0, 1, 3]:
-            sys_dict['is_gen'] = True
+        if sys_dict['is_gen']:
             self.combo_plot.addItem('Generator Output')
-        else:
-            sys_dict['is_gen'] = False
-        
-        if sys_dict['sys_config'] in [1, 2, 3]:
-            sys_dict['is_pv'] = True
+        if sys_dict['is_pv']:
             self.combo_plot.addItem('Solar PV Output')
-        else:
-            sys_dict['is_pv'] = False
-            
-        if sys_dict['sys_config'] in [2, 3]:
-            sys_dict['is_batt'] = True
+        if sys_dict['is_batt']:
             self.combo_plot.addItem('Battery SoC')
-        else:
-            sys_dict['is_batt'] = False
             
-        self.sim_out = run_sim(sys_dict,pv_dict,batt_dict,gen_dict,load_dict)
-        
-        topo = self.sim_out['topo']
-        P_ld = self.sim_out['P_ld']
-        E_tot = sum(P_ld)/1000
-        E_uns = sum(self.sim_out['P_uns'])
-
-        if topo[0] in [0,1,3]:
-            E_gen = sum(self.sim_out['P_gen'])
-            E_gen_exc = sum(self.sim_out['P_gen_exc'])
+        self.inputs = (sys_dict, pv_dict, batt_dict, gen_dict, load_dict)
+        seed = sys_dict.get('seed')
+        cache = ResultCache()
+        if self.perf_check.isChecked():
+            # Performance instrumentation is only switched on for this run (not saved with the project)
+            self.sim_out, cache_hit = cached_run_sim(dict(sys_dict, perf=True),pv_dict,batt_dict,gen_dict,load_dict,seed,cache)
         else:
-            E_gen = 0
-            
-        if topo[0] in [1,2,3]:
-            G0 = self.sim_out['G0']
-            GT = self.sim_out['GT']
-            P_pv = self.sim_out['P_pv']
-            E_exc = sum(self.sim_out['P_pv_exc'])
-            E_sol = sum(P_pv) - E_exc
-
-        if topo[0] in [2,3]:
-            q = self.sim_out['q']
-            E_bat = E_tot - (E_gen + E_uns) / 1000
+            self.sim_out = cache.get(input_hash(run_sim, self.inputs, seed)) if seed is not None else None
+            cache_hit = self.sim_out is not None
+        
+        if self.sim_out is None:
+            # Stream the results into the output window and plot as they are calculated
+            self.chunks = []
+            self.worker = SimWorker(self.inputs, seed, self)
+            self.worker.chunk_ready.connect(self.chunk_received)
+            self.worker.finished.connect(self.stream_finished)
+            self.run_button.setEnabled(False)
+            self.cancel_button.setEnabled(True)
+            self.redraw_timer.start()
+            self.worker.start()
+            return
+        
+        if cache_hit:
+            self.write('(Results loaded from cache)\n')
+        self.show_results(cache_hit)
+    
+    def cancelBtnClicked(self):
+        """ Cancel a running simulation (at the end of the current month) """
+        if self.worker is not None:
+            self.worker.cancelled = True
+    
+    def chunk_received(self, chunk):
+        """ Show one month of streamed results """
+        self.chunks.append(chunk)
+        msg = MONTHS[chunk['month']] + ': demand ' + str(round(np.sum(chunk['P_ld'])/1000,1)) + ' kWh, unsupplied ' + str(round(np.sum(chunk['P_uns'])/1000,1)) + ' kWh'
+        if self.inputs[0]['is_gen']:
+            msg = msg + ', generator ' + str(round(np.sum(chunk['P_gen'])/1000,1)) + ' kWh'
+        if 'q' in chunk:
+            msg = msg + ', minimum SoC ' + str(round(np.min(chunk['q']),1)) + '%'
+        self.write(msg + '\n')
+        self.plot_dirty = True
+    
+    def redraw_partial(self):
+        """ Redraw the plot with the results streamed so far """
+        label = str(self.combo_plot.currentText())
+        if not self.plot_dirty or not self.chunks or label not in PLOT_CHANNELS:
+            return
+        self.plot_dirty = False
+        
+        key, scale, title = PLOT_CHANNELS[label]
+        if key not in self.chunks[0]:
+            return
+        values = np.full(8760, np.nan)
+        streamed = np.concatenate([chunk[key] for chunk in self.chunks]) * scale
+        values[:len(streamed)] = streamed
+        matrix, n_days = heatmap_matrix(values)
+        self.canvas.show_heatmap(matrix, n_days, title)
+    
+    def stream_finished(self):
+        """ Finish a streamed simulation run """
+        self.redraw_timer.stop()
+        self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        worker = self.worker
+        self.worker = None
+        
+        if worker.error is not None or (not worker.cancelled and not self.chunks):
+            if isinstance(worker.error, SystemExit):
+                message = 'battery constants could not be estimated from the battery characteristics'
+            elif worker.error is not None:
+                message = str(worker.error) or type(worker.error).__name__
+            else:
+                message = 'no results were produced'
+            self.write('Simulation error: ' + message + '\n')
+            self.main_window.show_status_message('Simulation failed...')
+        elif worker.cancelled:
+            self.redraw_partial()
+            self.write('Simulation cancelled after ' + str(len(self.chunks)) + ' months\n')
+            self.main_window.show_status_message('Simulation cancelled...')
         else:
-            q = np.zeros(8761)
+            self.sim_out = join_chunks(self.chunks)
+            if worker.seed is not None:
+                ResultCache().put(input_hash(run_sim, self.inputs, worker.seed), self.sim_out)
+            self.show_results(False)
+    
+    def show_results(self, cache_hit):
+        """ Write the summary of the simulation results and plot the results """
+        sys_dict, pv_dict, batt_dict, gen_dict, load_dict = self.inputs
+        topo = self.sim_out['topo']
+        kpi_out = kpi.kpis(self.sim_out, batt_dict, gen_dict)
+        E_tot = kpi_out['E_ld']
+        
+        # Check that every hour of the simulation balances
+        balance = audit.audit(self.sim_out, sys_dict, pv_dict, batt_dict, gen_dict)
                     
         self.write('--------------------------------------\n')
         self.write('SYSTEM SUMMARY\n')
@@ -187,7 +290,7 @@ class sim_ui(QtGui.QWidget):
                 ctrl_mode = 'Genset grid former (AC coupled), battery charged by PV and cycle discharged'
             self.write('Control mode: ' + ctrl_mode + '\n')
         if topo[0] in [1,2,3]:
-            self.write('Solar PV system capacity: ' + str(pv_dict['P_stc']/1000) + ' kWp (' + pv_dict['pv_cpl'] + ' coupled)\n')
+            self.write('Solar PV system capacity: ' + str(pv_power.capacity(pv_dict)/1000) + ' kWp (' + pv_dict['pv_cpl'] + ' coupled)\n')
         if topo[0] in [2,3]:
             self.write('Battery system capacity: ' + str(batt_dict['C_nom'] * batt_dict['n_batt'] * batt_dict['v_dc'] /1000) + ' kWh\n')
         if topo[0] in [0,1,3]:
@@ -199,66 +302,89 @@ class sim_ui(QtGui.QWidget):
         self.write('SYSTEM LOAD \n')
         self.write('----------- \n')
         self.write('Total energy demand: ' + str(round(E_tot,2)) + ' kWh\n')
-        self.write('Energy unsupplied: ' + str(round(E_uns/1000,2)) + ' kWh (' + str(round(E_uns/1000/E_tot *100,2)) + '% of overall demand)\n')
+        self.write('Energy unsupplied: ' + str(round(kpi_out['E_uns'],2)) + ' kWh (' + str(round(kpi_out['frac_uns'] *100,2)) + '% of overall demand)\n')
+        if balance['ok']:
+            self.write('Hourly energy balance: OK\n')
+        else:
+            hours = balance['violations'][0]
+            self.write('Hourly energy balance: ' + str(balance['n_violations']) + ' hours do not balance (max residual ' + str(round(balance['max_residual'],2)) + ' W), first at hour ' + str(hours[0]) + '\n')
+        self.write('\n')
+        self.write('RELIABILITY \n')
+        self.write('----------- \n')
+        self.write('Loss of load probability: ' + str(round(kpi_out['LOLP'] *100,2)) + '% of hours\n')
+        self.write('Number of outages: ' + str(kpi_out['n_outages']) + '\n')
+        self.write('Longest outage: ' + str(kpi_out['max_outage']) + ' hours\n')
         if topo[0] in [1,2,3]:
+            E_pv = kpi_out['E_pv']
             self.write('\n')
             self.write('SOLAR PV SYSTEM \n')
             self.write('--------------- \n')
-            self.write('Total GHI: ' + str(round(sum(self.sim_out['G0'])/1000,2)) + ' kWh/m2 per year\n')
-            self.write('Total incident radiation: ' + str(round(sum(self.sim_out['GT'])/1000,2)) + ' kWh/m2 per year\n')
-            self.write('Total solar PV system output: ' + str(round(sum(P_pv)/1000,2)) + ' kWh (including inverter/SCC losses)\n')
-            self.write('Useful solar PV energy: ' + str(round(E_sol/1000,2)) + ' kWh (' + str(round(E_sol/sum(P_pv)*100,2)) + '% of total solar output)\n')
-            self.write('Excess solar PV energy: ' + str(round(E_exc/1000,2)) + ' kWh (' + str(round(E_exc/sum(P_pv)*100,2)) + '% of total solar output)\n')
+            self.write('Total GHI: ' + str(round(kpi_out['H_G0'],2)) + ' kWh/m2 per year\n')
+            self.write('Total incident radiation: ' + str(round(kpi_out['H_GT'],2)) + ' kWh/m2 per year\n')
+            self.write('Total solar PV system output: ' + str(round(E_pv,2)) + ' kWh (including inverter/SCC losses)\n')
+            self.write('Useful solar PV energy: ' + str(round(kpi_out['E_pv_used'],2)) + ' kWh (' + str(round(kpi_out['E_pv_used']/E_pv*100,2)) + '% of total solar output)\n')
+            self.write('Excess solar PV energy: ' + str(round(kpi_out['E_pv_exc'],2)) + ' kWh (' + str(round(kpi_out['E_pv_exc']/E_pv*100,2)) + '% of total solar output)\n')
 
         if topo[0] in [2,3]:
+            E_bat = kpi_out['E_bat']
             self.write('\n')
             self.write('BATTERY SYSTEM \n')
             self.write('-------------- \n')
             self.write('Load supplied by PV/battery system: ' + str(round(E_bat,2)) + ' kWh (' + str(round(E_bat/E_tot *100,2)) + '% of overall demand)\n')
+            self.write('Battery energy discharged: ' + str(round(kpi_out['E_dis'],2)) + ' kWh\n')
+            self.write('Battery energy charged: ' + str(round(kpi_out['E_chg'],2)) + ' kWh\n')
+            self.write('Battery throughput: ' + str(round(kpi_out['throughput'],2)) + ' kWh (' + str(round(kpi_out['cycles'],1)) + ' equivalent full cycles)\n')
         if topo[0] in [0,1,3]:
+            E_gen = kpi_out['E_gen']
+            E_gen_exc = kpi_out['E_gen_exc']
             self.write('\n')
             self.write('GENERATOR \n')
             self.write('--------- \n')
-            self.write('Load supplied by generator: ' + str(round(E_gen/1000,2)) + ' kWh (' + str(round(E_gen/1000/E_tot *100,2)) + '% of overall demand)\n')
-            self.write('Excess generation: ' + str(round(E_gen_exc/1000,2)) + ' kWh (' + str(round(E_gen_exc/(E_gen+E_gen_exc)*100,2)) + '% of total generator output)\n')
-            self.write('Fuel used by generator: ' + str(round((E_gen+E_gen_exc)/1000 * gen_dict['e_f'],2)) + ' litres\n')
+            self.write('Load supplied by generator: ' + str(round(E_gen,2)) + ' kWh (' + str(round(E_gen/E_tot *100,2)) + '% of overall demand)\n')
+            self.write('Excess generation: ' + str(round(E_gen_exc,2)) + ' kWh (' + str(round(E_gen_exc/(E_gen+E_gen_exc)*100,2)) + '% of total generator output)\n')
+            self.write('Fuel used by generator: ' + str(round(kpi_out['fuel'],2)) + ' litres\n')
+            if kpi_out['E_gen_over'] > 0:
+                self.write('Generator output above rating (no fuel counted): ' + str(round(kpi_out['E_gen_over'],2)) + ' kWh\n')
+            self.write('Generator run hours: ' + str(kpi_out['gen_hours']) + ' (longest continuous run ' + str(kpi_out['max_gen_run']) + ' hours)\n')
+            self.write('Generator run hours (per unit): ' + ', '.join(str(h) for h in kpi_out['unit_run_hours']) + '\n')
+            self.write('Generator starts (per unit): ' + ', '.join(str(n) for n in kpi_out['unit_starts']) + '\n')
+        
+        if 'perf' in self.sim_out:
+            perf = self.sim_out['perf']
+            self.write('\n')
+            self.write('PERFORMANCE \n')
+            self.write('----------- \n')
+            if cache_hit:
+                self.write('(Timings are from the original run)\n')
+            for phase in perf['time']:
+                self.write('Time in ' + phase + ': ' + str(round(perf['time'][phase] * 1000, 1)) + ' ms\n')
+            for counter in sorted(perf['counts']):
+                self.write(counter + ': ' + str(perf['counts'][counter]) + '\n')
         
+        self.cache_heatmaps()
+        self.plotBtnClicked()
         self.main_window.show_status_message('Simulation complete...')
     
+    def cache_heatmaps(self):
+        """ Precompute the heatmap matrix of each result channel """
+        self.heatmaps = {}
+        for label in PLOT_CHANNELS:
+            key, scale, title = PLOT_CHANNELS[label]
+            if len(self.sim_out.get(key, [])) > 0:
+                values = np.asarray(self.sim_out[key], dtype=float) * scale
+                if key == 'q':
+                    # State of charge includes the initial value
+                    values = values[1:]
+                self.heatmaps[label] = heatmap_matrix(values)
+    
     def plotBtnClicked(self):
         """ Plot result outputs """
-        if plt.fignum_exists(1):
-            # Do nothing if a plot is already open
-            QtGui.QMessageBox.warning(self, 'Warning', "A plot is already open. Please close to create a new plot.", QtGui.QMessageBox.Ok)
-        else:
-            fig = plt.figure(1, facecolor='white', figsize=(16,7))
-            if self.combo_plot.currentText() == 'Battery SoC':
-                q = self.sim_out['q']
-                # Reshape q into 2d matrix (24 x 365)
-                q2d = np.reshape(np.matrix(q[1:]), (-1,24)).T
-                plt.title('Battery state of charge (%)')
-                
-            elif self.combo_plot.currentText() == 'Generator Output':
-                q = np.array(self.sim_out['P_gen']) / 1000
-                q2d = np.reshape(np.matrix(q), (-1,24)).T
-                plt.title('Generator Output (kW)')
-                
-            elif self.combo_plot.currentText() == 'Solar PV Output':
-                q = self.sim_out['P_pv']
-                q2d = np.reshape(np.matrix(q), (-1,24)).T
-                plt.title('Solar PV Output (Wp)')
-            
-            elif self.combo_plot.currentText() == 'Load Demand':
-                q = self.sim_out['P_ld']
-                q2d = np.reshape(np.matrix(q), (-1,24)).T
-                plt.title('Load Demand (W)')
-            
-            try:
-                plt.ylabel('Hour of the day')
-                plt.xlabel('Day of the year')
-                plt.imshow(q2d, aspect='auto', cmap='jet')
-                plt.colorbar()
-                plt.show()
-            except:
-                self.main_window.show_status_message('Error opening plot...')
-                plt.close()
\ No newline at end of file
+        label = str(self.combo_plot.currentText())
+        if self.sim_out is None or label not in self.heatmaps:
+            return
+        
+        matrix, n_days = self.heatmaps[label]
+        try:
+            self.canvas.show_heatmap(matrix, n_days, PLOT_CHANNELS[label][2])
+        except:
+            self.main_window.show_status_message('Error plotting results...')
@@ -48,7 +48,10 @@ class solar_ui(QtGui.QWidget):
         update_button.setFixedWidth(80)
         
         headings = ['Ktm', 'Tamb']
-        self.tableWidget = SolarTable(window, headings = headings, alternatingRowColors = True)
+        bounds = [(0.0, 1.0, False, False), (-60.0, 60.0, False, False)]
+        model = utility.ArrayTableModel(headings = headings, bounds = bounds, row_name = "Month")
+        self.tableWidget = utility.ArrayTable(window, model, alternatingRowColors = True)
+        model.dataChanged.connect(lambda *args: globals.notify(['pv_resource']))
         self.tableWidget.setMinimumHeight(400)
         
         vline = QtGui.QFrame()
@@ -179,7 +182,6 @@ class solar_ui(QtGui.QWidget):
         
         self.pv_coupling.currentIndexChanged.connect(self.update_coupling)
         update_button.clicked.connect(self.buttonClicked)
-        self.tableWidget.itemChanged.connect(self.update_data_matrix)
 
     # TODO: Button doesn't do anything at the moment - make it goto NASA SSE and get data
     def buttonClicked(self, tableWidget):
@@ -188,53 +190,29 @@ class solar_ui(QtGui.QWidget):
     
     def update_data(self):
         """Update global variables to match GUI fields"""
-        globals.latitude = float(self.edit_lat.text())
-        globals.longitude = float(self.edit_lon.text())
-        globals.pv_data['P_stc'] = float(self.edit_Pstc.text())
-        globals.pv_data['P_inv'] = float(self.edit_Pinv.text())
-        globals.pv_data['gamma'] = float(self.edit_gamma.text())
-        globals.pv_data['k_e'] = float(self.edit_ke.text())
-        globals.pv_data['k_m'] = float(self.edit_km.text())
-        globals.pv_data['eff_pv'] = float(self.edit_eff.text())
-        globals.pv_data['tilt'] = float(self.edit_tilt.text())
-        globals.pv_data['azimuth'] = float(self.edit_azimuth.text())
-        globals.pv_data['albedo'] = float(self.edit_albedo.text())
+        globals.set_value('latitude', float(self.edit_lat.text()))
+        globals.set_value('longitude', float(self.edit_lon.text()))
+        globals.update_values('pv_data', {
+            'P_stc'   : float(self.edit_Pstc.text()),
+            'P_inv'   : float(self.edit_Pinv.text()),
+            'gamma'   : float(self.edit_gamma.text()),
+            'k_e'     : float(self.edit_ke.text()),
+            'k_m'     : float(self.edit_km.text()),
+            'eff_pv'  : float(self.edit_eff.text()),
+            'tilt'    : float(self.edit_tilt.text()),
+            'azimuth' : float(self.edit_azimuth.text()),
+            'albedo'  : float(self.edit_albedo.text())
+        })
     
     def update_coupling(self):
         """Update global variable for AC/DC coupling combo box"""
         if self.pv_coupling.currentIndex() == 0:
-            globals.pv_data['pv_cpl'] = 'AC'
+            globals.update_values('pv_data', {'pv_cpl' : 'AC'})
             self.edit_Pinv.setEnabled(True)
         else:
-            globals.pv_data['pv_cpl'] = 'DC'
+            globals.update_values('pv_data', {'pv_cpl' : 'DC'})
             self.edit_Pinv.setEnabled(False)
         
-    def update_data_matrix(self, tableWidgetItem): 
-        """Update PV resource matrix whenever table data is changed"""
-        value = 0.0
-        if tableWidgetItem.column() == 0:
-            element = "Ktm"
-            lower_bound = 0.0
-            upper_bound = 1.0
-            value = utility.validate(tableWidgetItem.text(), lower_bound, upper_bound, l_inclusive = False, u_inclusive = False)
-        elif tableWidgetItem.column() == 1:
-            element = "Tamb"
-            lower_bound = -60.0
-            upper_bound = 60.0
-            value = utility.validate(tableWidgetItem.text(), lower_bound, upper_bound, l_inclusive = False, u_inclusive = False)
-        
-        if value is not False:   
-            columns = [0,1]            
-            column = columns[tableWidgetItem.column()]
-            update_mapping = (globals.pv_resource[tableWidgetItem.row(), column] != value)            
-            globals.pv_resource[tableWidgetItem.row(), column] = value
-            
-        else:
-            self.main_window.show_status_message("Month " + str(tableWidgetItem.row() + 1) + " " + element +  ": Input value '" + tableWidgetItem.text() + "' out of bounds. (" + str(lower_bound) + " to " + str(upper_bound) + "). Value not set.", error = True, beep = True)
-            self.tableWidget.itemChanged.disconnect()
-            self.refresh_data()          
-            self.tableWidget.itemChanged.connect(self.update_data_matrix)            
-        
     def refresh_data(self):
         """Update GUI fields to match global variables"""
         self.edit_lat.setText(str(globals.latitude))
@@ -255,26 +233,3 @@ class solar_ui(QtGui.QWidget):
         self.edit_tilt.setText(str(globals.pv_data['tilt']))
         self.edit_azimuth.setText(str(globals.pv_data['azimuth']))
         self.edit_albedo.setText(str(globals.pv_data['albedo']))
-            
-class SolarTable(utility.CentaurTable): 
-    """Modified version of LowFi table specifically for the Right Of Way tab."""
-
-    def signal_mapping(signal_mapper):
-        self.signal_mapper = signal_mapper
-
-    def fill_table(self, data):
-        """Fill table from 2D list or numpy array."""
-        if len(data) > 0:
-            if isinstance(data, np.ndarray):
-                data = data.tolist()
-            data_rows = len(data)
-            data_columns = len(data[0])
-            
-            if data_columns > 0:
-                self.setRowCount(data_rows)
-                for r in range(0, data_rows):
-                    # Update real columns
-                    for c in range(2):
-                        item = QtGui.QTableWidgetItem()                        
-                        item.setText(str(data[r][c]))      
-                        self.setItem(r, c, item)
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+CENTAUR: Hybrid Power System Simulation
+
+Embedded Plot Canvas
+
+Matplotlib canvas embedded in the GUI for heatmaps of hourly results (hour of the day vs day).
+The image artist is created once and updated in place, so switching between channels only
+replaces the image data and redraws.
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt4agg import FigureCanvasQTAgg as FigureCanvas
+
+def heatmap_matrix(values, max_days=730):
+    """
+    Arranges an hourly series into a heatmap matrix (hour of the day vs day)
+
+    Series longer than max_days days (e.g. multi-year runs) are downsampled by averaging blocks
+    of consecutive days, so that the image never has more columns than can be displayed.
+
+    Inputs:
+        values      Hourly series (length a multiple of 24)
+        max_days    Maximum number of columns (days) in the matrix
+
+    Outputs:
+        matrix      Array of shape (24, n_cols)
+        n_days      Number of days covered by the series
+    """
+    values = np.asarray(values, dtype=float)
+    matrix = values.reshape(-1, 24).T
+    n_days = matrix.shape[1]
+
+    if n_days > max_days:
+        block = int(np.ceil(n_days / max_days))
+        n_cols = int(np.ceil(n_days / block))
+        padded = np.full((24, n_cols * block), np.nan)
+        padded[:, :n_days] = matrix
+        matrix = np.nanmean(padded.reshape(24, n_cols, block), axis=2)
+
+    return matrix, n_days
+
+class PlotCanvas(FigureCanvas):
+    """Qt canvas showing a heatmap of an hourly result channel"""
+
+    def __init__(self, parent=None):
+        self.fig = Figure(facecolor='white', figsize=(16,5))
+        FigureCanvas.__init__(self, self.fig)
+        self.setParent(parent)
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_ylabel('Hour of the day')
+        self.ax.set_xlabel('Day of the year')
+        self.image = None
+        self.colorbar = None
+
+    def show_heatmap(self, matrix, n_days, title):
+        """Shows a heatmap matrix, reusing the existing image artist if there is one"""
+        extent = (0, n_days, 24, 0)
+        if self.image is None:
+            self.image = self.ax.imshow(matrix, aspect='auto', cmap='jet', extent=extent, interpolation='nearest')
+            self.colorbar = self.fig.colorbar(self.image, ax=self.ax)
+        else:
+            self.image.set_data(matrix)
+            self.image.set_extent(extent)
+            self.ax.set_xlim(0, n_days)
+
+        # Rescale the colour map to the new data
+        lo = np.nanmin(matrix)
+        hi = np.nanmax(matrix)
+        self.image.set_clim(lo, hi if hi > lo else lo + 1)
+        self.ax.set_title(title)
+        self.draw_idle()
+
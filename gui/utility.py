@@ -91,7 +91,7 @@ def create_validation_hook(gui, text_field, description, lower_bound = 0.0, uppe
     :type convert_to_integer: Boolean
     :param update_data: Optional. True if update_data function should be called on gui object.
     :type update_data: Boolean
-    :param refresh_data: Optional. True if refresh_data function should be called on gui object.
+    :param refresh_data: Optional. True if refresh_data function should be called on gui object to restore an invalid value.
     :type refresh_data: Boolean
     :returns: Reference to function which will perform validation calls.
     """        
@@ -105,11 +105,11 @@ def create_validation_hook(gui, text_field, description, lower_bound = 0.0, uppe
             if refresh_data:
                 gui.refresh_data()
         else:
+            # Only the fields whose values change are notified (see globals.update_values),
+            # so the rest of the page does not need to be refreshed
             if update_data:
                 gui.update_data()
             gui.main_window.show_status_message("", error = False, beep = False)
-            if refresh_data:
-                gui.refresh_data()            
     return validation_hook
 
 
@@ -271,4 +271,228 @@ class CentaurTable(QtGui.QTableWidget):
         """Return the data from the table as a 2D list."""
         data = [ [ self.item(r, c).text() for c in range(self.columnCount()) ] for r in range(self.rowCount()) ]
         return data
-    
\ No newline at end of file
+    
+class ArrayTableModel(QtCore.QAbstractTableModel):
+    """Table model backed directly by a 2D numpy array of floats.
+
+    Cells are read from and written to the array in place, so no table items are created and
+    large arrays load without delay. Copy and paste work on whole blocks of the array, and pasted
+    blocks are parsed and validated in one pass before any cell is changed.
+    """
+
+    invalid_input = QtCore.pyqtSignal(str)
+
+    def __init__(self, data = None, headings = [], vheadings = [], bounds = [], names = [], row_name = "Row", readOnly = False):
+        """Constructor.
+
+        :param data: Array edited by the model (float arrays are edited in place).
+        :type data: Numpy array
+        :param headings: Column headings.
+        :type headings: List
+        :param vheadings: Optional. Row headings (row numbers are shown if empty).
+        :type vheadings: List
+        :param bounds: Optional. Valid range of each column as (lower, upper, l_inclusive, u_inclusive) tuples.
+        :type bounds: List
+        :param names: Optional. Description of each column for status messages.
+        :type names: List
+        :param row_name: Optional. Description of a row for status messages (if there are no row headings).
+        :type row_name: String
+        :param readOnly: Optional. True if cells cannot be edited.
+        :type readOnly: Boolean
+        """
+        super(ArrayTableModel, self).__init__()
+        self.headings = list(headings)
+        self.vheadings = list(vheadings)
+        self.bounds = list(bounds)
+        self.names = list(names) if len(names) > 0 else list(headings)
+        self.row_name = row_name
+        self.readOnly = readOnly
+        self.array = np.zeros((0, len(headings)))
+        if data is not None:
+            self.set_array(data)
+
+    def set_array(self, data):
+        """Bind the model to a new array and refresh all views."""
+        self.beginResetModel()
+        self.array = np.asarray(data, dtype = float)
+        self.endResetModel()
+
+    def rowCount(self, parent = QtCore.QModelIndex()):
+        return self.array.shape[0]
+
+    def columnCount(self, parent = QtCore.QModelIndex()):
+        return self.array.shape[1] if self.array.ndim > 1 else 0
+
+    def data(self, index, role = QtCore.Qt.DisplayRole):
+        if index.isValid() and role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return str(self.array[index.row(), index.column()])
+        return None
+
+    def headerData(self, section, orientation, role = QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return self.headings[section] if section < len(self.headings) else str(section + 1)
+        return self.vheadings[section] if section < len(self.vheadings) else str(section + 1)
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled
+        if not self.readOnly:
+            flags = flags | QtCore.Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role = QtCore.Qt.EditRole):
+        """Validate and write a single edited cell."""
+        if not index.isValid() or role != QtCore.Qt.EditRole:
+            return False
+        # Python 3.3 receives a str, 2.7 receives QVariant
+        text = str(value.toString()) if type(value) == QtCore.QVariant else str(value)
+        r = index.row()
+        c = index.column()
+        if c < len(self.bounds):
+            lower_bound, upper_bound, l_inclusive, u_inclusive = self.bounds[c]
+            value = validate(text, lower_bound, upper_bound, l_inclusive, u_inclusive)
+        else:
+            value = validate(text, -np.inf, np.inf)
+        if value is False:
+            self.invalid_input.emit(self.describe_error(r, c, text))
+            return False
+        self.array[r, c] = value
+        self.dataChanged.emit(index, index)
+        return True
+
+    def describe_error(self, row, column, text):
+        """Return the status message for an invalid input value."""
+        element = self.names[column] if column < len(self.names) else "Column " + str(column + 1)
+        if row < len(self.vheadings):
+            location = self.vheadings[row]
+        else:
+            location = self.row_name + " " + str(row + 1)
+        message = element + " " + location + ": Input value '" + text + "' out of bounds."
+        if column < len(self.bounds):
+            message = message[:-1] + " (" + str(self.bounds[column][0]) + " to " + str(self.bounds[column][1]) + ")."
+        return message + " Value not set."
+
+    def copy_text(self, top, left, bottom, right):
+        """Return a block of the array as tab delimited text (rows and columns inclusive)."""
+        block = self.array[top:bottom + 1, left:right + 1].tolist()
+        return ''.join([ "\t".join([ str(val) for val in row ]) + "\n" for row in block ])
+
+    def paste_text(self, text, row, column):
+        """Parse tab delimited text and write it into the array from a given cell.
+
+        The whole block is parsed and checked against the column bounds before any cell is
+        changed, so an invalid paste leaves the array untouched.
+
+        :returns: Empty string if the paste succeeded, otherwise a status message.
+        """
+        lines = [ [ val for val in line.split('\t') if len(val.strip()) > 0 ] for line in text.splitlines() ]
+        lines = [ line for line in lines if len(line) > 0 ]
+        if len(lines) == 0:
+            return "Clipboard data invalid."
+        try:
+            block = np.array(lines, dtype = float)
+        except ValueError:
+            return "Clipboard data invalid."
+
+        data_rows, data_columns = block.shape
+        if row + data_rows > self.rowCount() or column + data_columns > self.columnCount():
+            return "Clipboard data too large."
+
+        for c in range(data_columns):
+            if column + c >= len(self.bounds):
+                continue
+            lower_bound, upper_bound, l_inclusive, u_inclusive = self.bounds[column + c]
+            values = block[:, c]
+            valid = (values >= lower_bound if l_inclusive else values > lower_bound) & (values <= upper_bound if u_inclusive else values < upper_bound)
+            if not valid.all():
+                r = int(np.argmin(valid))
+                return self.describe_error(row + r, column + c, lines[r][c])
+
+        self.array[row:row + data_rows, column:column + data_columns] = block
+        self.dataChanged.emit(self.index(row, column), self.index(row + data_rows - 1, column + data_columns - 1))
+        return ""
+
+class ArrayTable(QtGui.QTableView):
+    """Table view for an ArrayTableModel with the Copy/Paste functionality of CentaurTable."""
+
+    def __init__(self, main_window, model = None, allowCopy = True, allowPaste = True, alternatingRowColors = False, allowShortcut = True):
+        """Constructor which will set up Copy & Paste actions and attach the model."""
+        super(ArrayTable, self).__init__()
+        self.setup(main_window, allowCopy, allowPaste, allowShortcut)
+        if model is None:
+            model = ArrayTableModel()
+        self.setModel(model)
+        model.invalid_input.connect(self.show_error)
+        self.setAlternatingRowColors(alternatingRowColors)
+
+    def setup(self, main_window, allowCopy = True, allowPaste = True, allowShortcut = True):
+        """Set up table."""
+        self.main_window = main_window
+
+        if allowCopy:
+            copyAction = QtGui.QAction('&Copy', self)
+            if allowShortcut:
+                copyAction.setShortcut('Ctrl+C')
+            copyAction.setStatusTip('Copy')
+            copyAction.triggered.connect(self.copy_fn)
+            self.addAction(copyAction)
+
+        if allowPaste:
+            pasteAction = QtGui.QAction('&Paste', self)
+            if allowShortcut:
+                pasteAction.setShortcut('Ctrl+V')
+            pasteAction.setStatusTip('Paste')
+            pasteAction.triggered.connect(self.paste_fn)
+            self.addAction(pasteAction)
+
+        if allowCopy or allowPaste:
+            self.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
+            self.setSelectionMode(QtGui.QAbstractItemView.ContiguousSelection)
+
+    def show_error(self, message):
+        """Show an invalid input message in the status line."""
+        self.main_window.show_status_message(message, error = True, beep = True)
+
+    def copy_fn(self):
+        """Function for the Copy action."""
+        selection = self.selectionModel().selection()
+        if len(selection) != 1:
+            self.main_window.show_status_message("Copy command cannot be used with multiple ranges selected.", error = True, beep = True)
+            return
+        block = selection[0]
+        copy = self.model().copy_text(block.top(), block.left(), block.bottom(), block.right())
+        QtGui.QApplication.clipboard().setText(copy)
+
+    def paste_fn(self):
+        """Function for the Paste action."""
+        selection = self.selectionModel().selection()
+        if len(selection) == 0:
+            return
+        row = min([ block.top() for block in selection ])
+        column = min([ block.left() for block in selection ])
+        message = self.model().paste_text(str(QtGui.QApplication.clipboard().text()), row, column)
+        if len(message) > 0:
+            self.main_window.show_status_message(message, error = True, beep = True)
+        else:
+            self.main_window.show_status_message("", error = False, beep = False)
+
+    def fill_table(self, data):
+        """Show a 2D numpy array in the table (float arrays are edited in place)."""
+        if data is not self.model().array:
+            self.model().set_array(data)
+
+    def get_headings_and_data_as_list(self):
+        """Return a 2D list including headings and data."""
+        data = self.get_data_as_list()
+        if len(self.model().headings) == 0:
+            return data
+        return [self.get_headings_as_list()] + data
+
+    def get_headings_as_list(self):
+        """Return list of headings."""
+        return list(self.model().headings)
+
+    def get_data_as_list(self):
+        """Return the data from the table as a 2D list."""
+        return [ [ str(val) for val in row ] for row in self.model().array.tolist() ]
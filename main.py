@@ -77,6 +77,9 @@ class Window(QtGui.QWidget):
         
         self.pages = [self.page1, self.page2, self.page3, self.page4, self.page5]
         
+        # Mark the window title when the project has unsaved changes
+        globals.subscribe(globals.FIELDS, self.update_title)
+        
         """
         Actions
         """
@@ -138,6 +141,16 @@ class Window(QtGui.QWidget):
         """Refresh each page with data from globals variables."""
         for p in self.pages:
             p.refresh_data()
+        self.update_title()
+    
+    def update_title(self, changed = None):
+        """Show the project file name in the window title, with a * if there are unsaved changes."""
+        title = 'CENTAUR'
+        if globals.filename != "":
+            title = title + ' - ' + os.path.basename(str(globals.filename))
+        if globals.is_dirty():
+            title = title + ' *'
+        self.setWindowTitle(title)
     
     def show_status_message(self, message, error = False, beep = False):
         """Display a status message on the status line.
@@ -163,7 +176,7 @@ class Window(QtGui.QWidget):
             
             if globals.write_project_to_file(fname):
                 self.show_status_message("Write to file " + fname + " successful.")
-                self.refresh_data()                
+                self.update_title()
             else:
                 self.show_status_message("Failed to save " + fname + ".", error = True, beep = True)
         else:
@@ -173,16 +186,21 @@ class Window(QtGui.QWidget):
         """Function for the Save action."""
         if globals.filename != "":
             if globals.write_project_to_file(globals.filename):                
-                self.refresh_data()        
+                self.update_title()
             else:
                 self.show_status_message("Failed to save " + globals.filename + ".", error = True, beep = True)
         
     def open_fn(self):
         """Function for the Open action."""
+        for p in self.pages:
+            p.update_data()
+        if globals.is_dirty():
+            reply = QtGui.QMessageBox.question(self, "Unsaved changes", "The project has unsaved changes. Open another project anyway?",
+                                               QtGui.QMessageBox.Yes | QtGui.QMessageBox.No, QtGui.QMessageBox.No)
+            if reply != QtGui.QMessageBox.Yes:
+                self.show_status_message("Open Data File cancelled.")
+                return
         
-        ##########################################################
-        # TODO: Confirmation for opening file if data is unsaved #
-        ##########################################################
         fname = QtGui.QFileDialog.getOpenFileName(self, "Open Data File", "", "CENTAUR project files (*.ctr)")
         if fname:
             if globals.load_project_from_file(fname):                
@@ -0,0 +1,286 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Engine Benchmark Suite
+
+Times the engine hot paths (battery model, solar synthesis, load model, representative day
+screening), the full annual simulation of every reference project (all topologies, control modes
+and PV couplings) and the results exporters, with fixed random seeds. Export throughput is also
+reported in rows per second. The full annual runs are timed with the memoised battery constants
+and solar geometry cleared before every call (cold), and again with the caches warm. Results are
+saved with machine metadata to a JSON baseline file, and later runs are compared against the
+baseline to flag performance regressions.
+
+Usage (from the repository root):
+    python -m tools.benchmark                   Run and compare against the baseline
+    python -m tools.benchmark --save            Run and save the results as the new baseline
+    python -m tools.benchmark --threshold 0.1   Flag slowdowns of more than 10%
+    python -m tools.benchmark --filter export   Only run the export throughput benchmarks
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import numpy as np
+
+import engine.kinetic_battery as kb
+import engine.synth_solar as synth_solar
+import engine.solar_batch as solar_batch
+import engine.load_model as load_model
+import engine.pv_power as pv_power
+import engine.rep_days as rep_days
+import engine.export as export
+import engine.chron_sim as chron_sim
+from engine.chron_sim import ENGINE_VERSION, battery_constants, fit_battery_constants, generate_profiles, run_sim
+from engine.project import build_inputs, default_project, reference_projects
+from engine.simulator import run_sim_stream
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+EXPORT_PATH = os.path.join(tempfile.gettempdir(), 'centaur_benchmark_export')
+EXPORT_YEARS = 10
+BATCH_SITES = 100
+REP_DAYS = 12
+SEED = 0
+
+def machine_info():
+    """Returns a dictionary of machine and software metadata"""
+    info = {
+        'platform'  : platform.platform(),
+        'machine'   : platform.machine(),
+        'processor' : platform.processor(),
+        'cpu_count' : os.cpu_count(),
+        'python'    : platform.python_version(),
+        'numpy'     : np.__version__,
+        'engine'    : ENGINE_VERSION,
+        'date'      : time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    return info
+
+def seeded(fn, *args):
+    """Returns a function that calls fn(*args) with the random seed fixed"""
+    def call():
+        np.random.seed(SEED)
+        return fn(*args)
+    return call
+
+def clear_caches():
+    """Clears the per-process memoised battery constants and solar geometry"""
+    chron_sim._cached_constants.cache_clear()
+    synth_solar.cached_trend.cache_clear()
+    synth_solar.beam_ratio.cache_clear()
+
+def cold(fn, *args):
+    """
+    Returns a function that calls fn(*args) with the random seed fixed and the memoisation caches
+    cleared, so that every call includes the battery constant fit and the solar geometry (as
+    before these were memoised)
+    """
+    def call():
+        clear_caches()
+        np.random.seed(SEED)
+        return fn(*args)
+    return call
+
+def capacity_steps(q1, q2, k, c, qmax, i):
+    """Steps the kinetic battery model through one year of hourly currents"""
+    for i_b in i:
+        q1, q2, i_w = kb.capacity_step(q1, q2, k, c, qmax, i_b, 1)
+    return q1, q2
+
+def inline_pv_power(GT, T_amb, pv_dict):
+    """PV output as calculated inline in chron_sim.run_sim before engine.pv_power (for comparison)"""
+    k_t = []
+    days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    for i in range(12):
+        k_ti = np.ones(days[i] * 24) - np.multiply(np.ones(days[i] * 24), pv_dict['gamma'] * T_amb[i])
+        k_t.extend(k_ti)
+    P_d = np.multiply(np.array(k_t), pv_dict['P_stc'] * pv_dict['k_e'] * pv_dict['k_m'] / 1000)
+    P_pv = np.multiply(np.array(GT), P_d) * pv_dict['eff_pv']
+    if pv_dict['pv_cpl'] == 'AC':
+        P_pv = np.clip(P_pv, None, pv_dict['P_inv'])
+    return P_pv
+
+def export_years(open_exporter, chunks, n_years):
+    """Exports the monthly chunks of one year n_years times, as for a multi-year streamed run"""
+    with open_exporter(EXPORT_PATH) as exporter:
+        for year in range(n_years):
+            for chunk in chunks:
+                exporter.write(chunk, start=year * 8760 + chunk['start'])
+    os.remove(EXPORT_PATH)
+
+def benchmarks():
+    """
+    Returns the list of benchmarks as (name, function, rows) tuples, with rows the number of rows
+    processed by throughput benchmarks (None for other benchmarks)
+    """
+    sys_dict, pv_dict, batt_dict, gen_dict, load_dict = build_inputs(default_project())
+    lat = sys_dict['lat']
+    hemi = 'South' if lat < 0 else 'North'
+
+    # Fixed inputs for the engine function benchmarks
+    np.random.seed(SEED)
+    G0, Kt = synth_solar.Aguiar_hourly_G0(pv_dict['Ktm'], lat)
+    GT = synth_solar.incident_HDKR(G0, Kt, lat, pv_dict['tilt'], pv_dict['azimuth'], pv_dict['albedo'])
+    pv_ac = dict(pv_dict, pv_cpl='AC', noct=45.0, inv_curve=[[0.05, 0.85], [0.1, 0.92], [0.2, 0.95], [0.5, 0.965], [1.0, 0.96]])
+    k, c, qmax, batt_iter = battery_constants(batt_dict['I'], batt_dict['T'], batt_dict['n_batt'])
+    i = 50 * np.sin(np.arange(8760) * 2 * np.pi / 24)
+    np.random.seed(SEED)
+    chunks = list(run_sim_stream(sys_dict, pv_dict, batt_dict, gen_dict, load_dict))
+    rows = EXPORT_YEARS * 8760
+
+    # Sites spread over latitudes, each with the monthly clearness indices of the default project
+    lats = np.linspace(-40, 40, BATCH_SITES)
+    Ktm = np.tile(pv_dict['Ktm'], (BATCH_SITES, 1))
+
+    # PV sub-arrays facing east, north, west and south
+    tilts = [20.0, 20.0, 20.0, 20.0]
+    azimuths = [-90.0, 0.0, 90.0, 180.0]
+
+    # PV-generator system, simulated in full and screened on representative days
+    pv_gen = build_inputs(reference_projects()[1][1])
+    np.random.seed(SEED)
+    pv_gen_profiles = generate_profiles(pv_gen[0], pv_gen[1], pv_gen[4])
+    rep = rep_days.cluster_days(pv_gen_profiles['P_ld'], pv_gen_profiles['G0'], REP_DAYS)
+
+    bench = [
+        ('kinetic_battery.capacity_step (8760 steps)', seeded(capacity_steps, qmax * c, qmax * (1 - c), k, c, qmax, i), None),
+        ('kinetic_battery.estimate_constants', seeded(fit_battery_constants, batt_dict['I'], batt_dict['T'], batt_dict['n_batt']), None),
+        ('synth_solar.Aguiar_hourly_G0', cold(synth_solar.Aguiar_hourly_G0, pv_dict['Ktm'], lat), None),
+        ('synth_solar.incident_HDKR', cold(synth_solar.incident_HDKR, G0, Kt, lat, pv_dict['tilt'], pv_dict['azimuth'], pv_dict['albedo']), None),
+        ('synth_solar.incident_HDKR (%d sub-arrays)' % len(tilts), cold(synth_solar.incident_HDKR, G0, Kt, lat, tilts, azimuths, pv_dict['albedo']), None),
+        ('solar_batch.batch_hourly_G0 (%d sites)' % BATCH_SITES, seeded(solar_batch.batch_hourly_G0, Ktm, lats), BATCH_SITES * 8760),
+        ('pv_power inline (original run_sim code)', seeded(inline_pv_power, GT, pv_dict['T_amb'], pv_dict), None),
+        ('pv_power.pv_power', seeded(pv_power.pv_power, GT, pv_dict['T_amb'], pv_dict), None),
+        ('pv_power.pv_power NOCT + inverter curve', seeded(pv_power.pv_power, GT, pv_dict['T_amb'], pv_ac), None),
+        ('pv_power.pv_power (%d years x %d arrays)' % (EXPORT_YEARS, BATCH_SITES), seeded(pv_power.pv_power, np.tile(GT, (BATCH_SITES, EXPORT_YEARS)), pv_dict['T_amb'], pv_ac), BATCH_SITES * rows),
+        ('rep_days.cluster_days (%d days)' % REP_DAYS, seeded(rep_days.cluster_days, pv_gen_profiles['P_ld'], pv_gen_profiles['G0'], REP_DAYS), None),
+        ('run_sim pv-gen_DC dispatch (given profiles)', seeded(run_sim, *(pv_gen + (pv_gen_profiles,))), None),
+        ('rep_days.screen pv-gen_DC (%d days)' % REP_DAYS, seeded(rep_days.screen, pv_gen[0], pv_gen[1], pv_gen[3], pv_gen[4], REP_DAYS, pv_gen_profiles, rep), None),
+        ('load_model.create_loads', seeded(load_model.create_loads, load_dict['l_sum'], load_dict['l_win'], load_dict['sigma_s'], load_dict['sigma_w'], hemi), None),
+        ('export.CSVExporter (%d years)' % EXPORT_YEARS, seeded(export_years, export.CSVExporter, chunks, EXPORT_YEARS), rows),
+        ('export.ColumnarExporter (%d years)' % EXPORT_YEARS, seeded(export_years, export.ColumnarExporter, chunks, EXPORT_YEARS), rows),
+        ('export.ColumnarExporter float32 (%d years)' % EXPORT_YEARS, seeded(export_years, lambda path: export.ColumnarExporter(path, dtype='float32'), chunks, EXPORT_YEARS), rows)
+    ]
+
+    # Full annual runs from cold caches (comparable with baselines recorded before the battery
+    # constants and solar geometry were memoised), and with the caches warm as in repeated runs
+    for name, project in reference_projects():
+        bench.append(('run_sim ' + name, cold(run_sim, *build_inputs(project)), None))
+    for name, project in reference_projects():
+        bench.append(('run_sim ' + name + ' (warm caches)', seeded(run_sim, *build_inputs(project)), None))
+
+    return bench
+
+def run_benchmarks(repeat=5, pattern=None):
+    """
+    Runs the benchmarks
+
+    Inputs:
+        repeat      Number of timed repeats of each benchmark (after one warm-up call)
+        pattern     Only run benchmarks with this substring in their name (all if None)
+
+    Outputs:
+        results     Dictionary of timings keyed by benchmark name, each a dictionary of the
+                    'min', 'median' and 'max' times over the repeats (seconds), and for throughput
+                    benchmarks the 'rows_per_s' at the median time
+    """
+    results = {}
+    for name, fn, rows in benchmarks():
+        if pattern is not None and pattern not in name:
+            continue
+        fn()
+        times = timeit.repeat(fn, number=1, repeat=repeat)
+        results[name] = {
+            'min'       : min(times),
+            'median'    : float(np.median(times)),
+            'max'       : max(times)
+        }
+        line = '%-50s %10.4f s (min %.4f s)' % (name, results[name]['median'], results[name]['min'])
+        if rows is not None:
+            results[name]['rows_per_s'] = rows / results[name]['median']
+            line = line + ', %.0f rows/s' % results[name]['rows_per_s']
+        print(line)
+        sys.stdout.flush()
+
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    Compares benchmark results against a baseline (using the median times)
+
+    Inputs:
+        results     Benchmark results (as returned by run_benchmarks)
+        baseline    Baseline benchmark results
+        threshold   Relative slowdown above which a benchmark is flagged (e.g. 0.2 for 20%)
+
+    Outputs:
+        regressions List of (name, baseline time, new time, ratio) tuples for the flagged benchmarks
+    """
+    regressions = []
+    print('\n%-50s %10s %10s %8s' % ('Benchmark', 'Baseline', 'Current', 'Ratio'))
+    for name in results:
+        if name not in baseline:
+            print('%-50s %10s %10.4f %8s' % (name, '-', results[name]['median'], 'new'))
+            continue
+        t_base = baseline[name]['median']
+        t_new = results[name]['median']
+        ratio = t_new / t_base if t_base > 0 else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append((name, t_base, t_new, ratio))
+        print('%-50s %10.4f %10.4f %8.2f%s' % (name, t_base, t_new, ratio, flag))
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CENTAUR engine benchmark suite')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown flagged as a regression (default 0.2)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repeats of each benchmark (default 5)')
+    parser.add_argument('--filter', default=None, help='only run benchmarks whose name contains this string')
+    args = parser.parse_args(argv)
+
+    print('CENTAUR engine benchmarks (engine version ' + ENGINE_VERSION + ')\n')
+    results = run_benchmarks(args.repeat, args.filter)
+
+    if args.save:
+        with open(args.baseline, 'w') as fp:
+            json.dump({'machine' : machine_info(), 'results' : results}, fp, indent=2, sort_keys=True)
+        print('\nBaseline saved to ' + args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('\nNo baseline found at ' + args.baseline + ' (run with --save to create one)')
+        return 0
+
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    if baseline['machine'].get('platform') != platform.platform() or baseline['machine'].get('processor') != platform.processor():
+        print('\nWarning: baseline was recorded on a different machine (' + baseline['machine'].get('platform', '?') + ')')
+
+    regressions = compare(results, baseline['results'], args.threshold)
+    if regressions:
+        print('\n' + str(len(regressions)) + ' benchmark(s) slower than the baseline by more than ' + str(round(args.threshold * 100)) + '%')
+        return 1
+
+    print('\nNo regressions found')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
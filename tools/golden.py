@@ -0,0 +1,219 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Golden Output Regression Harness
+
+Records the hourly outputs of the current simulation engine for every reference project (all
+topologies, control modes and PV couplings) with a fixed random seed, and compares an engine
+against the recorded outputs channel by channel. Any channel that differs by more than the
+tolerances is reported with the first diverging hour, so that faster implementations of the
+engine can be checked for numerical drift before they are adopted.
+
+Usage (from the repository root):
+    python -m tools.golden record                       Record reference outputs from run_sim
+    python -m tools.golden check                        Compare run_sim against the reference
+    python -m tools.golden check --engine simulator     Compare the incremental Simulator
+    python -m tools.golden check --engine pkg.mod:fn    Compare any function with the run_sim signature
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import numpy as np
+
+from engine.chron_sim import ENGINE_VERSION, generate_profiles, run_sim
+from engine.project import build_inputs, reference_projects
+from engine.simulator import Simulator
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_reference.npz')
+CHANNELS = ['P_ld', 'G0', 'GT', 'P_pv', 'q', 'P_gen', 'P_gen_exc', 'P_uns', 'P_pv_exc']
+SEED = 0
+
+def simulator_run(sys_dict, pv_dict, batt_dict, gen_dict, load_dict):
+    """
+    Runs a year with the incremental engine.simulator.Simulator, returning outputs in the
+    same form as chron_sim.run_sim
+    """
+    profiles = generate_profiles(sys_dict, pv_dict, load_dict)
+    P_ld = profiles['P_ld']
+    P_pv = profiles.get('P_pv', np.zeros(len(P_ld)))
+
+    sim = Simulator(sys_dict, pv_dict, batt_dict, gen_dict)
+    out = np.array([sim.step(P_ld[i], P_pv[i]) for i in range(len(P_ld))])
+
+    sim_out = dict(profiles)
+    sim_out['topo'] = sim.topo
+    sim_out['P_gen'] = out[:,0]
+    sim_out['P_gen_exc'] = out[:,1]
+    sim_out['P_uns'] = out[:,2]
+    sim_out['P_pv_exc'] = out[:,3]
+    if sys_dict['is_batt']:
+        sim_out['q'] = np.concatenate([[batt_dict['SOC_0']], out[:,4]])
+
+    return sim_out
+
+ENGINES = {
+    'run_sim'   : run_sim,
+    'simulator' : simulator_run
+}
+
+def get_engine(name):
+    """Returns the engine function for a name in ENGINES or a 'module:function' path"""
+    if name in ENGINES:
+        return ENGINES[name]
+    module, function = name.split(':')
+    return getattr(importlib.import_module(module), function)
+
+def run_projects(run_fn, seed=SEED):
+    """
+    Runs every reference project with a fixed random seed
+
+    Outputs:
+        outputs     Dictionary of {channel : hourly array} dictionaries keyed by project name
+                    (channels that are not produced for a topology are left out)
+    """
+    outputs = {}
+    for name, project in reference_projects():
+        np.random.seed(seed)
+        sim_out = run_fn(*build_inputs(project))
+        outputs[name] = {}
+        for channel in CHANNELS:
+            if channel in sim_out and len(sim_out[channel]) > 0:
+                outputs[name][channel] = np.array(sim_out[channel], dtype=float)
+
+    return outputs
+
+def record(path=DEFAULT_PATH, run_fn=run_sim, seed=SEED):
+    """Records the reference outputs of an engine (run_sim by default) to a compressed .npz file"""
+    arrays = {'__engine__' : np.array(ENGINE_VERSION), '__seed__' : np.array(seed)}
+    for name, channels in run_projects(run_fn, seed).items():
+        for channel, values in channels.items():
+            arrays[name + '/' + channel] = values
+    np.savez_compressed(path, **arrays)
+
+def load(path=DEFAULT_PATH):
+    """
+    Loads reference outputs
+
+    Outputs:
+        reference   Dictionary of {channel : hourly array} dictionaries keyed by project name
+        info        Dictionary of the 'engine' version and 'seed' used for the recording
+    """
+    reference = {}
+    with np.load(path) as data:
+        info = {'engine' : str(data['__engine__']), 'seed' : int(data['__seed__'])}
+        for key in data.files:
+            if key.startswith('__'):
+                continue
+            name, channel = key.split('/')
+            reference.setdefault(name, {})[channel] = data[key]
+
+    return reference, info
+
+def diff_channel(ref, new, rtol, atol):
+    """
+    Compares one hourly channel against its reference
+
+    Outputs:
+        diff        Dictionary of the comparison: 'ok', 'n_bad' (hours outside tolerance),
+                    'max_abs' (largest absolute difference) and, if any hour diverges, 'hour'
+                    (first diverging hour) with the 'ref' and 'new' values at that hour.
+                    Channels of different length are reported with 'length' = (ref, new).
+    """
+    if new is None or len(new) != len(ref):
+        return {'ok' : False, 'length' : (len(ref), 0 if new is None else len(new))}
+
+    bad = ~np.isclose(new, ref, rtol=rtol, atol=atol, equal_nan=True)
+    diff = {
+        'ok'        : not bad.any(),
+        'n_bad'     : int(np.count_nonzero(bad)),
+        'max_abs'   : float(np.max(np.abs(new - ref))) if len(ref) else 0.0
+    }
+    if bad.any():
+        hour = int(np.argmax(bad))
+        diff['hour'] = hour
+        diff['ref'] = float(ref[hour])
+        diff['new'] = float(new[hour])
+
+    return diff
+
+def check(path=DEFAULT_PATH, run_fn=run_sim, rtol=1e-9, atol=1e-6):
+    """
+    Compares an engine against the recorded reference outputs
+
+    Inputs:
+        path        Reference .npz file
+        run_fn      Engine function with the signature of chron_sim.run_sim
+        rtol        Relative tolerance
+        atol        Absolute tolerance (W for powers, % for state of charge)
+
+    Outputs:
+        report      List of (project name, channel, diff) tuples (see diff_channel)
+    """
+    reference, info = load(path)
+    outputs = run_projects(run_fn, info['seed'])
+
+    report = []
+    for name in sorted(reference):
+        for channel in CHANNELS:
+            if channel in reference[name]:
+                new = outputs.get(name, {}).get(channel)
+                report.append((name, channel, diff_channel(reference[name][channel], new, rtol, atol)))
+
+    return report
+
+def print_report(report):
+    """Prints a diff report and returns the number of failed channels"""
+    n_fail = 0
+    for name, channel, diff in report:
+        if diff['ok']:
+            continue
+        n_fail = n_fail + 1
+        if 'length' in diff:
+            print('%-28s %-10s length %d, expected %d' % (name, channel, diff['length'][1], diff['length'][0]))
+        else:
+            print('%-28s %-10s %5d hours differ (max %.6g), first at hour %d: %.10g (expected %.10g)'
+                  % (name, channel, diff['n_bad'], diff['max_abs'], diff['hour'], diff['new'], diff['ref']))
+
+    n_proj = len(set(name for name, channel, diff in report))
+    print('%d projects, %d channels compared, %d failed' % (n_proj, len(report), n_fail))
+
+    return n_fail
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CENTAUR golden output regression harness')
+    parser.add_argument('action', choices=['record', 'check'])
+    parser.add_argument('--path', default=DEFAULT_PATH, help='reference output file (.npz)')
+    parser.add_argument('--engine', default='run_sim', help='engine to run: run_sim, simulator or module:function')
+    parser.add_argument('--rtol', type=float, default=1e-9, help='relative tolerance (default 1e-9)')
+    parser.add_argument('--atol', type=float, default=1e-6, help='absolute tolerance (default 1e-6)')
+    args = parser.parse_args(argv)
+
+    run_fn = get_engine(args.engine)
+    if args.action == 'record':
+        record(args.path, run_fn)
+        print('Reference outputs recorded to ' + args.path)
+        return 0
+
+    if not os.path.exists(args.path):
+        print('No reference outputs found at ' + args.path + ' (run "record" first)')
+        return 1
+
+    reference, info = load(args.path)
+    if info['engine'] != ENGINE_VERSION:
+        print('Note: reference was recorded with engine version ' + info['engine'] + ' (current ' + ENGINE_VERSION + ')')
+
+    n_fail = print_report(check(args.path, run_fn, args.rtol, args.atol))
+    return 1 if n_fail else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
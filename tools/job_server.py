@@ -0,0 +1,438 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Local Simulation Job Server
+
+Accepts projects in the CENTAUR project file (.ctr) format over HTTP (on localhost or a Unix
+socket), queues them as jobs and runs them on a persistent pool of worker processes. Workers are
+started once and warmed up with a run of the default project, and keep their caches between jobs:
+the solar geometry (synth_solar.cached_trend, synth_solar.beam_ratio), the kinetic battery model
+fits (chron_sim.battery_constants) and the hourly load and weather profiles of seeded projects.
+Scripts therefore do not pay interpreter startup, engine import and cache warm-up for every run.
+Results are kept by job id until they are collected (the oldest finished jobs are dropped first).
+
+Endpoints
+---------
+    POST   /jobs                Submit a project (.ctr JSON), returns {"id": ...}
+    GET    /jobs/<id>           Job status, with a summary of key performance indicators when done
+    GET    /jobs/<id>/result    Hourly outputs as JSON, or as a numpy .npz file with ?format=npz
+    DELETE /jobs/<id>           Cancel a queued job, or discard a running or finished job
+    GET    /status              Number of workers and jobs in each state
+
+Usage (from the repository root):
+    python -m tools.job_server                      Serve on http://127.0.0.1:8765
+    python -m tools.job_server --port 9000 -j 4     Serve on port 9000 with 4 worker processes
+    python -m tools.job_server --socket /tmp/ctr    Serve on a Unix socket
+
+From a script:
+    job_id = job_server.submit(project)
+    sim_out = job_server.wait(job_id)
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import argparse
+import collections
+import http.client
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+import engine.kpi as kpi
+from engine.chron_sim import generate_profiles, run_sim
+from engine.project import build_inputs, decode_project, default_project, encode_project
+from engine.result_cache import input_hash
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_URL = 'http://' + DEFAULT_HOST + ':' + str(DEFAULT_PORT)
+MAX_PROFILES = 16       # Seeded profiles kept by each worker
+MAX_JOBS = 1000         # Finished jobs kept by the server
+
+# Worker processes
+
+_profiles = collections.OrderedDict()   # Seeded hourly profiles of this worker, keyed by input hash
+
+def _init_worker():
+    """Warms up the caches of a worker process with a run of the default project"""
+    _run_project(default_project())
+
+def _run_project(project):
+    """
+    Runs a project, reusing the hourly profiles of an earlier run of the same seeded inputs
+
+    Outputs:
+        sim_out     Dictionary of simulation outputs (as from chron_sim.run_sim)
+        inputs      Tuple of run_sim input dictionaries
+    """
+    inputs = build_inputs(project)
+    sys_dict, pv_dict, batt_dict, gen_dict, load_dict = inputs
+    seed = sys_dict.get('seed')
+    if seed is None:
+        return run_sim(*inputs), inputs
+
+    key = input_hash(generate_profiles, (sys_dict, pv_dict, load_dict), seed)
+    profiles = _profiles.pop(key, None)
+    if profiles is None:
+        np.random.seed(seed)
+        profiles = generate_profiles(sys_dict, pv_dict, load_dict)
+        for value in profiles.values():
+            value.flags.writeable = False
+    _profiles[key] = profiles
+    if len(_profiles) > MAX_PROFILES:
+        _profiles.popitem(last=False)
+
+    return run_sim(*inputs, profiles=profiles), inputs
+
+def _run_job(job_id, text):
+    """Runs a job in a worker process, returning the job id, the outputs and a KPI summary"""
+    try:
+        sim_out, inputs = _run_project(decode_project(text))
+    except SystemExit:
+        # A failed battery constant fit raises SystemExit, which would end the worker process
+        # without calling back, leaving the job running and its slot taken
+        raise RuntimeError('Battery constants could not be estimated from the battery characteristics') from None
+    sys_dict, pv_dict, batt_dict, gen_dict, load_dict = inputs
+    summary = kpi.kpis(sim_out, batt_dict if sys_dict['is_batt'] else None, gen_dict if sys_dict['is_gen'] else None)
+    outputs = {key : np.asarray(value) for key, value in sim_out.items() if key != 'perf'}
+
+    return job_id, outputs, summary
+
+def _jsonable(obj):
+    """Converts numpy values in an object to JSON serialisable values"""
+    if isinstance(obj, dict):
+        return {str(key) : _jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(value) for value in obj]
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    return obj
+
+# Server
+
+class JobManager(object):
+    """Job queue and persistent worker pool of the server"""
+
+    def __init__(self, processes=None, max_jobs=MAX_JOBS):
+        """
+        Starts the worker pool and the dispatcher thread
+
+        Inputs:
+            processes   Number of worker processes (default the number of CPUs)
+            max_jobs    Number of finished jobs kept (the oldest are discarded first)
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.jobs = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.slots = threading.Semaphore(self.processes)
+        self.ids = itertools.count(1)
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker)
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, text):
+        """Queues a project (.ctr JSON text) and returns the job id"""
+        decode_project(text)    # Reject malformed projects before queueing them
+        job_id = str(next(self.ids))
+        with self.lock:
+            self.jobs[job_id] = {'status' : 'queued', 'submitted' : time.time()}
+        self.pending.put((job_id, text))
+        return job_id
+
+    def _dispatch(self):
+        # Jobs are only sent to the pool when a worker is free, so queued jobs can still be cancelled
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            job_id, text = item
+            self.slots.acquire()
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None or job['status'] != 'queued':
+                    self.slots.release()
+                    continue
+                job['status'] = 'running'
+                job['started'] = time.time()
+            self.pool.apply_async(_run_job, (job_id, text), callback=self._done,
+                                  error_callback=lambda error, job_id=job_id: self._failed(job_id, error))
+
+    def _done(self, result):
+        job_id, outputs, summary = result
+        self._finish(job_id, status='done', outputs=outputs, summary=_jsonable(summary))
+
+    def _failed(self, job_id, error):
+        self._finish(job_id, status='failed', error=repr(error))
+
+    def _finish(self, job_id, **fields):
+        self.slots.release()
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                # Discarded while running
+                return
+            job.update(fields)
+            job['finished'] = time.time()
+            finished = [key for key, value in self.jobs.items() if value['status'] in ['done', 'failed', 'cancelled']]
+            for key in finished[:max(len(finished) - self.max_jobs, 0)]:
+                del self.jobs[key]
+
+    def get(self, job_id):
+        """Returns the record of a job (or None)"""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a queued job, or discards a running or finished job. Returns False for an unknown job."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            if job['status'] == 'queued':
+                job['status'] = 'cancelled'
+            else:
+                del self.jobs[job_id]
+        return True
+
+    def status(self):
+        """Returns the number of workers and the number of jobs in each state"""
+        with self.lock:
+            counts = collections.Counter(job['status'] for job in self.jobs.values())
+        return {'workers' : self.processes, 'jobs' : dict(counts)}
+
+    def close(self):
+        """Stops the dispatcher and the worker pool"""
+        self.pending.put(None)
+        self.pool.terminate()
+        self.pool.join()
+
+class JobHandler(BaseHTTPRequestHandler):
+    """HTTP request handler of the job server"""
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else 'local'
+
+    def send_data(self, code, body, content_type='application/json'):
+        if content_type == 'application/json':
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def parse_path(self):
+        path, _, query = self.path.partition('?')
+        return [part for part in path.split('/') if part], dict(item.partition('=')[::2] for item in query.split('&') if item)
+
+    def do_POST(self):
+        parts, query = self.parse_path()
+        if parts != ['jobs']:
+            return self.send_data(404, {'error' : 'not found'})
+        text = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            job_id = self.server.manager.submit(text)
+        except ValueError as error:
+            return self.send_data(400, {'error' : 'invalid project: ' + str(error)})
+        self.send_data(202, {'id' : job_id})
+
+    def do_GET(self):
+        parts, query = self.parse_path()
+        manager = self.server.manager
+        if parts == ['status']:
+            return self.send_data(200, manager.status())
+        if len(parts) not in [2, 3] or parts[0] != 'jobs' or (len(parts) == 3 and parts[2] != 'result'):
+            return self.send_data(404, {'error' : 'not found'})
+
+        job = manager.get(parts[1])
+        if job is None:
+            return self.send_data(404, {'error' : 'unknown job ' + parts[1]})
+
+        if len(parts) == 2:
+            info = {key : value for key, value in job.items() if key != 'outputs'}
+            info['id'] = parts[1]
+            return self.send_data(200, info)
+
+        if job['status'] != 'done':
+            return self.send_data(409, {'error' : 'job ' + parts[1] + ' is ' + job['status'], 'status' : job['status']})
+        if query.get('format') == 'npz':
+            buffer = io.BytesIO()
+            np.savez(buffer, **job['outputs'])
+            return self.send_data(200, buffer.getvalue(), 'application/octet-stream')
+        self.send_data(200, _jsonable(job['outputs']))
+
+    def do_DELETE(self):
+        parts, query = self.parse_path()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            return self.send_data(404, {'error' : 'not found'})
+        if not self.server.manager.cancel(parts[1]):
+            return self.send_data(404, {'error' : 'unknown job ' + parts[1]})
+        self.send_data(200, {'id' : parts[1], 'status' : 'cancelled'})
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server on a Unix socket"""
+    daemon_threads = True
+
+def make_server(manager, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    """
+    Creates the HTTP server (call serve_forever to serve requests)
+
+    Inputs:
+        manager     JobManager running the jobs
+        host, port  Address to listen on (port 0 picks a free port, see server.server_address)
+        socket_path Unix socket to listen on instead of a TCP port
+        verbose     Log every request
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, JobHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), JobHandler)
+    server.manager = manager
+    server.verbose = verbose
+    return server
+
+# Client
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        http.client.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+def request(method, path, body=None, url=DEFAULT_URL):
+    """
+    Sends a request to the job server
+
+    Inputs:
+        method      HTTP method
+        path        Request path (e.g. '/jobs/1')
+        body        Request body (bytes)
+        url         Server address, 'http://host:port' or 'unix:/path/to/socket'
+
+    Outputs:
+        code        HTTP status code
+        data        Decoded JSON response, or bytes for other content types
+    """
+    if url.startswith('unix:'):
+        conn = UnixHTTPConnection(url[5:])
+    else:
+        conn = http.client.HTTPConnection(url.split('://', 1)[-1])
+    try:
+        conn.request(method, path, body)
+        response = conn.getresponse()
+        data = response.read()
+        if response.getheader('Content-Type') == 'application/json':
+            data = json.loads(data.decode('utf-8'))
+        return response.status, data
+    finally:
+        conn.close()
+
+def submit(project, url=DEFAULT_URL):
+    """Submits a project (dictionary or .ctr JSON text) and returns the job id"""
+    if isinstance(project, dict):
+        project = encode_project(project)
+    if isinstance(project, str):
+        project = project.encode('utf-8')
+    code, data = request('POST', '/jobs', project, url)
+    if code != 202:
+        raise ValueError(data['error'])
+    return data['id']
+
+def status(job_id, url=DEFAULT_URL):
+    """Returns the status record of a job"""
+    code, data = request('GET', '/jobs/' + job_id, url=url)
+    if code != 200:
+        raise KeyError(data['error'])
+    return data
+
+def result(job_id, url=DEFAULT_URL):
+    """Returns the outputs of a finished job (dictionary of numpy arrays)"""
+    code, data = request('GET', '/jobs/' + job_id + '/result?format=npz', url=url)
+    if code != 200:
+        raise KeyError(data['error'])
+    with np.load(io.BytesIO(data)) as npz:
+        return {key : npz[key] for key in npz.files}
+
+def cancel(job_id, url=DEFAULT_URL):
+    """Cancels (or discards) a job"""
+    request('DELETE', '/jobs/' + job_id, url=url)
+
+def wait(job_id, url=DEFAULT_URL, timeout=None, interval=0.05):
+    """
+    Waits for a job to finish and returns its outputs
+
+    Inputs:
+        job_id      Job id (from submit)
+        url         Server address
+        timeout     Maximum time to wait (s), or None to wait indefinitely
+        interval    Polling interval (s)
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        info = status(job_id, url)
+        if info['status'] == 'done':
+            return result(job_id, url)
+        if info['status'] in ['failed', 'cancelled']:
+            raise RuntimeError('job ' + job_id + ' ' + info['status'] + ': ' + info.get('error', ''))
+        if deadline is not None and time.time() > deadline:
+            raise TimeoutError('job ' + job_id + ' did not finish in ' + str(timeout) + ' s')
+        time.sleep(interval)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CENTAUR local simulation job server')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on (default ' + DEFAULT_HOST + ')')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on (default ' + str(DEFAULT_PORT) + ')')
+    parser.add_argument('--socket', default=None, help='listen on this Unix socket instead of a TCP port')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='number of worker processes (default the number of CPUs)')
+    parser.add_argument('--max-jobs', type=int, default=MAX_JOBS, help='finished jobs kept (default ' + str(MAX_JOBS) + ')')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    manager = JobManager(args.processes, args.max_jobs)
+    server = make_server(manager, args.host, args.port, args.socket, args.verbose)
+    where = 'unix:' + args.socket if args.socket else 'http://' + args.host + ':' + str(server.server_address[1])
+    print('CENTAUR job server on ' + where + ' with ' + str(manager.processes) + ' worker processes')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Julius Susanto. All rights reserved.
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+
+"""
+Sweep Worker
+
+Runs cases from a shared work queue directory (see engine.work_queue). Start any number of
+workers, on any machine that can see the directory, after the coordinator has written the cases
+with work_queue.submit_cases.
+
+Usage (from the repository root):
+    python -m tools.sweep_worker worker /shared/sweep           Run cases until the queue is empty
+    python -m tools.sweep_worker worker /shared/sweep -j 8      Run 8 worker processes
+    python -m tools.sweep_worker worker /shared/sweep --engine pkg.mod:fn
+    python -m tools.sweep_worker status /shared/sweep           Show the progress of the sweep
+    python -m tools.sweep_worker recover /shared/sweep          Return stale claims to the queue
+
+Author: Julius Susanto
+Last edited: October 2026
+"""
+
+import argparse
+import multiprocessing
+import sys
+
+import engine.work_queue as work_queue
+from tools.golden import get_engine
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CENTAUR sweep worker for shared work queue directories')
+    parser.add_argument('action', choices=['worker', 'status', 'recover'])
+    parser.add_argument('root', help='work queue directory')
+    parser.add_argument('-j', '--processes', type=int, default=1, help='number of worker processes (default 1)')
+    parser.add_argument('--engine', default='run_sim', help='engine to run: run_sim, simulator or module:function')
+    parser.add_argument('--wait', action='store_true', help='keep polling until every case is completed')
+    parser.add_argument('--stale', type=float, default=work_queue.STALE, help='age of an untouched claim that is returned to the queue (default ' + str(work_queue.STALE) + ' s)')
+    args = parser.parse_args(argv)
+
+    if args.action == 'recover':
+        recovered = work_queue.recover_stale(args.root, args.stale)
+        print(str(len(recovered)) + ' stale claim(s) returned to the queue')
+    elif args.action == 'worker':
+        run_fn = get_engine(args.engine)
+        workers = [multiprocessing.Process(target=work_queue.run_worker, args=(args.root, run_fn),
+                                           kwargs={'wait' : args.wait, 'stale' : args.stale})
+                   for i in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    counts = work_queue.progress(args.root)
+    print(', '.join(str(counts[key]) + ' ' + key for key in ['queued', 'claimed', 'done', 'failed']))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())